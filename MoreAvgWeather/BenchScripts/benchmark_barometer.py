@@ -0,0 +1,69 @@
+import os
+import sys
+import logging
+import math
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from ingest_writer import connect
+from weather_schema import CREATE_WEATHER_DATA, SCHEMA_VERSION, create_indexes
+from edit_with_barometer import add_barometric_pressure
+
+# Table sizes to compare; the per-row loop is only run where it finishes in reasonable time
+ROW_COUNTS = [100000, 1000000, 3000000]
+PER_ROW_LIMIT = 1000000
+# Rows appended between two pipeline cycles, for the incremental re-run
+NEW_ROWS = 75
+
+def populate(conn, count, first=0):
+    """Append count synthetic rows that have temperature, humidity and altitude but no pressure."""
+    with conn:
+        conn.execute(CREATE_WEATHER_DATA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT {first} UNION ALL SELECT n + 1 FROM seq WHERE n < {first + count - 1})
+            INSERT INTO weather_data (provider, location, timestamp, temperature, humidity, altitude)
+            SELECT 'openmeteo', 'location-' || (n % 15), 1700000000 + (n / 15) * 900,
+                   5 + (n % 17), 50 + (n % 40), 20 + (n % 15) * 10
+            FROM seq""")
+    with conn:
+        create_indexes(conn)
+
+def per_row(conn):
+    """The previous stage: scan every row, issue one UPDATE and one log line per row."""
+    cursor = conn.cursor()
+    for entry_id, temperature, humidity, altitude in cursor.execute(
+            "SELECT id, temperature, humidity, altitude FROM weather_data").fetchall():
+        if temperature is None or humidity is None or altitude is None:
+            continue
+        pressure = 1013.25 * math.exp((-9.80665 * 0.0289644 * altitude) / (8.31447 * (temperature + 273.15)))
+        cursor.execute("UPDATE weather_data SET barometric_pressure = ? WHERE id = ?", (pressure, entry_id))
+        logging.info(f'Updated entry ID {entry_id} with barometric pressure {pressure}')
+    conn.commit()
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or ROW_COUNTS
+    print(f"{'Rows':<10} {'Per-row (s)':<14} {'Vectorized (s)':<16} {'Speedup':<10} {f'+{NEW_ROWS} rows (ms)'}")
+    print("=" * 66)
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = connect(os.path.join(tmp, 'weather_data.db'))
+            populate(conn, count)
+            legacy = timed(per_row, conn) if count <= PER_ROW_LIMIT else None
+            conn.execute("UPDATE weather_data SET barometric_pressure = NULL")
+            conn.commit()
+            vectorized = timed(add_barometric_pressure, conn)
+            # A later cycle only has the newly ingested rows left to compute
+            populate(conn, NEW_ROWS, first=count)
+            incremental = timed(add_barometric_pressure, conn)
+            conn.close()
+        legacy_text = f"{legacy:<14.2f}" if legacy is not None else f"{'-':<14}"
+        speedup = f"{legacy / vectorized:.1f}x" if legacy is not None else '-'
+        print(f"{count:<10} {legacy_text} {vectorized:<16.2f} {speedup:<10} {incremental * 1000:.1f}")
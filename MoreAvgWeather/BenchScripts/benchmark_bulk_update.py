@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from ingest_writer import connect
+from weather_schema import CREATE_WEATHER_DATA, SCHEMA_VERSION, create_indexes
+from bulk_update import bulk_update
+
+# Rows written back per run; the iterrows loop is skipped above ITERROWS_LIMIT
+ROW_COUNTS = [10000, 100000, 1000000]
+ITERROWS_LIMIT = 100000
+
+def populate(conn, count):
+    with conn:
+        conn.execute(CREATE_WEATHER_DATA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {count - 1})
+            INSERT INTO weather_data (provider, location, timestamp, temperature)
+            SELECT 'openmeteo', 'location-' || (n % 15), 1700000000 + (n / 15) * 900, 5 + (n % 17)
+            FROM seq""")
+    with conn:
+        create_indexes(conn)
+
+def iterrows_loop(conn, df):
+    """The previous update_precipitation_in_db."""
+    cursor = conn.cursor()
+    for index, row in df.iterrows():
+        cursor.execute("UPDATE weather_data SET precipitation = ? WHERE id = ?",
+                       (row['precipitation_percentage'], row['id']))
+    conn.commit()
+
+def staged(conn, df):
+    bulk_update(conn, 'weather_data', 'id', 'precipitation', df[['id', 'precipitation_percentage']])
+
+def timed(write, conn, df):
+    conn.execute("UPDATE weather_data SET precipitation = NULL")
+    conn.commit()
+    start = time.perf_counter()
+    write(conn, df)
+    elapsed = time.perf_counter() - start
+    # Every method must leave the same values behind
+    total = conn.execute("SELECT SUM(precipitation) FROM weather_data").fetchone()[0]
+    assert abs(total - df['precipitation_percentage'].sum()) < 1e-6 * len(df), write.__name__
+    return elapsed
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or ROW_COUNTS
+    print(f"{'Rows':<10} {'iterrows (s)':<14} {'Staging table (s)':<19} {'Speedup'}")
+    print("=" * 54)
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = connect(os.path.join(tmp, 'weather_data.db'))
+            populate(conn, count)
+            df = pd.DataFrame({'id': np.arange(1, count + 1),
+                               'precipitation_percentage': np.random.default_rng(0).random(count) * 100})
+            legacy = timed(iterrows_loop, conn, df) if count <= ITERROWS_LIMIT else None
+            bulk = timed(staged, conn, df)
+            conn.close()
+        legacy_text = f"{legacy:<14.2f}" if legacy is not None else f"{'-':<14}"
+        speedup = f"{legacy / bulk:.1f}x" if legacy is not None else '-'
+        print(f"{count:<10} {legacy_text} {bulk:<19.2f} {speedup}")
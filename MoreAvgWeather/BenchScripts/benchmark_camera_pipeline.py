@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+from collections import namedtuple
+import cv2
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CheckScripts'))
+
+from camera_pipeline import ANALYSIS_WORKERS, run_pipeline
+from rain_analysis import analyze_image, rain_density
+from stub_server import start_stub_server
+
+CAMERA_COUNTS = [50, 200]
+LATENCY = 0.2  # Simulated camera server round-trip in seconds
+FRAME_SIZE = (480, 640)  # Typical SDOT camera frame
+
+Camera = namedtuple('Camera', ['url'])
+
+def make_frame(seed=0):
+    """A noisy JPEG frame with streaks, so Canny has real work to do."""
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 255, (*FRAME_SIZE, 3), dtype=np.uint8)
+    image = cv2.GaussianBlur(image, (9, 9), 0)
+    for _ in range(300):
+        x, y = rng.integers(0, FRAME_SIZE[1]), rng.integers(0, FRAME_SIZE[0])
+        cv2.line(image, (int(x), int(y)), (int(x) + 4, int(y) + 25), (230, 230, 230), 1)
+    return cv2.imencode('.jpg', image)[1].tobytes()
+
+def run_sequential(cameras):
+    """The previous loop: one streamed download, decode and analysis at a time."""
+    for camera in cameras:
+        image_resp = requests.get(camera.url, stream=True).raw
+        image = np.asarray(bytearray(image_resp.read()), dtype="uint8")
+        image = cv2.imdecode(image, cv2.IMREAD_COLOR)
+        if image is not None:
+            rain_density(image)
+
+if __name__ == "__main__":
+    # Usage: benchmark_camera_pipeline.py [latency_seconds]; 0 measures decode and analysis alone
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else LATENCY
+    frame = make_frame()
+    server, base_url = start_stub_server(latency=latency, body=frame, content_type='image/jpeg')
+    print(f"OpenCV {cv2.__version__}, {os.cpu_count()} CPUs, {ANALYSIS_WORKERS} analysis workers")
+    print(f"Frame: {len(frame)} bytes, {latency * 1000:.0f} ms simulated latency")
+    print(f"{'Cameras':<10} {'Sequential (s)':<16} {'Pipeline (s)':<14} {'Speedup':<9} {'Frames/s'}")
+    print("=" * 62)
+    for count in CAMERA_COUNTS:
+        cameras = [Camera(f'{base_url}/cameras/images/camera_{i}.jpg') for i in range(count)]
+        start = time.perf_counter()
+        run_sequential(cameras)
+        sequential = time.perf_counter() - start
+        start = time.perf_counter()
+        results, counters = run_pipeline(cameras, analyze_image)
+        pipeline = time.perf_counter() - start
+        assert all(error is None for _, _, error in results)
+        print(f"{count:<10} {sequential:<16.2f} {pipeline:<14.2f} {sequential / pipeline:<9.1f} {count / pipeline:.1f}")
+    print(counters.summary())
+    server.shutdown()
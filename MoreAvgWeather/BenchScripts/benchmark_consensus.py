@@ -0,0 +1,94 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from weather_consensus import (METRICS, MIN_SCALE, MAD_TO_SIGMA, OUTLIER_THRESHOLD, BUCKET_SECONDS,
+                               align, robust_consensus, update_consensus)
+from ingest_writer import connect
+from weather_schema import ensure_schema
+
+PROVIDERS = ['nws', 'openmeteo', 'openweathermap', 'weatherapi', 'weatherstack']
+SIZES = [(15, 4), (1000, 24), (5000, 48)]  # (locations, buckets per cycle)
+OUTLIER_RATE = 0.02
+OUTLIER_OFFSET = 15.0
+
+def make_frame(locations, buckets, seed=0):
+    """Provider readings around a per-location truth, with a few injected outliers."""
+    rng = np.random.default_rng(seed)
+    count = locations * buckets * len(PROVIDERS)
+    location = np.repeat(np.arange(locations), buckets * len(PROVIDERS))
+    bucket = np.tile(np.repeat(np.arange(buckets) * BUCKET_SECONDS, len(PROVIDERS)), locations)
+    truth = {'temperature': 10 + location % 10, 'wind_speed': 3 + location % 5, 'humidity': 60 + location % 30}
+    frame = pd.DataFrame({'location': [f'location-{i}' for i in location], 'bucket': bucket,
+                          'provider': np.tile(PROVIDERS, locations * buckets), 'is_new': 1})
+    injected = rng.random(count) < OUTLIER_RATE
+    for metric in METRICS:
+        frame[metric] = truth[metric] + rng.normal(0, MIN_SCALE[metric] / 3, count) + injected * OUTLIER_OFFSET
+    return frame, injected
+
+def loop_consensus(frame):
+    """The straightforward per-group version: dict of lists, then statistics.median per group."""
+    groups = {}
+    for row in frame.itertuples(index=False):
+        groups.setdefault((row.location, row.bucket), []).append(row)
+    results = {}
+    for key, rows in groups.items():
+        for metric in METRICS:
+            values = [getattr(row, metric) for row in rows]
+            median = statistics.median(values)
+            spread = max(statistics.median(abs(v - median) for v in values) * MAD_TO_SIGMA, MIN_SCALE[metric])
+            inliers = [v for v in values if abs(v - median) <= OUTLIER_THRESHOLD * spread]
+            results[key, metric] = sum(inliers) / len(inliers)
+    return results
+
+def populate(db_name, frame):
+    conn = connect(db_name)
+    with conn:
+        ensure_schema(conn)
+        conn.executemany('''INSERT INTO weather_data (provider, location, timestamp, temperature, wind_speed, humidity)
+                            VALUES (?, ?, ?, ?, ?, ?)''',
+                         zip(frame['provider'], frame['location'], (frame['bucket'] + 1700000000).tolist(),
+                             frame['temperature'], frame['wind_speed'], frame['humidity']))
+    return conn
+
+if __name__ == "__main__":
+    print(f"{'Locations':<11} {'Buckets':<9} {'Readings':<10} {'Loop (ms)':<11} {'Vectorized (ms)':<17} "
+          f"{'Speedup':<9} {'Recall':<8} {'False +'}")
+    print("=" * 88)
+    for locations, buckets in SIZES:
+        frame, injected = make_frame(locations, buckets)
+        start = time.perf_counter()
+        expected = loop_consensus(frame) if locations * buckets <= 24000 else None
+        loop_ms = (time.perf_counter() - start) * 1000 if expected is not None else float('nan')
+
+        start = time.perf_counter()
+        groups, providers, matrix, _ = align(frame)
+        value, median, spread, reported, outliers = robust_consensus(matrix)
+        vector_ms = (time.perf_counter() - start) * 1000
+
+        if expected is not None:
+            got = {((groups[0][g], groups[1][g]), METRICS[m]): value[g, m]
+                   for g in range(len(groups[0])) for m in range(len(METRICS))}
+            assert all(abs(got[key] - want) < 1e-9 for key, want in expected.items()), 'vectorized result differs'
+        # An injected reading is offset in every metric; compare on temperature
+        flagged = outliers[:, :, 0].reshape(-1)
+        recall = (flagged & injected).sum() / max(injected.sum(), 1)
+        print(f"{locations:<11} {buckets:<9} {len(frame):<10} {loop_ms:<11.1f} {vector_ms:<17.1f} "
+              f"{loop_ms / vector_ms:<9.1f} {recall:<8.1%} {(flagged & ~injected).sum()}")
+
+    # End to end through SQLite: read the cycle, combine, write consensus_observations
+    locations, buckets = SIZES[1]
+    frame, _ = make_frame(locations, buckets)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = populate(os.path.join(tmp, 'weather_data.db'), frame)
+        start = time.perf_counter()
+        written = update_consensus(conn)
+        elapsed = time.perf_counter() - start
+        print(f"\nupdate_consensus: {len(frame)} readings -> {written} consensus rows in {elapsed * 1000:.0f} ms")
+        conn.close()
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from fetch_engine import fetch_providers
+from stub_server import start_stub_server
+
+PROVIDERS = ['nws', 'openmeteo', 'openweathermap', 'weatherapi', 'weatherstack']
+LOCATION_COUNTS = [5, 15, 50, 100]
+LATENCY = 0.1  # Simulated round-trip per request in seconds
+
+def fetch_json(url, latitude, longitude):
+    response = requests.get(f'{url}?latitude={latitude}&longitude={longitude}')
+    return response.json()
+
+def make_jobs(base_url, count):
+    return {f'location-{i}': (base_url, 47.6 + i * 0.001, -122.3) for i in range(count)}
+
+def run_sequential(base_url, count):
+    jobs = make_jobs(base_url, count)
+    start = time.perf_counter()
+    for provider in PROVIDERS:
+        for args in jobs.values():
+            fetch_json(*args)
+    return time.perf_counter() - start
+
+def run_concurrent(base_url, count):
+    jobs = make_jobs(base_url, count)
+    start = time.perf_counter()
+    fetch_providers({provider: (fetch_json, jobs) for provider in PROVIDERS})
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    server, base_url = start_stub_server(latency=LATENCY)
+    print(f"{'Locations':<12} {'Requests':<10} {'Sequential (s)':<16} {'Concurrent (s)':<16} {'Speedup'}")
+    print("=" * 66)
+    for count in LOCATION_COUNTS:
+        sequential = run_sequential(base_url, count)
+        concurrent = run_concurrent(base_url, count)
+        print(f"{count:<12} {count * len(PROVIDERS):<10} {sequential:<16.2f} {concurrent:<16.2f} {sequential / concurrent:.1f}x")
+    server.shutdown()
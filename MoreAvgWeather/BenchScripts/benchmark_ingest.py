@@ -0,0 +1,52 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from ingest_writer import write_observations
+
+# Layout and statement used by the scrapers before the batched writer
+LEGACY_CREATE = '''CREATE TABLE IF NOT EXISTS weather_data (
+                    id INTEGER PRIMARY KEY,
+                    location TEXT,
+                    temperature TEXT,
+                    wind_speed TEXT,
+                    humidity TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                  )'''
+LEGACY_INSERT = '''INSERT INTO weather_data (location, temperature, wind_speed, humidity)
+                   VALUES (?, ?, ?, ?)'''
+
+ROW_COUNTS = [15, 75, 1000, 10000]
+
+def make_observations(count):
+    return [(f'location-{i % 15}', 10.0 + i % 7, 3.0 + i % 5, 60.0 + i % 30) for i in range(count)]
+
+def store_per_row(db_name, observations):
+    """The previous scraper path: connect, create, insert and commit once per row."""
+    for location, temperature, wind_speed, humidity in observations:
+        conn = sqlite3.connect(db_name)
+        cursor = conn.cursor()
+        cursor.execute(LEGACY_CREATE)
+        cursor.execute(LEGACY_INSERT, (location, temperature, wind_speed, humidity))
+        conn.commit()
+        conn.close()
+
+def time_run(write, count):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'weather_data.db')
+        observations = make_observations(count)
+        start = time.perf_counter()
+        write(db_name, observations)
+        return count / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    print(f"{'Rows':<10} {'Per-row (rows/s)':<20} {'Batched (rows/s)':<20} {'Speedup'}")
+    print("=" * 60)
+    for count in ROW_COUNTS:
+        per_row = time_run(store_per_row, count)
+        batched = time_run(lambda db_name, rows: write_observations(db_name, 'openmeteo', rows), count)
+        print(f"{count:<10} {per_row:<20.0f} {batched:<20.0f} {batched / per_row:.1f}x")
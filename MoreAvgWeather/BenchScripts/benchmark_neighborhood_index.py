@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CheckScripts'))
+
+from neighborhood_index import NEIGHBORHOODS_URL, NeighborhoodIndex
+
+# Synthetic points spread over the layer's extent, and the subset timed with the old loop
+POINT_COUNT = 100000
+LEGACY_POINTS = 2000
+# Seattle's extent, used for the synthetic fallback layer
+EXTENT = (-122.44, 47.49, -122.24, 47.74)
+
+def legacy_point_in_polygon(point, polygon):
+    """The previous pure-Python ray cast (exterior ring only)."""
+    x, y = point
+    n = len(polygon)
+    inside = False
+    p1x, p1y = polygon[0]
+    for i in range(n + 1):
+        p2x, p2y = polygon[i % n]
+        if y > min(p1y, p2y):
+            if y <= max(p1y, p2y):
+                if x <= max(p1x, p2x):
+                    if p1y != p2y:
+                        xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+                    if p1x == p2x or x <= xinters:
+                        inside = not inside
+        p1x, p1y = p2x, p2y
+    return inside
+
+def legacy_locate(features, point):
+    for feature in features:
+        geometry = feature['geometry']
+        polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+        for polygon in polygons:
+            if legacy_point_in_polygon(point, polygon[0]):
+                return feature['properties']['S_HOOD']
+    return 'Unknown'
+
+def ring(cx, cy, radius, vertices, rng):
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radii = radius * (0.75 + 0.25 * rng.random(vertices))
+    points = np.column_stack([cx + radii * np.cos(angles), cy + radii * np.sin(angles)]).tolist()
+    return points + [points[0]]
+
+def synthetic_layer(cols=10, rows=12, vertices=300, seed=0):
+    """Jagged neighborhoods on a grid over Seattle; every third has a hole, every fifth is a MultiPolygon."""
+    rng = np.random.default_rng(seed)
+    width = (EXTENT[2] - EXTENT[0]) / cols
+    height = (EXTENT[3] - EXTENT[1]) / rows
+    features = []
+    for i in range(cols * rows):
+        cx = EXTENT[0] + (i % cols + 0.5) * width
+        cy = EXTENT[1] + (i // cols + 0.5) * height
+        radius = min(width, height) / 2
+        polygon = [ring(cx, cy, radius, vertices, rng)]
+        if i % 3 == 0:
+            polygon.append(ring(cx, cy, radius / 3, vertices // 4, rng)[::-1])
+        geometry = {'type': 'Polygon', 'coordinates': polygon}
+        if i % 5 == 0:
+            island = ring(cx + width / 2, cy + height / 2, radius / 5, vertices // 4, rng)
+            geometry = {'type': 'MultiPolygon', 'coordinates': [polygon, [island]]}
+        features.append({'properties': {'S_HOOD': f'Neighborhood {i}'}, 'geometry': geometry})
+    return {'features': features}
+
+def load_layer(path=None):
+    """The real layer from a file or the ArcGIS service, or the synthetic one if neither is available."""
+    if path:
+        with open(path) as f:
+            return json.load(f), path
+    try:
+        return requests.get(NEIGHBORHOODS_URL, timeout=30).json(), 'ArcGIS service'
+    except requests.RequestException as e:
+        print(f'Could not download the neighborhood layer ({type(e).__name__}); using a synthetic layer')
+        return synthetic_layer(), 'synthetic'
+
+if __name__ == "__main__":
+    data, source = load_layer(sys.argv[1] if len(sys.argv) > 1 else None)
+    features = [feature for feature in data['features']
+                if feature.get('geometry') and feature['geometry']['type'] in ('Polygon', 'MultiPolygon')]
+    vertex_count = sum(len(ring) for feature in features
+                       for polygon in ([feature['geometry']['coordinates']] if feature['geometry']['type'] == 'Polygon'
+                                       else feature['geometry']['coordinates'])
+                       for ring in polygon)
+
+    start = time.perf_counter()
+    index = NeighborhoodIndex(features)
+    build = time.perf_counter() - start
+    extent = index.extent
+    rng = np.random.default_rng(1)
+    lons = rng.uniform(extent[0], extent[2], POINT_COUNT)
+    lats = rng.uniform(extent[1], extent[3], POINT_COUNT)
+
+    start = time.perf_counter()
+    names = index.locate(lons, lats)
+    indexed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_names = [legacy_locate(features, point) for point in zip(lons[:LEGACY_POINTS], lats[:LEGACY_POINTS])]
+    legacy = (time.perf_counter() - start) * POINT_COUNT / LEGACY_POINTS
+    # The old loop ignored holes, so it disagrees exactly where points fall in one
+    differing = sum(a != b for a, b in zip(names[:LEGACY_POINTS], legacy_names))
+
+    print(f"Layer: {source}, {len(features)} neighborhoods, {vertex_count} vertices; {POINT_COUNT} points")
+    print(f"{'Method':<28} {'Seconds':<12} {'Points/s'}")
+    print("=" * 52)
+    print(f"{'Linear ray cast (est.)':<28} {legacy:<12.2f} {POINT_COUNT / legacy:.0f}")
+    print(f"{'Grid index + vectorized':<28} {indexed:<12.3f} {POINT_COUNT / indexed:.0f}")
+    print(f"Index build: {build * 1000:.1f} ms; speedup {legacy / indexed:.0f}x; "
+          f"{differing} of {LEGACY_POINTS} sampled points classified differently (holes)")
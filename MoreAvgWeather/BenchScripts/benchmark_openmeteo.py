@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+import http_transport
+from fetch_engine import fetch_providers
+from ingest_writer import write_observations
+from locations import neighborhoods_coordinates
+from weather_providers import PROVIDERS, collect, store
+from stub_server import start_stub_server
+
+LATENCY = 0.1     # Simulated round-trip per request in seconds
+HOURS = 7 * 24    # Open-Meteo's default forecast horizon
+CYCLES = 3
+
+def location_body(index, start=None):
+    # Start at the current hour so the forecast rows are not pruned as past hours
+    start = int(time.time()) // 3600 * 3600 if start is None else start
+    return {
+        "latitude": 47.6, "longitude": -122.3, "location_id": index,
+        "hourly_units": {"time": "unixtime", "temperature_2m": "°C",
+                         "wind_speed_10m": "km/h", "relative_humidity_2m": "%"},
+        "hourly": {
+            "time": [start + hour * 3600 for hour in range(HOURS)],
+            "temperature_2m": [round(10 + (hour % 24) * 0.3, 1) for hour in range(HOURS)],
+            "wind_speed_10m": [round(5 + (hour % 7) * 1.1, 1) for hour in range(HOURS)],
+            "relative_humidity_2m": [60 + hour % 30 for hour in range(HOURS)],
+        },
+    }
+
+# Legacy scraper: one request per neighborhood, keeping only the first hour
+def legacy_scrape_weather_data(base_url, latitude, longitude):
+    url = f'{base_url}?latitude={latitude}&longitude={longitude}&hourly=temperature_2m,wind_speed_10m,relative_humidity_2m'
+    data = http_transport.get('openmeteo', url).json()
+    return data['hourly']['temperature_2m'][0], data['hourly']['wind_speed_10m'][0], data['hourly']['relative_humidity_2m'][0]
+
+def run_legacy(base_url, db_name):
+    jobs = {location: (base_url, coords['latitude'], coords['longitude'])
+            for location, coords in neighborhoods_coordinates.items()}
+    results = fetch_providers({'openmeteo': (legacy_scrape_weather_data, jobs)})['openmeteo']
+    observations = [(location, *result) for location, result in results.items()]
+    return write_observations(db_name, 'openmeteo', observations)
+
+def run_batched(base_url, db_name):
+    PROVIDERS['openmeteo'].url = base_url
+    collected = collect(['openmeteo'])
+    store(collected, db_name)
+    observations, forecasts = collected['openmeteo']
+    return len(observations) + len(forecasts)
+
+def time_cycles(run, base_url):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'weather_data.db')
+        start = time.perf_counter()
+        for _ in range(CYCLES):
+            rows = run(base_url, db_name)
+        return (time.perf_counter() - start) / CYCLES, rows
+
+if __name__ == "__main__":
+    count = len(neighborhoods_coordinates)
+    single_body = json.dumps(location_body(0)).encode()
+    batched_body = json.dumps([location_body(i) for i in range(count)]).encode()
+    single_server, single_url = start_stub_server(latency=LATENCY, body=single_body)
+    batched_server, batched_url = start_stub_server(latency=LATENCY, body=batched_body)
+
+    legacy_seconds, legacy_rows = time_cycles(run_legacy, single_url)
+    batched_seconds, batched_rows = time_cycles(run_batched, batched_url)
+    legacy_bytes = count * len(single_body)
+
+    print(f"{'Mode':<22} {'Requests':<10} {'KB/cycle':<10} {'Rows/cycle':<12} {'Rows/KB':<9} {'Seconds/cycle'}")
+    print("=" * 78)
+    print(f"{'Per location, [0]':<22} {count:<10} {legacy_bytes / 1024:<10.1f} {legacy_rows:<12} "
+          f"{legacy_rows / (legacy_bytes / 1024):<9.2f} {legacy_seconds:.3f}")
+    print(f"{'Batched, full series':<22} {1:<10} {len(batched_body) / 1024:<10.1f} {batched_rows:<12} "
+          f"{batched_rows / (len(batched_body) / 1024):<9.2f} {batched_seconds:.3f}")
+    single_server.shutdown()
+    batched_server.shutdown()
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from weather_providers import JsonProvider, PROVIDERS, register, collect
+from stub_server import start_stub_server
+
+LOCATION_COUNTS = [15, 100, 1000, 2000]
+PROVIDER_COUNTS = [1, 5]
+LATENCY = 0.02  # Simulated round-trip per request in seconds
+
+BODY = json.dumps({"current": {"temp_c": 11.2, "wind_kph": 7.4, "humidity": 81}}).encode()
+
+class StubProvider(JsonProvider):
+    """A WeatherAPI-shaped provider pointed at the stub server, without a real quota."""
+
+    wind_unit = 'km/h'
+    fields = (('current', 'temp_c'), ('current', 'wind_kph'), ('current', 'humidity'))
+    quota = (1000000, 1, 1000000)
+    concurrency = 32
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url
+
+    def build_request(self, locations):
+        (coords,) = locations.values()
+        return self.url, {'q': f"{coords['latitude']},{coords['longitude']}"}
+
+def make_locations(count):
+    return {f'location-{i}': {'latitude': 47.5 + (i % 100) * 0.002, 'longitude': -122.4 + (i // 100) * 0.002}
+            for i in range(count)}
+
+if __name__ == "__main__":
+    server, base_url = start_stub_server(latency=LATENCY, body=BODY)
+    names = [register(StubProvider(f'stub-{i}', base_url)).name for i in range(max(PROVIDER_COUNTS))]
+    print(f"{'Providers':<11} {'Locations':<11} {'Requests':<10} {'Seconds':<10} {'Rows/sec':<10} {'Missing'}")
+    print("=" * 62)
+    for provider_count in PROVIDER_COUNTS:
+        for count in LOCATION_COUNTS:
+            locations = make_locations(count)
+            start = time.perf_counter()
+            collected = collect(names[:provider_count], locations)
+            elapsed = time.perf_counter() - start
+            rows = sum(len(observations) for observations, _ in collected.values())
+            missing = sum(1 for observations, _ in collected.values() for row in observations if row[1] is None)
+            print(f"{provider_count:<11} {count:<11} {provider_count * count:<10} {elapsed:<10.2f} "
+                  f"{rows / elapsed:<10.0f} {missing}")
+    for name in names:
+        PROVIDERS.pop(name)
+    server.shutdown()
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from ingest_writer import connect
+from weather_schema import CREATE_WEATHER_DATA, create_indexes
+from weather_queries import observations, latest_observation
+
+# Table sizes to compare; lookups should stay flat as the table grows
+ROW_COUNTS = [100000, 1000000, 10000000]
+PROVIDERS = ['nws', 'openmeteo', 'openweathermap', 'weatherapi', 'weatherstack']
+LOCATIONS = 15
+INTERVAL = 900  # One scrape cycle every 15 minutes
+START = 1700000000
+REPEATS = 50
+
+def populate(conn, count):
+    """Fill weather_data with count synthetic rows: every provider and location per cycle."""
+    per_cycle = len(PROVIDERS) * LOCATIONS
+    providers = ', '.join(f"({i}, '{name}')" for i, name in enumerate(PROVIDERS))
+    with conn:
+        conn.execute(CREATE_WEATHER_DATA)
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {count - 1}),
+            providers(i, name) AS (VALUES {providers})
+            INSERT INTO weather_data (provider, location, timestamp, temperature, wind_speed, humidity)
+            SELECT (SELECT name FROM providers WHERE i = n % {len(PROVIDERS)}),
+                   'location-' || ((n / {len(PROVIDERS)}) % {LOCATIONS}),
+                   {START} + (n / {per_cycle}) * {INTERVAL},
+                   10 + (n % 13), 2 + (n % 7), 50 + (n % 40)
+            FROM seq""")
+    with conn:
+        create_indexes(conn)
+    return START + (count // per_cycle) * INTERVAL
+
+def time_query(query, *args):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        query(*args)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or ROW_COUNTS
+    print(f"{'Rows':<12} {'Latest (ms)':<14} {'Day range (ms)':<16} {'Day range, provider (ms)':<26} {'Unindexed day (ms)'}")
+    print("=" * 90)
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = connect(os.path.join(tmp, 'weather_data.db'))
+            end = populate(conn, count)
+            day_start = end - 86400
+            latest = time_query(latest_observation, conn, 'location-3')
+            day = time_query(observations, conn, 'location-3', day_start, end)
+            day_provider = time_query(observations, conn, 'location-3', day_start, end, 'nws')
+            # The same range query forced to scan, i.e. the behaviour before the indexes
+            scan_start = time.perf_counter()
+            conn.execute("SELECT * FROM weather_data NOT INDEXED WHERE location = ? AND timestamp >= ? AND timestamp < ?",
+                         ('location-3', day_start, end)).fetchall()
+            scan = (time.perf_counter() - scan_start) * 1000
+            print(f"{count:<12} {latest:<14.3f} {day:<16.3f} {day_provider:<26.3f} {scan:.1f}")
+            conn.close()
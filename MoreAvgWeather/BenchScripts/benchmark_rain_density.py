@@ -0,0 +1,78 @@
+import glob
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CheckScripts'))
+
+from rain_analysis import RAIN_THRESHOLD, RainAnalyzer, rain_density
+from benchmark_camera_pipeline import make_frame
+
+# Analysis settings compared with the full-frame score: (label, scale, roi)
+MODES = [
+    ('scale 1', 1, None),
+    ('scale 2', 2, None),
+    ('scale 4', 4, None),
+    ('scale 8', 8, None),
+    ('scale 2, road ROI', 2, [(0.0, 0.4, 1.0, 0.6)]),  # Lower 60%: below the skyline
+]
+SYNTHETIC_FRAMES = 100
+REPEATS = 3
+
+def load_corpus(directory=None):
+    """Encoded frames from a directory of saved camera images, or synthetic frames.
+
+    A directory written by replay_server.record_responses() for camera image
+    routes works as a corpus. Synthetic frames are uniform noise with streaks,
+    so they time the modes but say little about how well the scores agree.
+    """
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, '*.jp*g')) + glob.glob(os.path.join(directory, '*.png')))
+        frames = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                frames.append(f.read())
+        return frames, directory
+    return [make_frame(seed) for seed in range(SYNTHETIC_FRAMES)], 'synthetic'
+
+def full_frame(data):
+    """The current score: full-resolution colour decode, then rain_density."""
+    return rain_density(cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR))
+
+def time_scores(score, frames):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        scores = [score(data) for data in frames]
+        best = min(best, time.perf_counter() - start)
+    return np.array(scores, dtype=np.float64), best / len(frames) * 1000
+
+def correlation(a, b):
+    # Undefined for fewer than two frames or when either set of scores is constant
+    if len(a) < 2 or np.ptp(a) == 0 or np.ptp(b) == 0:
+        return float('nan')
+    return np.corrcoef(a, b)[0, 1]
+
+def rank_correlation(a, b):
+    if len(a) < 2 or np.ptp(a) == 0 or np.ptp(b) == 0:
+        return float('nan')
+    return correlation(np.argsort(np.argsort(a)), np.argsort(np.argsort(b)))
+
+if __name__ == "__main__":
+    frames, source = load_corpus(sys.argv[1] if len(sys.argv) > 1 else None)
+    reference, reference_ms = time_scores(full_frame, frames)
+    reference_rain = reference > RAIN_THRESHOLD
+    print(f"OpenCV {cv2.__version__}. Corpus: {source}, {len(frames)} frames, "
+          f"{reference_rain.mean():.1%} above RAIN_THRESHOLD ({RAIN_THRESHOLD}) at full frame")
+    print(f"{'Mode':<22} {'ms/frame':<10} {'Speedup':<9} {'Pearson':<9} {'Spearman':<10} {'Rain agreement'}")
+    print("=" * 76)
+    print(f"{'full frame (current)':<22} {reference_ms:<10.2f} {'1.0x':<9} {1.0:<9.3f} {1.0:<10.3f} {1.0:.1%}")
+    for label, scale, roi in MODES:
+        analyzer = RainAnalyzer(scale)
+        scores, ms = time_scores(lambda data: analyzer.analyze(data, roi), frames)
+        pearson = correlation(reference, scores)
+        spearman = rank_correlation(reference, scores)
+        agreement = np.mean((scores > RAIN_THRESHOLD) == reference_rain)
+        print(f"{label:<22} {ms:<10.2f} {f'{reference_ms / ms:.1f}x':<9} {pearson:<9.3f} {spearman:<10.3f} {agreement:.1%}")
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+import tracemalloc
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from ingest_writer import connect
+import rain_model
+import basic_rain_prediction
+from benchmark_rain_model import populate
+
+# Peak Python-side memory of a full retrain should stay flat as the table grows
+ROW_COUNTS = [100000, 300000, 1000000]
+# Fail if the streaming peak at the largest count exceeds this multiple of the peak at the smallest.
+# The smallest count should be at least a couple of chunks (basic_rain_prediction.CHUNK_SIZE).
+MAX_GROWTH = 1.5
+
+def whole_table(conn):
+    """The previous stage up to prediction: one DataFrame and float64 copies of the whole table."""
+    df = pd.read_sql_query(f"SELECT id, {', '.join(rain_model.FEATURES)} FROM weather_data", conn)
+    X = SimpleImputer(strategy='mean').fit_transform(df[rain_model.FEATURES])
+    X = StandardScaler().fit_transform(X)
+    y = rain_model.make_labels(df['barometric_pressure'])
+    df['precipitation_percentage'] = LogisticRegression(max_iter=1000).fit(X, y).predict_proba(X)[:, 1] * 100
+
+def peak_mb(func, conn):
+    tracemalloc.start()
+    func(conn)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or ROW_COUNTS
+    results = []
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            rain_model.MODEL_DIR = os.path.join(tmp, 'models')
+            conn = connect(os.path.join(tmp, 'weather_data.db'))
+            populate(conn, count)
+            legacy = peak_mb(whole_table, conn)
+            streaming = peak_mb(basic_rain_prediction.full_retrain, conn)
+            conn.close()
+        results.append((count, legacy, streaming))
+    print(f"{'Rows':<10} {'Whole table (MB)':<18} {'Streaming (MB)'}")
+    print("=" * 44)
+    for count, legacy, streaming in results:
+        print(f"{count:<10} {legacy:<18.1f} {streaming:.1f}")
+    smallest, largest = min(results), max(results)
+    growth = largest[2] / smallest[2] if smallest[2] else float('inf')
+    if growth > MAX_GROWTH:
+        print(f"\nFAIL: streaming peak grew {growth:.2f}x from {smallest[0]} to {largest[0]} rows "
+              f"(limit {MAX_GROWTH}x)")
+        sys.exit(1)
+    print(f"\nOK: streaming peak grew {growth:.2f}x from {smallest[0]} to {largest[0]} rows (limit {MAX_GROWTH}x)")
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from ingest_writer import connect
+from weather_schema import CREATE_WEATHER_DATA, SCHEMA_VERSION, create_indexes
+import rain_model
+import basic_rain_prediction
+
+# Rows already in the table, and rows added by each simulated 15-minute cycle
+HISTORY_ROWS = [10000, 100000]
+CYCLE_ROWS = 75
+CYCLES = 5
+
+def populate(conn, count, first=0):
+    """Append count synthetic, fully-populated rows with unscored precipitation."""
+    with conn:
+        conn.execute(CREATE_WEATHER_DATA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT {first} UNION ALL SELECT n + 1 FROM seq WHERE n < {first + count - 1})
+            INSERT INTO weather_data (provider, location, timestamp, temperature, wind_speed, humidity, barometric_pressure)
+            SELECT 'openmeteo', 'location-' || (n % 15), 1700000000 + (n / 15) * 900,
+                   5 + (n % 17), 1 + (n % 9), 40 + (n % 55), 995 + ((n * 7919) % 300) / 10.0
+            FROM seq""")
+    with conn:
+        create_indexes(conn)
+
+def run_cycles(conn, history, full):
+    """Average seconds per cycle over CYCLES cycles of new rows."""
+    elapsed = 0.0
+    for cycle in range(CYCLES):
+        populate(conn, CYCLE_ROWS, first=history + cycle * CYCLE_ROWS)
+        start = time.perf_counter()
+        basic_rain_prediction.predict_precipitation(conn, full=full)
+        elapsed += time.perf_counter() - start
+    return elapsed / CYCLES
+
+if __name__ == "__main__":
+    histories = [int(arg) for arg in sys.argv[1:]] or HISTORY_ROWS
+    results = []
+    for history in histories:
+        with tempfile.TemporaryDirectory() as tmp:
+            rain_model.MODEL_DIR = os.path.join(tmp, 'models')
+            conn = connect(os.path.join(tmp, 'weather_data.db'))
+            populate(conn, history)
+            basic_rain_prediction.predict_precipitation(conn, full=True)
+            incremental = run_cycles(conn, history, full=False)
+            full = run_cycles(conn, history + CYCLES * CYCLE_ROWS, full=True)
+            # Accuracy of the incremental model against a fresh full fit
+            basic_rain_prediction.predict_precipitation(conn, full=True)
+            run_cycles(conn, history + 2 * CYCLES * CYCLE_ROWS, full=False)
+            report = basic_rain_prediction.compare_models(conn)
+            conn.close()
+        results.append((history, full, incremental, report))
+    print(f"{'Rows':<10} {'Full cycle (s)':<16} {'Incremental cycle (s)':<23} {'Speedup':<9} "
+          f"{'Full acc':<10} {'Incremental acc'}")
+    print("=" * 84)
+    for history, full, incremental, report in results:
+        print(f"{history:<10} {full:<16.3f} {incremental:<23.3f} {full / incremental:<9.1f} "
+              f"{report['full']['accuracy']:<10.4f} {report['incremental']['accuracy']:.4f}")
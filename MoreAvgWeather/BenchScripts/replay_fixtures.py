@@ -0,0 +1,112 @@
+import json
+import struct
+import time
+import zlib
+import numpy as np
+from benchmark_neighborhood_index import synthetic_layer
+from replay_server import Recording
+
+# Hours in each Open-Meteo location's series (its default 7-day forecast)
+FORECAST_HOURS = 7 * 24
+# Camera frames are grayscale noise with streaks; small enough to generate quickly
+FRAME_SIZE = (240, 320)
+FRAME_VARIANTS = 8
+# EPSG:2285 (WA North, US feet) box around Seattle for synthetic camera positions
+CAMERA_EXTENT = (1250000, 190000, 1295000, 270000)
+
+NWS_HTML = '''<html><body>
+<div id="current_conditions-summary"><p class="myforecast-current-lrg">52&deg;F</p></div>
+<table><tr><td class="text-right">Humidity</td><td>81%</td></tr>
+<tr><td class="text-right">Wind Speed</td><td>S 12 mph</td></tr></table>
+</body></html>'''
+
+def _json(data):
+    return json.dumps(data).encode()
+
+def open_meteo_body(query, path, start=None):
+    """One hourly series per requested coordinate, as Open-Meteo batches them.
+
+    The series starts at the current hour unless start is given, so the
+    forecast hours are in the future and survive write_forecasts' pruning.
+    """
+    count = len(query.get('latitude', ['0'])[0].split(','))
+    start = int(time.time()) // 3600 * 3600 if start is None else start
+    hours = np.arange(FORECAST_HOURS)
+    def location(index):
+        return {"latitude": 47.6, "longitude": -122.3, "location_id": index,
+                "hourly": {"time": (start + hours * 3600).tolist(),
+                           "temperature_2m": np.round(10 + 5 * np.sin(hours / 24 * 2 * np.pi), 1).tolist(),
+                           "wind_speed_10m": np.round(8 + hours % 7, 1).tolist(),
+                           "relative_humidity_2m": (60 + hours % 30).tolist()}}
+    if count == 1:
+        data = location(0)
+        del data['location_id']
+        return _json(data)
+    return _json([location(i) for i in range(count)])
+
+def elevation_body(query, path):
+    """One result per pipe-separated location, in request order."""
+    points = query.get('locations', [''])[0].split('|')
+    return _json({"status": "OK", "results": [
+        {"elevation": 20.0 + 7.5 * i, "location": dict(zip(('lat', 'lng'), map(float, point.split(','))))}
+        for i, point in enumerate(points) if point]})
+
+def png(gray):
+    """Encode a uint8 grayscale array as PNG with only the standard library."""
+    height, width = gray.shape
+    raw = b''.join(b'\x00' + gray[row].tobytes() for row in range(height))
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 6)) + chunk(b'IEND', b''))
+
+def camera_frames(seed=0):
+    """A few distinct frames; cameras cycle through them."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(FRAME_VARIANTS):
+        gray = rng.integers(60, 120, FRAME_SIZE, dtype=np.uint8)
+        # Bright vertical streaks, like rain in front of the lens
+        for x, y in zip(rng.integers(0, FRAME_SIZE[1], 150), rng.integers(0, FRAME_SIZE[0] - 20, 150)):
+            gray[y:y + 20, x] = 230
+        frames.append(png(gray))
+    return frames
+
+def cameras_geojson(base_url, count, seed=0):
+    """Camera features in EPSG:2285 whose image URLs point back at the replay server."""
+    rng = np.random.default_rng(seed)
+    xs = rng.uniform(CAMERA_EXTENT[0], CAMERA_EXTENT[2], count)
+    ys = rng.uniform(CAMERA_EXTENT[1], CAMERA_EXTENT[3], count)
+    return {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [float(x), float(y)]},
+         "properties": {"URL": f"{base_url}/cameras/images/{i}thAve_Street{i}_NS.png"}}
+        for i, (x, y) in enumerate(zip(xs, ys))]}
+
+def synthetic_routes(base_url, cameras=50):
+    """Replay routes for every external source the pipeline calls, generated locally.
+
+    Routes are path prefixes on the replay server; run_benchmarks points each
+    module's URL at base_url + route.
+    """
+    frames = camera_frames()
+
+    def camera_image(query, path):
+        return frames[zlib.crc32(path.encode()) % len(frames)]
+
+    return {
+        '/nws': Recording(NWS_HTML.encode(), 'text/html; charset=utf-8'),
+        '/openweathermap': Recording(_json({"main": {"temp": 11.2, "humidity": 81}, "wind": {"speed": 3.1}})),
+        '/weatherapi': Recording(_json({"current": {"temp_c": 11.0, "wind_kph": 11.2, "humidity": 80}})),
+        '/weatherstack': Recording(_json({"current": {"temperature": 11, "wind_speed": 11, "humidity": 82}})),
+        '/openmeteo': Recording(open_meteo_body),
+        '/tomorrowio': Recording(_json({"data": {"timelines": [
+            {"timestep": "1h", "intervals": [{"startTime": "2024-01-01T00:00:00Z",
+                                              "values": {"precipitationProbability": 35}}]}]}})),
+        '/elevation': Recording(elevation_body),
+        '/cameras.geojson': Recording(_json(cameras_geojson(base_url, cameras)), 'application/geo+json',
+                                      headers={'ETag': '"cameras-v1"'}),
+        '/neighborhoods.geojson': Recording(_json(synthetic_layer(vertices=60)), 'application/geo+json',
+                                            headers={'ETag': '"neighborhoods-v1"'}),
+        # Every frame carries an ETag, so the frame cache's conditional GETs get 304s on reruns
+        '/cameras/images': Recording(camera_image, 'image/png', headers={'ETag': '"frame-v1"'}),
+    }
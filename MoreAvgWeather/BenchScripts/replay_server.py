@@ -0,0 +1,121 @@
+import json
+import mimetypes
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+import requests
+from stub_server import StubServer
+
+# A canned response. body is bytes, or a function of (query, path) returning
+# bytes for responses that depend on the request (e.g. batched locations).
+# An ETag in headers is honoured for If-None-Match requests with a 304.
+Recording = namedtuple('Recording', ['body', 'content_type', 'status', 'headers'],
+                       defaults=['application/json', 200, None])
+
+# Index of a recordings directory: route -> {"file", "content_type", "status"}
+MANIFEST = 'manifest.json'
+
+def find_route(routes, path):
+    """The longest route that is a prefix of path, or None."""
+    matches = [route for route in routes if path == route or path.startswith(route.rstrip('/') + '/')]
+    return max(matches, key=len) if matches else None
+
+def make_replay_handler(routes, latency, latencies):
+    """Build a handler class that serves routes after the route's latency."""
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            route = find_route(routes, url.path)
+            time.sleep(latencies.get(route, latency))
+            if route is None:
+                self.reply(404, 'text/plain', b'No recording for this path')
+                return
+            recording = routes[route]
+            headers = recording.headers or {}
+            if 'ETag' in headers and self.headers.get('If-None-Match') == headers['ETag']:
+                self.reply(304, recording.content_type, b'', headers)
+                return
+            body = recording.body(parse_qs(url.query), url.path) if callable(recording.body) else recording.body
+            self.reply(recording.status, recording.content_type, body, headers)
+
+        def reply(self, status, content_type, body, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+def start_replay_server(routes, latency=0.05, latencies=None, port=0):
+    """Serve routes (path prefix -> Recording) in the background and return (server, base_url).
+
+    latency is the simulated round-trip for every request; latencies
+    overrides it for individual routes. The routes dict is read per request,
+    so it can be filled in once base_url is known.
+    """
+    server = StubServer(('127.0.0.1', port), make_replay_handler(routes, latency, latencies or {}))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+def record_responses(directory, urls, timeout=60):
+    """Capture live responses for later replay; urls maps a route to the live URL to fetch.
+
+    Needs the network and whatever API keys the URLs carry. Returns the
+    manifest written to the directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    for route, url in urls.items():
+        response = requests.get(url, timeout=timeout)
+        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+        extension = mimetypes.guess_extension(content_type.split(';')[0].strip()) or '.bin'
+        filename = route.strip('/').replace('/', '_') + extension
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(response.content)
+        manifest[route] = {'file': filename, 'content_type': content_type, 'status': response.status_code}
+        print(f'Recorded {route}: HTTP {response.status_code}, {len(response.content)} bytes')
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_recordings(directory):
+    """Routes from a directory written by record_responses()."""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    routes = {}
+    for route, entry in manifest.items():
+        with open(os.path.join(directory, entry['file']), 'rb') as f:
+            routes[route] = Recording(f.read(), entry.get('content_type', 'application/json'), entry.get('status', 200))
+    return routes
+
+if __name__ == "__main__":
+    # Usage: replay_server.py [recordings_dir]   (synthetic responses without one)
+    from replay_fixtures import synthetic_routes
+    routes = {}
+    server, base_url = start_replay_server(routes)
+    routes.update(load_recordings(sys.argv[1]) if len(sys.argv) > 1 else synthetic_routes(base_url))
+    print(f'Replay server listening on {base_url}')
+    for route in sorted(routes):
+        print(f'  {base_url}{route}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
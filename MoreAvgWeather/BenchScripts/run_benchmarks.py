@@ -0,0 +1,220 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'RainScripts'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'CheckScripts'))
+
+import http_transport
+import edit_with_altitude
+import edit_with_barometer
+import basic_rain_prediction
+import refine_dataset
+import weather_consensus
+import weather_rollups
+from ingest_writer import connect
+from instrumentation import PROFILE_DIR, profiled, write_metrics
+from weather_providers import PROVIDERS, collect, store
+from replay_fixtures import synthetic_routes
+from replay_server import load_recordings, start_replay_server
+from synthetic_db import generate, location_names
+
+# Timing reports are appended here as one JSON object per line, like pipeline_timings.jsonl
+REPORT_FILE = 'benchmark_report.jsonl'
+STAGES = ['generate', 'scrape', 'tomorrowio', 'ingest', 'altitude', 'barometer', 'predict',
+          'consensus', 'rollups', 'cameras', 'cameras_cached']
+
+def point_at(base_url):
+    """Send every external call the pipeline makes to the replay server instead."""
+    for name, provider in PROVIDERS.items():
+        provider.url = f'{base_url}/{name}'
+    edit_with_altitude.ELEVATION_API_URL = f'{base_url}/elevation'
+    refine_dataset.TOMORROWIO_URL = f'{base_url}/tomorrowio'
+
+def lift_quotas():
+    """Remove provider rate limits so the benchmark measures our code rather than the quotas."""
+    for name in list(http_transport.PROVIDER_QUOTAS) + list(PROVIDERS):
+        http_transport.PROVIDER_QUOTAS[name] = (1000000, 1, 1000000)
+    http_transport._buckets.clear()
+
+def count_rows(conn, where):
+    return conn.execute(f"SELECT COUNT(*) FROM weather_data WHERE {where}").fetchone()[0]
+
+class Suite:
+    """Runs each stage against a synthetic database and the replay server, timing each one."""
+
+    def __init__(self, workdir, base_url, args):
+        self.workdir = workdir
+        self.base_url = base_url
+        self.args = args
+        self.db_path = os.path.join(workdir, 'weather_data.db')
+        self.conn = None
+        self.collected = None
+        self.locations = {name: {'latitude': 47.5 + (i % 50) * 0.005, 'longitude': -122.45 + (i // 50) * 0.005}
+                          for i, name in enumerate(location_names(args.locations))}
+
+    def generate(self):
+        rows = generate(self.db_path, self.args.locations, self.args.days)
+        self.conn = connect(self.db_path)
+        return rows
+
+    def scrape(self):
+        self.collected = collect(None, self.locations)
+        return sum(len(observations) + len(forecasts) for observations, forecasts in self.collected.values())
+
+    def tomorrowio(self):
+        for coords in self.locations.values():
+            refine_dataset.fetch_tomorrowio_data(coords['latitude'], coords['longitude'])
+        return len(self.locations)
+
+    def ingest(self):
+        store(self.collected, self.db_path, conn=self.conn)
+        return sum(len(observations) + len(forecasts) for observations, forecasts in self.collected.values())
+
+    def altitude(self):
+        before = count_rows(self.conn, 'altitude IS NOT NULL')
+        edit_with_altitude.run_stage(self.conn)
+        return count_rows(self.conn, 'altitude IS NOT NULL') - before
+
+    def barometer(self):
+        before = count_rows(self.conn, 'barometric_pressure IS NOT NULL')
+        edit_with_barometer.run_stage(self.conn)
+        return count_rows(self.conn, 'barometric_pressure IS NOT NULL') - before
+
+    def predict(self):
+        before = count_rows(self.conn, 'precipitation IS NOT NULL')
+        basic_rain_prediction.run_stage(self.conn)
+        return count_rows(self.conn, 'precipitation IS NOT NULL') - before
+
+    def consensus(self):
+        return weather_consensus.update_consensus(self.conn)
+
+    def rollups(self):
+        return weather_rollups.update_rollups(self.conn)
+
+    def cameras(self):
+        # OpenCV and pyproj are only needed here, so the other stages run without them
+        import camera_registry
+        from check_traffic_cameras import check_cameras
+        camera_registry.SOURCES = {'cameras': f'{self.base_url}/cameras.geojson',
+                                   'neighborhoods': f'{self.base_url}/neighborhoods.geojson'}
+        conn = connect(os.path.join(self.workdir, 'rain_data.db'))
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return check_cameras(conn)
+        finally:
+            conn.close()
+
+    def cameras_cached(self):
+        # Second run: the registry is within its TTL and every frame answers 304
+        return self.cameras()
+
+    def run(self, stages, profile=(), profile_dir=PROFILE_DIR):
+        results = {}
+        for stage in stages:
+            start = time.perf_counter()
+            try:
+                with profiled(stage, enabled=stage in profile, directory=profile_dir):
+                    items = getattr(self, stage)()
+                status, error = 'ok', None
+            except ImportError as e:
+                items, status, error = None, 'skipped', str(e)
+            except Exception as e:
+                items, status, error = None, 'failed', f'{type(e).__name__}: {e}'
+            seconds = time.perf_counter() - start
+            results[stage] = {'status': status, 'seconds': round(seconds, 4), 'items': items,
+                              'items_per_second': round(items / seconds, 1) if items and seconds > 0 else None,
+                              'error': error}
+        return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def print_report(report):
+    print(f"{'Stage':<16} {'Status':<9} {'Seconds':<10} {'Items':<10} {'Items/sec':<11} {'Note'}")
+    print("=" * 80)
+    for stage, result in report['stages'].items():
+        items = '' if result['items'] is None else result['items']
+        rate = '' if result['items_per_second'] is None else result['items_per_second']
+        print(f"{stage:<16} {result['status']:<9} {result['seconds']:<10.3f} {items!s:<10} {rate!s:<11} "
+              f"{(result['error'] or '')[:60]}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every pipeline stage offline against replayed responses.')
+    parser.add_argument('--locations', type=int, default=15, help='locations scraped and in the synthetic history')
+    parser.add_argument('--days', type=int, default=30, help='days of synthetic history in weather_data.db')
+    parser.add_argument('--cameras', type=int, default=50, help='cameras in the replayed camera layer')
+    parser.add_argument('--latency', type=float, default=0.05, help='simulated round-trip per request, seconds')
+    parser.add_argument('--recordings', help='directory of recorded responses (see replay_server.record_responses)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--real-quotas', action='store_true', help='keep the providers\' published rate limits')
+    parser.add_argument('--output', default=REPORT_FILE, help='JSON lines file the report is appended to')
+    parser.add_argument('--profile', nargs='+', choices=STAGES, default=(),
+                        help='stages to run under cProfile (profiles are saved to ./profiles)')
+    parser.add_argument('--metrics', help='also write the Prometheus metrics the stages recorded to this file')
+    parser.add_argument('--verbose', action='store_true', help='keep the stages\' INFO logging')
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        # Every provider shares the replay server's host here, so its pool overflows where live hosts would not
+        logging.getLogger('urllib3.connectionpool').setLevel(logging.ERROR)
+    output = os.path.abspath(args.output)
+    metrics = os.path.abspath(args.metrics) if args.metrics else None
+    profile_dir = os.path.abspath(PROFILE_DIR)
+
+    routes = {}
+    server, base_url = start_replay_server(routes, latency=args.latency)
+    routes.update(synthetic_routes(base_url, args.cameras))
+    if args.recordings:
+        # Recorded responses replace the synthetic ones for the routes they cover
+        routes.update(load_recordings(args.recordings))
+    point_at(base_url)
+    if not args.real_quotas:
+        lift_quotas()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # Stages write models and caches relative to the working directory
+        os.chdir(workdir)
+        suite = Suite(workdir, base_url, args)
+        try:
+            stages = suite.run([stage for stage in STAGES if stage in args.stages or stage == 'generate'],
+                               args.profile, profile_dir)
+        finally:
+            if suite.conn is not None:
+                suite.conn.close()
+            os.chdir(cwd)
+    server.shutdown()
+    if metrics:
+        write_metrics(metrics)
+
+    report = {
+        'run_at': int(time.time()),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': {'locations': args.locations, 'days': args.days, 'cameras': args.cameras,
+                  'latency': args.latency, 'recordings': args.recordings, 'real_quotas': args.real_quotas},
+        'stages': stages,
+    }
+    with open(output, 'a') as f:
+        f.write(json.dumps(report) + '\n')
+    print_report(report)
+    print(f"\nReport appended to {output}")
+    return 1 if any(result['status'] == 'failed' for result in stages.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Canned Open-Meteo style body returned for every request
+DEFAULT_BODY = json.dumps({
+    "hourly": {
+        "temperature_2m": [11.2],
+        "wind_speed_10m": [7.4],
+        "relative_humidity_2m": [81],
+    }
+}).encode()
+
+def make_handler(latency, body=DEFAULT_BODY, content_type='application/json'):
+    """Build a request handler class that sleeps for latency seconds before replying."""
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops bursts of concurrent connections
+    request_queue_size = 256
+
+def start_stub_server(latency=0.1, body=DEFAULT_BODY, port=0, content_type='application/json'):
+    """Start a threaded stub server in the background and return (server, base_url)."""
+    server = StubServer(('127.0.0.1', port), make_handler(latency, body, content_type))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+if __name__ == "__main__":
+    server, base_url = start_stub_server()
+    print(f'Stub server listening on {base_url}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
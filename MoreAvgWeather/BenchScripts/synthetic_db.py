@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RainScripts'))
+
+from ingest_writer import connect
+from locations import neighborhoods_coordinates
+from weather_schema import INSERT_OBSERVATION, ensure_schema
+
+PROVIDERS = ['nws', 'openmeteo', 'openweathermap', 'weatherapi', 'weatherstack']
+CYCLE_SECONDS = 900
+# Cycles generated and inserted per transaction
+CYCLES_PER_CHUNK = 96
+
+def location_names(count):
+    """The real neighborhoods first, then numbered synthetic locations."""
+    names = list(neighborhoods_coordinates)[:count]
+    return names + [f'Synthetic Location {i}' for i in range(len(names), count)]
+
+def generate(db_path, locations=15, days=30, providers=PROVIDERS, end=None, seed=0):
+    """Write days of scrape cycles for every provider and location to a fresh weather_data table.
+
+    Readings are canonical (Celsius, m/s, percent) with a daily temperature
+    cycle, per-provider bias and noise. Altitude, pressure and precipitation
+    are left NULL for the pipeline stages to fill in. Returns the rows written.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    rng = np.random.default_rng(seed)
+    names = location_names(locations)
+    end = int(time.time()) // CYCLE_SECONDS * CYCLE_SECONDS if end is None else end
+    cycles = days * 86400 // CYCLE_SECONDS
+    start = end - cycles * CYCLE_SECONDS
+    bias = rng.normal(0, 0.5, len(providers))
+    per_cycle = len(names) * len(providers)
+
+    conn = connect(db_path)
+    with conn:
+        ensure_schema(conn)
+    written = 0
+    for first in range(0, cycles, CYCLES_PER_CHUNK):
+        count = min(CYCLES_PER_CHUNK, cycles - first)
+        timestamps = start + (first + np.repeat(np.arange(count), per_cycle)) * CYCLE_SECONDS
+        location = np.tile(np.repeat(np.arange(len(names)), len(providers)), count)
+        provider = np.tile(np.arange(len(providers)), count * len(names))
+        hour = (timestamps % 86400) / 3600
+        temperature = 10 + 5 * np.sin((hour - 9) / 24 * 2 * np.pi) + bias[provider] + rng.normal(0, 0.7, len(timestamps))
+        wind_speed = np.abs(rng.normal(3 + location % 4, 1.0))
+        humidity = np.clip(75 - 10 * np.sin((hour - 9) / 24 * 2 * np.pi) + rng.normal(0, 4, len(timestamps)), 5, 100)
+        rows = zip(np.array(providers, dtype=object)[provider].tolist(), np.array(names, dtype=object)[location].tolist(),
+                   timestamps.tolist(), np.round(temperature, 2).tolist(), np.round(wind_speed, 2).tolist(),
+                   np.round(humidity, 1).tolist())
+        with conn:
+            conn.executemany(INSERT_OBSERVATION, rows)
+        written += len(timestamps)
+    conn.close()
+    return written
+
+if __name__ == "__main__":
+    # Usage: synthetic_db.py [db_path] [locations] [days]
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'weather_data.db'
+    locations = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+    start = time.perf_counter()
+    rows = generate(db_path, locations, days)
+    print(f'Wrote {rows} rows ({locations} locations x {len(PROVIDERS)} providers x {days} days) '
+          f'to {db_path} in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,153 @@
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+import requests
+
+# Simultaneous image downloads; bounded so we stay polite to the camera server
+DOWNLOAD_WORKERS = 16
+# OpenCV releases the GIL while decoding, blurring and running Canny, so
+# analysis threads run in parallel without copying frames between processes
+ANALYSIS_WORKERS = os.cpu_count() or 4
+# Downloaded frames waiting for analysis; when full, downloaders block (backpressure)
+QUEUE_SIZE = 32
+REQUEST_TIMEOUT = 30
+
+# A download function may return Cached(value) instead of bytes when the frame is
+# known to be unchanged; the camera then skips analysis and gets value as its result
+Cached = namedtuple('Cached', ['value'])
+
+_DONE = object()
+_local = threading.local()
+
+class StageCounters:
+    """Thread-safe per-stage item, byte and busy-time counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    def add(self, stage, seconds, items=1, nbytes=0, errors=0):
+        with self.lock:
+            counts = self.stages.setdefault(stage, {'items': 0, 'bytes': 0, 'errors': 0, 'busy_seconds': 0.0})
+            counts['items'] += items
+            counts['bytes'] += nbytes
+            counts['errors'] += errors
+            counts['busy_seconds'] += seconds
+
+    def report(self):
+        """Per-stage totals plus throughput over the wall-clock time so far."""
+        elapsed = time.perf_counter() - self.started
+        with self.lock:
+            report = {'elapsed_seconds': elapsed}
+            for stage, counts in self.stages.items():
+                report[stage] = dict(counts, items_per_second=counts['items'] / elapsed if elapsed else 0.0,
+                                     mb_per_second=counts['bytes'] / 1e6 / elapsed if elapsed else 0.0)
+            return report
+
+    def record(self, set_gauge, prefix='camera_pipeline'):
+        """Record the report as gauges, one series per stage and counter, with set_gauge(name, value, **labels)."""
+        report = self.report()
+        set_gauge(f'{prefix}_elapsed_seconds', report['elapsed_seconds'])
+        for stage, counts in report.items():
+            if stage == 'elapsed_seconds':
+                continue
+            for field in ('items', 'errors', 'bytes', 'busy_seconds', 'items_per_second'):
+                set_gauge(f'{prefix}_{field}', counts[field], stage=stage)
+
+    def summary(self):
+        report = self.report()
+        lines = [f"Pipeline finished in {report['elapsed_seconds']:.2f}s"]
+        for stage, counts in report.items():
+            if stage == 'elapsed_seconds':
+                continue
+            lines.append(f"  {stage:<12} {counts['items']:>6} items  {counts['errors']:>4} errors  "
+                         f"{counts['items_per_second']:8.1f}/s  {counts['mb_per_second']:7.2f} MB/s  "
+                         f"busy {counts['busy_seconds']:.2f}s")
+        return '\n'.join(lines)
+
+def get_session():
+    # requests sessions are not shared between threads; keep one per downloader
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+def download_image(url):
+    """Fetch one camera frame and return the encoded bytes."""
+    response = get_session().get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+def run_pipeline(cameras, analyze, download=download_image, download_workers=DOWNLOAD_WORKERS,
+                 analysis_workers=ANALYSIS_WORKERS, queue_size=QUEUE_SIZE):
+    """Download and analyze every camera concurrently.
+
+    download(url) returns the frame bytes (or Cached(value)); analyze(url, data)
+    returns the camera's value. Downloader threads put (camera, bytes) on a
+    bounded queue that analysis threads drain, so at most queue_size frames
+    are held in memory at once. Returns (results, counters) where results is
+    a list of (camera, value, error) with error set instead of value on failure.
+    """
+    counters = StageCounters()
+    pending = queue.Queue()
+    for camera in cameras:
+        pending.put(camera)
+    frames = queue.Queue(maxsize=queue_size)
+    results = []
+    results_lock = threading.Lock()
+
+    def record(camera, value, error):
+        with results_lock:
+            results.append((camera, value, error))
+
+    def downloader():
+        while True:
+            try:
+                camera = pending.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            try:
+                data = download(camera.url)
+            except Exception as e:
+                counters.add('download', time.perf_counter() - start, errors=1)
+                record(camera, None, e)
+                continue
+            if isinstance(data, Cached):
+                counters.add('cached', time.perf_counter() - start)
+                record(camera, data.value, None)
+                continue
+            counters.add('download', time.perf_counter() - start, nbytes=len(data))
+            start = time.perf_counter()
+            frames.put((camera, data))
+            counters.add('queue_wait', time.perf_counter() - start)
+
+    def analyzer():
+        while True:
+            item = frames.get()
+            if item is _DONE:
+                return
+            camera, data = item
+            start = time.perf_counter()
+            try:
+                value = analyze(camera.url, data)
+            except Exception as e:
+                counters.add('analysis', time.perf_counter() - start, errors=1)
+                record(camera, None, e)
+                continue
+            counters.add('analysis', time.perf_counter() - start, nbytes=len(data))
+            record(camera, value, None)
+
+    downloaders = [threading.Thread(target=downloader, daemon=True) for _ in range(download_workers)]
+    analyzers = [threading.Thread(target=analyzer, daemon=True) for _ in range(analysis_workers)]
+    for thread in downloaders + analyzers:
+        thread.start()
+    for thread in downloaders:
+        thread.join()
+    for _ in analyzers:
+        frames.put(_DONE)
+    for thread in analyzers:
+        thread.join()
+    return results, counters
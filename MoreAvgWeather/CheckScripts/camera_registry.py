@@ -0,0 +1,179 @@
+import json
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+import requests
+import pyproj
+from neighborhood_index import NEIGHBORHOODS_URL, NeighborhoodIndex
+
+# Seattle traffic cameras (EPSG:2285 GeoJSON)
+CAMERAS_URL = 'https://data-seattlecitygis.opendata.arcgis.com/api/download/v1/items/b90315ad1deb4985aeb3071b8baa06a1/geojson?layers=0'
+SOURCES = {'cameras': CAMERAS_URL, 'neighborhoods': NEIGHBORHOODS_URL}
+
+# Sources are not even revalidated more often than this; after it, a conditional
+# GET decides whether the registry needs rebuilding
+REGISTRY_TTL = 24 * 3600
+REQUEST_TIMEOUT = 60
+
+# roi is None (whole frame) or a list of (x, y, w, h) boxes in fractions of the frame
+Camera = namedtuple('Camera', ['url', 'longitude', 'latitude', 'neighborhood', 'streets', 'roi'], defaults=[None])
+
+CREATE_SOURCES = '''CREATE TABLE IF NOT EXISTS registry_sources (
+                      name TEXT PRIMARY KEY,
+                      url TEXT NOT NULL,
+                      etag TEXT,
+                      last_modified TEXT,
+                      fetched_at INTEGER NOT NULL,
+                      body TEXT NOT NULL
+                    )'''
+
+CREATE_CAMERAS = '''CREATE TABLE IF NOT EXISTS cameras (
+                      url TEXT PRIMARY KEY,
+                      longitude REAL,
+                      latitude REAL,
+                      neighborhood TEXT,
+                      street_1 TEXT,
+                      street_2 TEXT,
+                      roi TEXT
+                    )'''
+
+# Improved function to extract street names from the URL and split them
+def get_streets_from_url(url):
+    match = re.search(r'images/([^_]+)_([^_]+)_([A-Za-z]+)', url)
+    if match:
+        streets = [match.group(1), match.group(2)]
+        return streets
+    return ['Unknown', 'Unknown']
+
+def ensure_registry(conn):
+    conn.execute(CREATE_SOURCES)
+    conn.execute(CREATE_CAMERAS)
+    # Registries created before regions of interest existed lack the column
+    if 'roi' not in [column[1] for column in conn.execute("PRAGMA table_info(cameras)")]:
+        conn.execute("ALTER TABLE cameras ADD COLUMN roi TEXT")
+
+def _fetch_source(conn, name, url, ttl, force):
+    """Download a source if it changed. Returns True if a new body was stored.
+
+    If the download fails and a copy is already stored, the stored copy is
+    kept and the source is retried on the next run; only a first download
+    that fails raises.
+    """
+    row = conn.execute("SELECT etag, last_modified, fetched_at FROM registry_sources WHERE name = ?",
+                       (name,)).fetchone()
+    if row and not force and time.time() - row[2] < ttl:
+        return False
+
+    headers = {}
+    if row and not force:
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+    try:
+        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            conn.execute("UPDATE registry_sources SET fetched_at = ? WHERE name = ?", (int(time.time()), name))
+            print(f'{name} unchanged since last download')
+            return False
+        response.raise_for_status()
+    except requests.RequestException as e:
+        if not row:
+            raise
+        # fetched_at is left alone, so the next run tries again
+        print(f'Could not refresh {name} ({e}); using the copy downloaded {(time.time() - row[2]) / 3600:.0f} hours ago')
+        return False
+    conn.execute('''INSERT OR REPLACE INTO registry_sources (name, url, etag, last_modified, fetched_at, body)
+                    VALUES (?, ?, ?, ?, ?, ?)''',
+                 (name, url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                  int(time.time()), response.text))
+    print(f'Downloaded {name} ({len(response.content)} bytes)')
+    return True
+
+def _load_source(conn, name):
+    return json.loads(conn.execute("SELECT body FROM registry_sources WHERE name = ?", (name,)).fetchone()[0])
+
+def rebuild_cameras(conn):
+    """Recompute every camera's coordinates, neighborhood and streets from the stored sources."""
+    cameras = [feature for feature in _load_source(conn, 'cameras')['features']
+               if feature['properties'].get('URL', None)
+               # Skip URLs that have only letters and numbers at the end and no underscores
+               and not re.search(r'/images/\w+$', feature['properties']['URL'])]
+    index = NeighborhoodIndex.from_geojson(_load_source(conn, 'neighborhoods'))
+
+    # Projection for converting coordinates from EPSG:2285 to WGS84, one call for every camera
+    proj = pyproj.Transformer.from_crs("EPSG:2285", "EPSG:4326", always_xy=True)
+    x = [feature['geometry']['coordinates'][0] for feature in cameras]
+    y = [feature['geometry']['coordinates'][1] for feature in cameras]
+    longitudes, latitudes = proj.transform(x, y)
+    neighborhoods = index.locate(longitudes, latitudes)
+
+    rows = []
+    for feature, longitude, latitude, neighborhood in zip(cameras, longitudes, latitudes, neighborhoods):
+        url = feature['properties']['URL']
+        streets = get_streets_from_url(url)
+        rows.append((url, float(longitude), float(latitude), neighborhood, streets[0], streets[1]))
+    # Upsert rather than replace so hand-configured regions of interest survive a rebuild
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS current_cameras (url TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.current_cameras")
+    conn.executemany("INSERT OR IGNORE INTO temp.current_cameras (url) VALUES (?)", [(row[0],) for row in rows])
+    conn.execute("DELETE FROM cameras WHERE url NOT IN (SELECT url FROM temp.current_cameras)")
+    conn.executemany('''INSERT INTO cameras (url, longitude, latitude, neighborhood, street_1, street_2)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (url) DO UPDATE SET
+                            longitude = excluded.longitude, latitude = excluded.latitude,
+                            neighborhood = excluded.neighborhood,
+                            street_1 = excluded.street_1, street_2 = excluded.street_2''', rows)
+    return len(rows)
+
+def refresh_registry(conn, ttl=REGISTRY_TTL, force=False):
+    """Bring the camera registry up to date, downloading only sources that changed.
+
+    Within the TTL nothing is requested. After it, each source is revalidated
+    with If-None-Match/If-Modified-Since, and the cameras are only recomputed
+    when a source actually changed. force=True downloads both unconditionally.
+    """
+    ensure_registry(conn)
+    with conn:
+        changed = [name for name, url in SOURCES.items() if _fetch_source(conn, name, url, ttl, force)]
+        if changed:
+            count = rebuild_cameras(conn)
+            print(f'Camera registry rebuilt with {count} cameras ({", ".join(changed)} changed)')
+    return bool(changed)
+
+def load_cameras(conn):
+    """Every registered camera as a Camera tuple."""
+    ensure_registry(conn)
+    return [Camera(url, longitude, latitude, neighborhood, [street_1, street_2], json.loads(roi) if roi else None)
+            for url, longitude, latitude, neighborhood, street_1, street_2, roi in conn.execute(
+                "SELECT url, longitude, latitude, neighborhood, street_1, street_2, roi FROM cameras ORDER BY url")]
+
+def set_roi(conn, url, roi):
+    """Set a camera's regions of interest as (x, y, w, h) fractions; None or [] means the whole frame."""
+    for box in roi or []:
+        x, y, w, h = box
+        if not (0 <= x < 1 and 0 <= y < 1 and 0 < w <= 1 - x and 0 < h <= 1 - y):
+            raise ValueError(f'Region {box} does not fit inside the frame')
+    with conn:
+        updated = conn.execute("UPDATE cameras SET roi = ? WHERE url = ?",
+                               (json.dumps([list(box) for box in roi]) if roi else None, url)).rowcount
+    if not updated:
+        raise KeyError(f'Unknown camera: {url}')
+
+if __name__ == "__main__":
+    # Usage: camera_registry.py [--force] [db_path]
+    #        camera_registry.py --roi <camera url> [x,y,w,h ...]   (no boxes resets to the whole frame)
+    if len(sys.argv) > 2 and sys.argv[1] == '--roi':
+        conn = sqlite3.connect('rain_data.db')
+        set_roi(conn, sys.argv[2], [tuple(float(value) for value in box.split(',')) for box in sys.argv[3:]])
+        conn.close()
+        sys.exit(0)
+    args = sys.argv[1:]
+    force = '--force' in args
+    args = [arg for arg in args if arg != '--force']
+    conn = sqlite3.connect(args[0] if args else 'rain_data.db')
+    refresh_registry(conn, force=force)
+    print(f'{len(load_cameras(conn))} cameras registered')
+    conn.close()
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import namedtuple
+from camera_pipeline import Cached, REQUEST_TIMEOUT, get_session
+from rain_analysis import RainAnalyzer, edge_energy, frame_hash, hash_distance
+
+# Frames whose hashes differ in at most this many of 64 bits count as unchanged
+HASH_DISTANCE = 4
+# The hash only sees a 9x8 thumbnail, so a hash hit also needs the frame's fine-edge
+# energy within this fraction of the analyzed frame's before its density is reused
+ENERGY_TOLERANCE = 0.1
+# A density reused on hash hits is recomputed after this many reuses or seconds
+MAX_REUSES = 8
+MAX_REUSE_SECONDS = 1800
+
+FrameState = namedtuple('FrameState', ['etag', 'last_modified', 'size', 'frame_hash', 'density', 'analysis_key',
+                                       'edge_energy', 'analyzed_at', 'reuses'])
+
+CREATE_CAMERA_FRAMES = '''CREATE TABLE IF NOT EXISTS camera_frames (
+                            url TEXT PRIMARY KEY,
+                            etag TEXT,
+                            last_modified TEXT,
+                            size INTEGER,
+                            frame_hash INTEGER,
+                            density REAL,
+                            analysis_key TEXT,
+                            updated_at INTEGER,
+                            edge_energy REAL,
+                            analyzed_at INTEGER,
+                            reuses INTEGER
+                          )'''
+
+# Columns added after the table was first created, for upgrading older caches
+ADDED_COLUMNS = {'analysis_key': 'TEXT', 'edge_energy': 'REAL', 'analyzed_at': 'INTEGER', 'reuses': 'INTEGER'}
+
+class FrameCache:
+    """Per-camera validators, frame hash and last edge density, to skip unchanged frames.
+
+    download() sends If-None-Match/If-Modified-Since and answers a 304 with the
+    stored density without transferring the frame. analyze() decodes the frame
+    and reuses the stored density when its perceptual hash is within
+    HASH_DISTANCE of the last one and its edge energy is within
+    ENERGY_TOLERANCE, skipping the blur and Canny; after MAX_REUSES reuses or
+    MAX_REUSE_SECONDS the density is computed afresh. A stored density is only
+    reused if it was computed with the same scale and region of interest.
+    Both are safe to call from pipeline threads; state is written to
+    the database by save() on the caller's thread.
+    """
+
+    def __init__(self, conn, analyzer=None, rois=None):
+        self.conn = conn
+        self.analyzer = analyzer or RainAnalyzer()
+        self.rois = rois or {}
+        conn.execute(CREATE_CAMERA_FRAMES)
+        # Caches created by earlier versions lack the newer columns
+        columns = [column[1] for column in conn.execute("PRAGMA table_info(camera_frames)")]
+        for name, column_type in ADDED_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE camera_frames ADD COLUMN {name} {column_type}")
+        self.states = {row[0]: FrameState(*row[1:]) for row in conn.execute(
+            f"SELECT url, {', '.join(FrameState._fields)} FROM camera_frames")}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'not_modified': 0, 'bytes_downloaded': 0, 'bytes_saved': 0,
+                      'frames': 0, 'hash_hits': 0, 'analyzed': 0}
+
+    def _count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def _update(self, url, **fields):
+        with self.lock:
+            state = self.states.get(url, FrameState(*[None] * len(FrameState._fields)))
+            self.states[url] = state._replace(**fields)
+
+    def _reusable(self, url, state):
+        # A stored density is only as good as the settings it was computed with
+        return (state is not None and state.density is not None
+                and state.analysis_key == self.analyzer.key(self.rois.get(url)))
+
+    def download(self, url):
+        """Conditional GET; returns the frame bytes or Cached(density) if unchanged."""
+        with self.lock:
+            state = self.states.get(url)
+        headers = {}
+        # Only revalidate when there is a stored density to fall back on
+        if self._reusable(url, state):
+            if state.etag:
+                headers['If-None-Match'] = state.etag
+            if state.last_modified:
+                headers['If-Modified-Since'] = state.last_modified
+        response = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            self._count(requests=1, not_modified=1, bytes_saved=state.size or 0)
+            return Cached(state.density)
+        response.raise_for_status()
+        data = response.content
+        self._count(requests=1, bytes_downloaded=len(data))
+        self._update(url, etag=response.headers.get('ETag'),
+                     last_modified=response.headers.get('Last-Modified'), size=len(data))
+        return data
+
+    def _unchanged(self, state, current, energy, now):
+        if state.frame_hash is None or hash_distance(current, state.frame_hash) > HASH_DISTANCE:
+            return False
+        if state.edge_energy is None or abs(energy - state.edge_energy) > ENERGY_TOLERANCE * max(state.edge_energy, 1.0):
+            return False
+        # However alike the frames look, do not let a density go stale
+        return (state.reuses or 0) < MAX_REUSES and now - (state.analyzed_at or 0) < MAX_REUSE_SECONDS
+
+    def analyze(self, url, data):
+        """Edge density of a frame, reused from the last frame if they look the same."""
+        gray = self.analyzer.decode(data)
+        if gray is None:
+            return None
+        roi = self.rois.get(url)
+        current = frame_hash(gray)
+        energy = edge_energy(gray, roi)
+        now = time.time()
+        with self.lock:
+            state = self.states.get(url)
+        if self._reusable(url, state) and self._unchanged(state, current, energy, now):
+            self._count(frames=1, hash_hits=1)
+            self._update(url, reuses=(state.reuses or 0) + 1)
+            return state.density
+        density = self.analyzer.density(gray, roi)
+        self._count(frames=1, analyzed=1)
+        self._update(url, frame_hash=current, density=density, analysis_key=self.analyzer.key(roi),
+                     edge_energy=energy, analyzed_at=int(now), reuses=0)
+        return density
+
+    def save(self):
+        """Persist every camera's validators, hash and density."""
+        now = int(time.time())
+        with self.lock:
+            rows = [(url, *state, now) for url, state in self.states.items()]
+        with self.conn:
+            self.conn.executemany(f'''INSERT OR REPLACE INTO camera_frames
+                                      (url, {', '.join(FrameState._fields)}, updated_at)
+                                      VALUES ({', '.join('?' * (len(FrameState._fields) + 2))})''', rows)
+
+    def report(self):
+        """Counters plus the HTTP, hash and overall hit rates."""
+        with self.lock:
+            stats = dict(self.stats)
+        stats['not_modified_rate'] = stats['not_modified'] / stats['requests'] if stats['requests'] else 0.0
+        stats['hash_hit_rate'] = stats['hash_hits'] / stats['frames'] if stats['frames'] else 0.0
+        skipped = stats['not_modified'] + stats['hash_hits']
+        stats['analysis_skip_rate'] = skipped / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    def record(self, set_gauge, prefix='camera_frame_cache'):
+        """Record the report as gauges with set_gauge(name, value)."""
+        for name, value in self.report().items():
+            set_gauge(f'{prefix}_{name}', value)
+
+    def summary(self):
+        stats = self.report()
+        return (f"Frame cache: {stats['not_modified']}/{stats['requests']} not modified "
+                f"({stats['not_modified_rate']:.0%}, {stats['bytes_saved'] / 1e6:.1f} MB saved, "
+                f"{stats['bytes_downloaded'] / 1e6:.1f} MB downloaded); "
+                f"{stats['hash_hits']}/{stats['frames']} decoded frames unchanged ({stats['hash_hit_rate']:.0%}); "
+                f"analysis skipped for {stats['analysis_skip_rate']:.0%} of cameras")
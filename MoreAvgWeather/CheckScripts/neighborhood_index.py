@@ -0,0 +1,128 @@
+import numpy as np
+
+# Seattle neighborhood boundaries (WGS84 GeoJSON) from the ArcGIS service
+NEIGHBORHOODS_URL = 'https://services.arcgis.com/ZOyb2t4B0UYuYNYH/arcgis/rest/services/nma_nhoods_sub/FeatureServer/0/query?outFields=*&where=1%3D1&f=geojson'
+
+# Cells per side of the uniform grid used to prefilter polygons
+GRID_SIZE = 64
+
+# Upper bound on points x edges evaluated at once by the ray cast
+MAX_PAIRS = 4000000
+
+UNKNOWN = 'Unknown'
+
+def _polygons(geometry):
+    """The polygons of a Polygon or MultiPolygon geometry, each a list of rings."""
+    if geometry is None:
+        return []
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+def points_in_polygon(x, y, rings):
+    """Even-odd test of many points against one polygon given as a list of rings.
+
+    Crossings are counted over the exterior ring and every hole together, so
+    points inside a hole come out as outside.
+    """
+    edges = []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=np.float64)[:, :2]
+        edges.append(np.hstack([ring, np.roll(ring, -1, axis=0)]))
+    x1, y1, x2, y2 = np.vstack(edges).T
+    # Horizontal edges never cross the ray; dropping them also avoids dividing by zero
+    keep = y1 != y2
+    x1, y1, x2, y2 = x1[keep], y1[keep], x2[keep], y2[keep]
+    slope = (x2 - x1) / (y2 - y1)
+
+    inside = np.zeros(len(x), dtype=bool)
+    step = max(1, MAX_PAIRS // max(len(x1), 1))
+    for i in range(0, len(x), step):
+        px = x[i:i + step, None]
+        py = y[i:i + step, None]
+        straddles = (y1 > py) != (y2 > py)
+        crosses = straddles & (px < x1 + (py - y1) * slope)
+        inside[i:i + step] = np.count_nonzero(crosses, axis=1) % 2 == 1
+    return inside
+
+class NeighborhoodIndex:
+    """Classifies batches of WGS84 points into neighborhood polygons.
+
+    Every polygon (each part of a MultiPolygon separately) is registered in
+    the cells of a uniform grid that its bounding box overlaps. Points are
+    bucketed into the same grid, so each polygon is only tested against the
+    points in its own cells, and then only those inside its bounding box.
+    """
+
+    def __init__(self, features, name_property='S_HOOD', grid_size=GRID_SIZE):
+        self.names = []
+        self.parts = []  # (name index, rings, bounding box)
+        for feature in features:
+            polygons = _polygons(feature.get('geometry'))
+            if not polygons:
+                continue
+            self.names.append(feature['properties'][name_property])
+            for rings in polygons:
+                exterior = np.asarray(rings[0], dtype=np.float64)
+                bbox = (exterior[:, 0].min(), exterior[:, 1].min(), exterior[:, 0].max(), exterior[:, 1].max())
+                self.parts.append((len(self.names) - 1, rings, bbox))
+
+        self.grid_size = grid_size
+        if self.parts:
+            boxes = np.array([bbox for _, _, bbox in self.parts])
+            self.extent = (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+        else:
+            self.extent = (0.0, 0.0, 1.0, 1.0)
+        self.cell_w = max(self.extent[2] - self.extent[0], 1e-12) / grid_size
+        self.cell_h = max(self.extent[3] - self.extent[1], 1e-12) / grid_size
+
+        # Grid cells covered by each part's bounding box
+        self.part_cells = []
+        for _, _, (xmin, ymin, xmax, ymax) in self.parts:
+            col0, row0 = self._cell(xmin, ymin)
+            col1, row1 = self._cell(xmax, ymax)
+            cols, rows = np.meshgrid(np.arange(col0, col1 + 1), np.arange(row0, row1 + 1))
+            self.part_cells.append((rows * grid_size + cols).ravel())
+
+    @classmethod
+    def from_geojson(cls, data, name_property='S_HOOD'):
+        return cls(data['features'], name_property)
+
+    def _cell(self, x, y):
+        col = np.clip(((np.asarray(x) - self.extent[0]) // self.cell_w).astype(int), 0, self.grid_size - 1)
+        row = np.clip(((np.asarray(y) - self.extent[1]) // self.cell_h).astype(int), 0, self.grid_size - 1)
+        return col, row
+
+    def locate_indices(self, lons, lats):
+        """Index into self.names for each point, or -1 where no polygon contains it."""
+        x = np.asarray(lons, dtype=np.float64)
+        y = np.asarray(lats, dtype=np.float64)
+        result = np.full(len(x), -1, dtype=np.intp)
+        if not len(x):
+            return result
+
+        # Bucket the points by grid cell: order lists point indices cell by cell
+        in_extent = (x >= self.extent[0]) & (x <= self.extent[2]) & (y >= self.extent[1]) & (y <= self.extent[3])
+        col, row = self._cell(x, y)
+        cells = np.where(in_extent, row * self.grid_size + col, self.grid_size * self.grid_size)
+        order = np.argsort(cells, kind='stable')
+        starts = np.searchsorted(cells[order], np.arange(self.grid_size * self.grid_size + 1))
+
+        for (name, rings, (xmin, ymin, xmax, ymax)), part_cells in zip(self.parts, self.part_cells):
+            candidates = np.concatenate([order[starts[c]:starts[c + 1]] for c in part_cells])
+            # Earlier neighborhoods win where boundaries overlap, as in a linear scan
+            candidates = candidates[result[candidates] < 0]
+            px, py = x[candidates], y[candidates]
+            in_box = (px >= xmin) & (px <= xmax) & (py >= ymin) & (py <= ymax)
+            candidates = candidates[in_box]
+            if len(candidates):
+                hit = points_in_polygon(x[candidates], y[candidates], rings)
+                result[candidates[hit]] = name
+        return result
+
+    def locate(self, lons, lats):
+        """Neighborhood name for each point, 'Unknown' where none contains it."""
+        names = np.array(self.names + [UNKNOWN], dtype=object)
+        return names[self.locate_indices(lons, lats)].tolist()
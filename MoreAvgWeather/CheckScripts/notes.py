@@ -1,25 +1,36 @@
 import sqlite3
+import sys
+from datetime import datetime, timezone
+from rain_store import ensure_rain_store, recent_rain_by_neighborhood, latest_by_camera
+
+# Usage: notes.py [hours]  -- summarize camera rain over the last few hours (default 1)
+hours = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
 
 # Connect to SQLite database
 conn = sqlite3.connect('rain_data.db')
-cursor = conn.cursor()
+ensure_rain_store(conn)
 
-# Query to select all data from the RainData table
-query = 'SELECT * FROM RainData'
-
-# Execute the query and fetch all results
-cursor.execute(query)
-results = cursor.fetchall()
+# Per-neighborhood rain over the window, and each camera's latest reading
+neighborhoods = recent_rain_by_neighborhood(conn, seconds=int(hours * 3600))
+cameras = [row for row in latest_by_camera(conn) if row[5]]
 
 # Close the database connection
 conn.close()
 
 # Print the results in a readable format
-print(f"{'ID':<5} {'Neighborhood':<20} {'Street':<35} {'Avg Density':<15} {'Rain Detected':<15} {'Timestamp'}")
-print("=" * 105)
-
-for row in results:
-    id, neighborhood, street, average_density, rain_detected, timestamp = row
-    rain_detected = 'True' if rain_detected else 'False'
-    print(f"{id:<5} {neighborhood:<20} {street:<35} {average_density:<15.2f} {rain_detected:<15} {timestamp}")
+print(f"Rain by neighborhood, last {hours:g} h")
+print(f"{'Neighborhood':<30} {'Cameras':<9} {'Samples':<9} {'Avg Density':<13} {'Rain %':<8} {'Last Seen (UTC)'}")
+print("=" * 95)
+for neighborhood, camera_count, samples, average_density, rain_fraction, last_seen in neighborhoods:
+    print(f"{neighborhood or 'Unknown':<30} {camera_count:<9} {samples:<9} {average_density:<13.2f} "
+          f"{rain_fraction * 100:<8.0f} {format_time(last_seen)}")
 
+print()
+print("Cameras currently detecting rain")
+print(f"{'Neighborhood':<30} {'Street':<35} {'Density':<10} {'Timestamp (UTC)'}")
+print("=" * 95)
+for camera, timestamp, neighborhood, street, density, rain_detected in cameras:
+    print(f"{neighborhood or 'Unknown':<30} {street:<35} {density:<10.2f} {format_time(timestamp)}")
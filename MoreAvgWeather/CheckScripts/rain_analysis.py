@@ -0,0 +1,148 @@
+import json
+import threading
+import cv2
+import numpy as np
+
+# Edge density above which a frame is treated as showing rain
+RAIN_THRESHOLD = 0.01  # Adjust threshold as needed
+
+# Decode frames at 1/ANALYSIS_SCALE of full resolution (1, 2, 4 or 8). Reduced
+# decoding skips most of the JPEG work and shrinks every later step with it.
+# Keep 1 until BenchScripts/benchmark_rain_density.py shows a reduced scale
+# agrees with the full-frame score on a corpus of saved camera frames.
+ANALYSIS_SCALE = 1
+GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+# Frame and region shapes each analysis thread keeps buffers for; ROIs give
+# every camera its own region shapes, so older buffers are dropped past this
+MAX_BUFFER_SHAPES = 16
+
+# Function to determine if it's raining and calculate edge density
+def rain_density(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    # Calculate edge density
+    edge_density = np.sum(edges) / (edges.shape[0] * edges.shape[1])
+    return edge_density
+
+def decode_image(data):
+    """Decode an encoded camera frame, or return None if it does not decode."""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def analyze_image(url, data):
+    """Edge density of an encoded camera frame, or None if it does not decode."""
+    image = decode_image(data)
+    if image is None:
+        return None
+    return rain_density(image)
+
+def frame_hash(image):
+    """64-bit difference hash of a frame, as a signed integer so SQLite can store it.
+
+    The frame is shrunk to 9x8 grey pixels and each bit records whether a pixel
+    is brighter than its left neighbour, so recompression noise and small
+    overlays such as timestamps barely change it.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), 'big', signed=True)
+
+def hash_distance(a, b):
+    """Number of differing bits between two frame hashes."""
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+def edge_energy(gray, roi=None):
+    """Mean absolute difference between horizontally adjacent pixels, over the ROI boxes if given.
+
+    Fine rain streaks raise it even when the 9x8 frame hash cannot see them.
+    Only every other row is read, so it costs a fraction of the blur and Canny.
+    """
+    regions = [gray[rows, cols] for rows, cols in roi_pixels(roi, gray.shape)] if roi else [gray]
+    total = count = 0
+    for region in regions:
+        diffs = np.abs(np.diff(region[::2].astype(np.int16), axis=1))
+        total += int(diffs.sum())
+        count += diffs.size
+    return total / count if count else 0.0
+
+def roi_pixels(roi, shape):
+    """Convert fractional (x, y, w, h) boxes to pixel slices for a frame of the given shape."""
+    height, width = shape[:2]
+    boxes = []
+    for x, y, w, h in roi:
+        left, top = int(round(x * width)), int(round(y * height))
+        right, bottom = int(round((x + w) * width)), int(round((y + h) * height))
+        if right > left and bottom > top:
+            boxes.append((slice(max(top, 0), min(bottom, height)), slice(max(left, 0), min(right, width))))
+    return boxes
+
+class RainAnalyzer:
+    """Edge-density analysis at a reduced scale and over per-camera regions of interest.
+
+    Frames are decoded straight to greyscale at 1/scale resolution. An ROI is
+    a list of (x, y, w, h) boxes in fractions of the frame, so it holds at any
+    scale; only those pixels are blurred and edge-detected, keeping sky and
+    static buildings out of the score. ROI regions are copied to contiguous
+    arrays before filtering. The blur and edge buffers are preallocated per
+    thread and shape (up to MAX_BUFFER_SHAPES shapes), and the density is
+    counted with cv2.countNonZero instead of summing a widened copy of the
+    edge map.
+    Densities are on the same scale as rain_density().
+    """
+
+    def __init__(self, scale=ANALYSIS_SCALE):
+        if scale not in GRAYSCALE_FLAGS:
+            raise ValueError(f'Unsupported analysis scale: {scale}')
+        self.scale = scale
+        self._local = threading.local()
+
+    def key(self, roi=None):
+        """Identifies the settings a density was computed with, so stored values are only reused like for like."""
+        return f'scale={self.scale};roi={json.dumps(roi)}'
+
+    def decode(self, data):
+        """Decode an encoded frame to greyscale at the configured scale, or None."""
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), GRAYSCALE_FLAGS[self.scale])
+
+    def _buffers(self, shape):
+        if not hasattr(self._local, 'buffers'):
+            self._local.buffers = {}
+        buffers = self._local.buffers.get(shape)
+        if buffers is None:
+            if len(self._local.buffers) >= MAX_BUFFER_SHAPES:
+                # Dicts keep insertion order, so this drops the oldest shape
+                del self._local.buffers[next(iter(self._local.buffers))]
+            buffers = (np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=np.uint8))
+            self._local.buffers[shape] = buffers
+        return buffers
+
+    def _edge_count(self, gray):
+        blurred, edges = self._buffers(gray.shape)
+        cv2.GaussianBlur(gray, (5, 5), 0, dst=blurred)
+        cv2.Canny(blurred, 50, 150, edges=edges)
+        return cv2.countNonZero(edges)
+
+    def density(self, gray, roi=None):
+        """Edge density of a greyscale frame, over the ROI boxes if given."""
+        if not roi:
+            return self._edge_count(gray) * 255 / gray.size
+        total = area = 0
+        for rows, cols in roi_pixels(roi, gray.shape):
+            # A sliced box is a strided view; filter a contiguous copy so dst buffers match its layout
+            region = np.ascontiguousarray(gray[rows, cols])
+            total += self._edge_count(region)
+            area += region.size
+        return total * 255 / area if area else None
+
+    def analyze(self, data, roi=None):
+        """Edge density of an encoded frame, or None if it does not decode."""
+        gray = self.decode(data)
+        if gray is None:
+            return None
+        return self.density(gray, roi)
@@ -0,0 +1,138 @@
+import time
+
+# Raw per-camera rows are kept this long, then folded into hourly rows
+RAW_RETENTION_DAYS = 14
+# Hourly rows are kept this long; None keeps them forever
+HOURLY_RETENTION_DAYS = 365
+
+# One row per camera per run. Rows are only ever appended (and eventually
+# downsampled), so the table is a history usable as a rain label source.
+CREATE_RAIN_DATA = '''CREATE TABLE IF NOT EXISTS RainData (
+                        camera TEXT NOT NULL,
+                        timestamp INTEGER NOT NULL,    -- epoch seconds, UTC
+                        neighborhood TEXT,
+                        street TEXT,
+                        density REAL NOT NULL,
+                        rain_detected INTEGER NOT NULL,
+                        PRIMARY KEY (camera, timestamp)
+                      ) WITHOUT ROWID'''
+
+# Totals rather than means so later batches merge exactly
+CREATE_RAIN_DATA_HOURLY = '''CREATE TABLE IF NOT EXISTS RainDataHourly (
+                               camera TEXT NOT NULL,
+                               hour INTEGER NOT NULL,    -- epoch seconds at the start of the hour
+                               neighborhood TEXT,
+                               street TEXT,
+                               samples INTEGER NOT NULL,
+                               total_density REAL NOT NULL,
+                               max_density REAL NOT NULL,
+                               rain_samples INTEGER NOT NULL,
+                               PRIMARY KEY (camera, hour)
+                             ) WITHOUT ROWID'''
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_rain_data_neighborhood_timestamp ON RainData (neighborhood, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_rain_data_timestamp ON RainData (timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_rain_data_hourly_neighborhood_hour ON RainDataHourly (neighborhood, hour)',
+)
+
+def ensure_rain_store(conn):
+    """Create the RainData tables, replacing the old single-snapshot layout if present."""
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(RainData)")]
+    if 'average_density' in columns:
+        # The old layout was dropped and recreated on every run, so it holds no history
+        conn.execute("DROP TABLE RainData")
+    conn.execute(CREATE_RAIN_DATA)
+    conn.execute(CREATE_RAIN_DATA_HOURLY)
+    for statement in INDEXES:
+        conn.execute(statement)
+
+def append_observations(conn, rows):
+    """Append (camera, timestamp, neighborhood, street, density, rain_detected) rows in one transaction.
+
+    A camera already recorded at the same timestamp keeps its first row.
+    Returns the number of rows added.
+    """
+    with conn:
+        ensure_rain_store(conn)
+        before = conn.total_changes
+        conn.executemany('''INSERT OR IGNORE INTO RainData
+                            (camera, timestamp, neighborhood, street, density, rain_detected)
+                            VALUES (?, ?, ?, ?, ?, ?)''',
+                         [(camera, int(timestamp), neighborhood, street, float(density), int(bool(rain)))
+                          for camera, timestamp, neighborhood, street, density, rain in rows])
+        return conn.total_changes - before
+
+def apply_retention(conn, now=None, raw_days=RAW_RETENTION_DAYS, hourly_days=HOURLY_RETENTION_DAYS):
+    """Fold raw rows older than raw_days into RainDataHourly and drop expired hourly rows.
+
+    Returns (raw rows downsampled, hourly rows deleted).
+    """
+    now = int(now if now is not None else time.time())
+    raw_cutoff = now - raw_days * 86400
+    with conn:
+        ensure_rain_store(conn)
+        conn.execute('''INSERT INTO RainDataHourly
+                            (camera, hour, neighborhood, street, samples, total_density, max_density, rain_samples)
+                        SELECT camera, (timestamp / 3600) * 3600 AS hour, MAX(neighborhood), MAX(street),
+                               COUNT(*), SUM(density), MAX(density), SUM(rain_detected)
+                        FROM RainData WHERE timestamp < ?
+                        GROUP BY camera, hour
+                        ON CONFLICT (camera, hour) DO UPDATE SET
+                            samples = samples + excluded.samples,
+                            total_density = total_density + excluded.total_density,
+                            max_density = MAX(max_density, excluded.max_density),
+                            rain_samples = rain_samples + excluded.rain_samples''', (raw_cutoff,))
+        downsampled = conn.execute("DELETE FROM RainData WHERE timestamp < ?", (raw_cutoff,)).rowcount
+        expired = 0
+        if hourly_days is not None:
+            expired = conn.execute("DELETE FROM RainDataHourly WHERE hour < ?",
+                                   (now - hourly_days * 86400,)).rowcount
+    return downsampled, expired
+
+def recent_rain_by_neighborhood(conn, seconds=3600, now=None):
+    """Per-neighborhood rain over the last `seconds`, wettest first.
+
+    Rows are (neighborhood, cameras, samples, mean_density, rain_fraction, last_seen).
+    """
+    now = int(now if now is not None else time.time())
+    return conn.execute('''SELECT neighborhood, COUNT(DISTINCT camera), COUNT(*), AVG(density),
+                                  AVG(rain_detected), MAX(timestamp)
+                           FROM RainData WHERE timestamp >= ?
+                           GROUP BY neighborhood
+                           ORDER BY AVG(rain_detected) DESC, AVG(density) DESC''', (now - seconds,)).fetchall()
+
+def latest_by_camera(conn, neighborhood=None):
+    """Each camera's most recent row as (camera, timestamp, neighborhood, street, density, rain_detected)."""
+    query = '''SELECT camera, MAX(timestamp), neighborhood, street, density, rain_detected
+               FROM RainData'''
+    params = []
+    if neighborhood is not None:
+        query += " WHERE neighborhood = ?"
+        params.append(neighborhood)
+    # SQLite takes the bare columns from the row holding MAX(timestamp)
+    return conn.execute(query + " GROUP BY camera ORDER BY neighborhood, street", params).fetchall()
+
+def camera_history(conn, camera, start, end):
+    """Raw rows for one camera in [start, end), oldest first."""
+    return conn.execute('''SELECT camera, timestamp, neighborhood, street, density, rain_detected
+                           FROM RainData WHERE camera = ? AND timestamp >= ? AND timestamp < ?
+                           ORDER BY timestamp''', (camera, int(start), int(end))).fetchall()
+
+def neighborhood_hourly(conn, neighborhood, start, end):
+    """Hourly (hour, samples, mean_density, max_density, rain_fraction) for a neighborhood in [start, end).
+
+    Combines downsampled history with raw rows, so the series is continuous
+    across the retention boundary. Suitable as a rain label series.
+    """
+    return conn.execute('''SELECT hour, SUM(samples), SUM(total_density) / SUM(samples), MAX(max_density),
+                                  CAST(SUM(rain_samples) AS REAL) / SUM(samples)
+                           FROM (SELECT hour, samples, total_density, max_density, rain_samples
+                                 FROM RainDataHourly
+                                 WHERE neighborhood = ? AND hour >= ? AND hour < ?
+                                 UNION ALL
+                                 SELECT (timestamp / 3600) * 3600, 1, density, density, rain_detected
+                                 FROM RainData
+                                 WHERE neighborhood = ? AND timestamp >= ? AND timestamp < ?)
+                           GROUP BY hour ORDER BY hour''',
+                        (neighborhood, int(start), int(end), neighborhood, int(start), int(end))).fetchall()
@@ -1,126 +1,214 @@
 import sqlite3
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, log_loss
 import logging
 import sys
+import time
+from weather_schema import is_canonical
+from bulk_update import bulk_update
+from instrumentation import observe, set_gauge, timer
+from rain_model import FEATURES, RainModel, due_for_version, make_labels, save_model, load_model, sklearn_compatible
 
 # Setting up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
-# Connect to the SQLite database
-conn = sqlite3.connect('weather_data.db')
-cursor = conn.cursor()
-
-# Check if the precipitation column exists and add it if not
-cursor.execute("PRAGMA table_info(weather_data)")
-columns = [column_info[1] for column_info in cursor.fetchall()]
-if 'precipitation' not in columns:
-    cursor.execute("ALTER TABLE weather_data ADD COLUMN precipitation REAL")
-    conn.commit()
-
-# Query the data from the database, including the id column
-query = """
-SELECT id, barometric_pressure, temperature, wind_speed, humidity
-FROM weather_data
-"""
-df = pd.read_sql_query(query, conn)
-
-# Ensure temperature column contains only string values
-df['temperature'] = df['temperature'].astype(str)
-
-# Replace non-numeric temperature values with NaN
-df['temperature'] = df['temperature'].str.replace('°F', '', regex=False)
-df['temperature'] = pd.to_numeric(df['temperature'], errors='coerce')
-
-# Clean wind speed data by removing non-numeric characters and converting to numeric
-df['wind_speed'] = df['wind_speed'].astype(str).str.extract('(\d+)')
-df['wind_speed'] = pd.to_numeric(df['wind_speed'], errors='coerce')
-
-# Clean humidity data by removing '%' and converting to numeric
-df['humidity'] = df['humidity'].astype(str).str.replace('%', '', regex=False)
-df['humidity'] = pd.to_numeric(df['humidity'], errors='coerce')
-
-# Log the DataFrame to check for missing values
-logging.info("DataFrame before handling missing values:")
-logging.info(df.head())
-
-# Define the features
-X = df[['barometric_pressure', 'temperature', 'wind_speed', 'humidity']]
-
-# Log the shape of the data
-logging.info(f'Data shape before imputation: {X.shape}')
-
-# Check for missing values
-missing_values = X.isnull().sum()
-logging.info(f'Missing values in each column:\n{missing_values}')
-
-# Impute missing values with the mean
-imputer = SimpleImputer(strategy='mean')
-X = imputer.fit_transform(X)
-
-# Log the shape of the data after imputation
-logging.info(f'Data shape after imputation: {X.shape}')
-
-# Check if the data has at least one feature
-if X.shape[1] == 0:
-    logging.error('Input data has zero features.')
-    conn.close()
-    sys.exit(1)
-
-# Scale the features
-scaler = StandardScaler()
-try:
-    X = scaler.fit_transform(X)
-except ValueError as e:
-    logging.error(f'Error scaling data: {e}')
-    conn.close()
-    sys.exit(1)
-
-# Generate sample precipitation values (replace with actual data or prediction logic)
-# For demonstration purposes, I'm using a simple threshold for example
-y = (df['barometric_pressure'] < 1010).astype(int)  # Example: 1 if pressure < 1010, else 0
-
-# Create and train the logistic regression model with increased iterations
-model = LogisticRegression(max_iter=1000)
-try:
-    model.fit(X, y)
-except ValueError as e:
-    logging.error(f'Error fitting model: {e}')
-    conn.close()
-    sys.exit(1)
-
-# Add precipitation predictions (probability) to the DataFrame
-df['precipitation_probability'] = model.predict_proba(X)[:, 1]
-
-# Convert probability to percentage
-df['precipitation_percentage'] = df['precipitation_probability'] * 100
-
-# Print the DataFrame to debug
-logging.info("DataFrame before updating the database:")
-logging.info(df.head())
+# Rows read, fitted and written back at a time; memory stays flat as history grows
+CHUNK_SIZE = 50000
+FEATURE_DTYPES = {feature: 'float32' for feature in FEATURES}
+PRESSURE = FEATURES.index('barometric_pressure')
+# Labels come from pressure, so rows are only trained on and scored once the
+# barometer stage has filled it in; until then they stay unscored
+SCORABLE = "barometric_pressure IS NOT NULL"
+UNSCORED = f"precipitation IS NULL AND {SCORABLE}"
 
 # Define a function to update the precipitation data in the database using the id column
-def update_precipitation_in_db():
-    for index, row in df.iterrows():
-        cursor.execute("""
-        UPDATE weather_data
-        SET precipitation = ?
-        WHERE id = ?
-        """, (row['precipitation_percentage'], row['id']))
-    conn.commit()
-
-# Update the precipitation data in the database
-update_precipitation_in_db()
-
-# Fetch and print the updated data for verification
-updated_df = pd.read_sql_query("SELECT * FROM weather_data LIMIT 5", conn)
-logging.info("DataFrame after updating the database:")
-logging.info(updated_df)
-
-# Close the database connection
-conn.close()
-
-logging.info("Precipitation data updated in the database.")
+def update_precipitation_in_db(conn, df):
+    bulk_update(conn, 'weather_data', 'id', 'precipitation', df[['id', 'precipitation_percentage']])
+
+def iter_chunks(conn, where='1', params=(), chunk_size=CHUNK_SIZE):
+    """Yield (ids, X) pages of at most chunk_size rows, in id order.
+
+    Features are read straight into float32 arrays with NULLs as NaN. Pages
+    are keyed on id rather than held open as one cursor, so the caller may
+    write back between pages without disturbing the read.
+    """
+    query = f"""SELECT id, {', '.join(FEATURES)} FROM weather_data
+                WHERE ({where}) AND id > ? ORDER BY id LIMIT ?"""
+    last_id = 0
+    while True:
+        df = pd.read_sql_query(query, conn, params=(*params, last_id, chunk_size), dtype=FEATURE_DTYPES)
+        if df.empty:
+            return
+        ids = df['id'].to_numpy()
+        yield ids, df[FEATURES].to_numpy(dtype=np.float32)
+        last_id = int(ids[-1])
+
+def labelled_chunks(conn, where=SCORABLE, params=()):
+    """Like iter_chunks, with the training labels added as a third element."""
+    for ids, X in iter_chunks(conn, where, params):
+        yield ids, X, make_labels(X[:, PRESSURE])
+
+def score_rows(conn, model, ids, X):
+    """Store the model's precipitation percentage for one chunk of rows."""
+    update_precipitation_in_db(conn, pd.DataFrame({
+        'id': ids, 'precipitation_percentage': model.predict_proba(X) * 100}))
+
+def full_retrain(conn):
+    """Refit the model from scratch on every scorable row, rescore them all and save a new version."""
+    start = time.perf_counter()
+    model = RainModel()
+    try:
+        with timer('weather_model_fit_seconds', mode='full'):
+            model.fit(lambda: labelled_chunks(conn))
+    except ValueError as e:
+        logging.error(f'Error fitting model: {e}')
+        return None
+    for ids, X in iter_chunks(conn, SCORABLE):
+        score_rows(conn, model, ids, X)
+    model.last_update = {'mode': 'full', 'rows': model.trained_rows, 'seconds': time.perf_counter() - start}
+    version = save_model(model)
+    set_gauge('weather_model_rows_trained', model.trained_rows)
+    logging.info(f"Full retrain on {model.trained_rows} rows saved as model v{version} "
+                 f"in {model.last_update['seconds']:.2f}s")
+    return model
+
+def incremental_update(conn, model):
+    """Update the model with rows it has not seen yet and score those rows only.
+
+    A row is trained on and scored in the same pass, once its pressure is
+    known, so every unscored row with a pressure is new to the model. That
+    includes older rows whose pressure arrived late. One pass over the
+    scorable-row index finds them all. The update overwrites the current
+    model version unless that version is due to be snapshotted.
+    """
+    start = time.perf_counter()
+    new_rows = 0
+    fit_seconds = 0.0
+    for ids, X in iter_chunks(conn, UNSCORED):
+        fit_start = time.perf_counter()
+        model.partial_fit(X, make_labels(X[:, PRESSURE]), int(ids[-1]))
+        fit_seconds += time.perf_counter() - fit_start
+        new_rows += len(ids)
+        score_rows(conn, model, ids, X)
+    if not new_rows:
+        logging.info(f'No new rows since model v{model.version}')
+        return model
+    model.last_update = {'mode': 'incremental', 'rows': new_rows, 'seconds': time.perf_counter() - start}
+    version = save_model(model, new_version=due_for_version(model))
+    observe('weather_model_fit_seconds', fit_seconds, mode='incremental')
+    set_gauge('weather_model_rows_trained', model.trained_rows)
+    logging.info(f"Model updated with {new_rows} new rows and saved as v{version} "
+                 f"in {model.last_update['seconds']:.2f}s")
+    return model
+
+def predict_precipitation(conn, full=False):
+    """Keep the rain model and the precipitation column current.
+
+    Normally the saved model is updated with new rows and only unscored rows
+    are predicted. A full retrain happens when there is no saved model yet,
+    when it was saved by another scikit-learn version, or when full=True.
+    """
+    cursor = conn.cursor()
+
+    # Features are read as numbers; legacy string-typed tables need migrating first
+    if not is_canonical(conn):
+        logging.error('weather_data uses the legacy layout; run migrate_weather_data.py first.')
+        return False
+
+    # Check if the precipitation column exists and add it if not
+    cursor.execute("PRAGMA table_info(weather_data)")
+    columns = [column_info[1] for column_info in cursor.fetchall()]
+    if 'precipitation' not in columns:
+        cursor.execute("ALTER TABLE weather_data ADD COLUMN precipitation REAL")
+        conn.commit()
+
+    model = None if full else load_model()
+    if model is not None and not sklearn_compatible(model):
+        logging.warning('Retraining the rain model from scratch for the installed scikit-learn')
+        model = None
+    if model is None:
+        return full_retrain(conn) is not None
+    return incremental_update(conn, model) is not None
+
+def compare_models(conn):
+    """Compare the saved incremental model with a fresh full retrain on every row.
+
+    Neither model is saved and the database is not changed. Returns a dict
+    with accuracy, log loss and runtime for each.
+    """
+    model = load_model()
+    if model is None:
+        logging.error('No saved model to compare; run an update or retrain first.')
+        return None
+
+    start = time.perf_counter()
+    full = RainModel()
+    try:
+        full.fit(lambda: labelled_chunks(conn))
+    except ValueError as e:
+        logging.error(f'Error fitting model: {e}')
+        return None
+    full_seconds = time.perf_counter() - start
+
+    # Accuracy and log loss are accumulated chunk by chunk
+    correct = {'incremental': 0, 'full': 0}
+    loss = {'incremental': 0.0, 'full': 0.0}
+    rows = 0
+    for ids, X, y in labelled_chunks(conn):
+        rows += len(y)
+        for name, candidate in (('incremental', model), ('full', full)):
+            probability = candidate.predict_proba(X)
+            correct[name] += accuracy_score(y, probability >= 0.5, normalize=False)
+            loss[name] += log_loss(y, probability, labels=[0, 1], normalize=False)
+
+    report = {'rows': rows}
+    for name, candidate, seconds, trained in (
+            ('incremental', model, model.last_update.get('seconds'), model.last_update.get('rows')),
+            ('full', full, full_seconds, full.trained_rows)):
+        report[name] = {
+            'version': candidate.version,
+            'accuracy': correct[name] / rows,
+            'log_loss': loss[name] / rows,
+            'seconds': seconds,
+            'rows_trained': trained,
+        }
+    return report
+
+def run_stage(conn=None):
+    """Pipeline entry point; opens weather_data.db unless a connection is shared."""
+    if conn is not None:
+        return predict_precipitation(conn)
+    conn = sqlite3.connect('weather_data.db')
+    try:
+        return predict_precipitation(conn)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    # Usage: basic_rain_prediction.py [update|retrain|report] [db_path]
+    # Schedule 'retrain' (e.g. nightly) to refit from scratch and rescore every row.
+    command = sys.argv[1] if len(sys.argv) > 1 else 'update'
+    conn = sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else 'weather_data.db')
+    try:
+        if command == 'update':
+            ok = predict_precipitation(conn)
+        elif command == 'retrain':
+            ok = predict_precipitation(conn, full=True)
+        elif command == 'report':
+            report = compare_models(conn)
+            ok = report is not None
+            if ok:
+                print(f"{'Model':<13} {'Version':<9} {'Accuracy':<10} {'Log loss':<10} {'Rows trained':<14} {'Runtime (s)'}")
+                print("=" * 70)
+                for name in ('incremental', 'full'):
+                    entry = report[name]
+                    seconds = f"{entry['seconds']:.3f}" if entry['seconds'] is not None else '-'
+                    print(f"{name:<13} {entry['version'] or '-':<9} {entry['accuracy']:<10.4f} {entry['log_loss']:<10.4f} "
+                          f"{entry['rows_trained'] or 0:<14} {seconds}")
+        else:
+            logging.error(f"Unknown command: {command}")
+            ok = False
+    finally:
+        conn.close()
+    sys.exit(0 if ok else 1)
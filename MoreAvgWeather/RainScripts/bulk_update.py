@@ -0,0 +1,44 @@
+import re
+import time
+import logging
+from instrumentation import inc, observe
+
+# Table and column names are interpolated into SQL, so only plain identifiers are accepted
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+STAGING_TABLE = 'bulk_update_staging'
+
+def _check_identifiers(*names):
+    for name in names:
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f'Invalid SQL identifier: {name!r}')
+
+def bulk_update(conn, table, key_column, value_column, rows):
+    """Set value_column for every (key, value) pair in rows with one set-based UPDATE.
+
+    rows is any iterable of (key, value) pairs or a two-column DataFrame. It
+    is streamed into a temporary staging table, which is then joined against
+    table in a single UPDATE ... FROM, all inside one transaction. When a
+    key appears more than once, the last value wins. Returns the number of
+    table rows updated.
+    """
+    _check_identifiers(table, key_column, value_column)
+    if hasattr(rows, 'itertuples'):
+        rows = rows.itertuples(index=False, name=None)
+
+    start = time.perf_counter()
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS temp.{STAGING_TABLE}")
+        conn.execute(f"CREATE TEMP TABLE {STAGING_TABLE} (key PRIMARY KEY, value) WITHOUT ROWID")
+        conn.executemany(f"INSERT OR REPLACE INTO temp.{STAGING_TABLE} (key, value) VALUES (?, ?)", rows)
+        staged = conn.execute(f"SELECT COUNT(*) FROM temp.{STAGING_TABLE}").fetchone()[0]
+        updated = conn.execute(f'''UPDATE {table} SET {value_column} = staging.value
+                                   FROM temp.{STAGING_TABLE} AS staging
+                                   WHERE {table}.{key_column} = staging.key''').rowcount
+        conn.execute(f"DROP TABLE temp.{STAGING_TABLE}")
+    elapsed = time.perf_counter() - start
+    observe('weather_db_seconds', elapsed, operation='bulk_update')
+    inc('weather_rows_updated_total', updated, table=table, column=value_column)
+    logging.info(f'Bulk update of {table}.{value_column}: {staged} staged, {updated} rows updated '
+                 f'in {elapsed:.2f}s')
+    return updated
@@ -0,0 +1,150 @@
+import os
+import sys
+import numpy as np
+
+# GeoTIFF tags carrying the georeferencing of a north-up raster
+MODEL_PIXEL_SCALE_TAG = 33550
+MODEL_TIEPOINT_TAG = 33922
+
+class DemRaster:
+    """A north-up elevation grid in geographic (lon/lat degree) coordinates.
+
+    data is a 2-D array, normally a read-only memory map, whose row 0 is the
+    northern edge. x_left/y_top are the outer edges of the top-left cell.
+    """
+
+    def __init__(self, data, x_left, y_top, cell_x, cell_y, nodata=None):
+        self.data = data
+        self.x_left = x_left
+        self.y_top = y_top
+        self.cell_x = cell_x
+        self.cell_y = cell_y
+        self.nodata = nodata
+
+    def elevations(self, lats, lons):
+        """Bilinearly interpolated elevations for arrays of points, NaN where unknown.
+
+        All points are handled in one vectorized pass; only the grid cells
+        around the requested points are read from the memory map.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        rows, cols = self.data.shape
+
+        # Fractional pixel positions relative to cell centres
+        fx = (lons - self.x_left) / self.cell_x - 0.5
+        fy = (self.y_top - lats) / self.cell_y - 0.5
+        inside = (fx >= -0.5) & (fx <= cols - 0.5) & (fy >= -0.5) & (fy <= rows - 0.5)
+
+        col0 = np.clip(np.floor(fx), 0, max(cols - 2, 0)).astype(np.intp)
+        row0 = np.clip(np.floor(fy), 0, max(rows - 2, 0)).astype(np.intp)
+        col1 = np.minimum(col0 + 1, cols - 1)
+        row1 = np.minimum(row0 + 1, rows - 1)
+        wx = np.clip(fx - col0, 0.0, 1.0)
+        wy = np.clip(fy - row0, 0.0, 1.0)
+
+        corners = np.stack([self.data[row0, col0], self.data[row0, col1],
+                            self.data[row1, col0], self.data[row1, col1]]).astype(np.float64)
+        if self.nodata is not None:
+            corners[corners == self.nodata] = np.nan
+
+        top = corners[0] * (1 - wx) + corners[1] * wx
+        bottom = corners[2] * (1 - wx) + corners[3] * wx
+        result = top * (1 - wy) + bottom * wy
+        result[~inside] = np.nan
+        return result
+
+    def lookup(self, points):
+        """Return {(lat, lng): elevation} for the points this raster covers."""
+        if not points:
+            return {}
+        lats, lons = zip(*points)
+        values = self.elevations(lats, lons)
+        return {point: float(value) for point, value in zip(points, values) if not np.isnan(value)}
+
+def _read_header(path):
+    header = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                header[parts[0].lower()] = parts[1]
+    return header
+
+def open_gridfloat(path):
+    """Memory-map an ESRI/USGS GridFloat tile (.flt with a .hdr next to it)."""
+    header = _read_header(os.path.splitext(path)[0] + '.hdr')
+    rows, cols = int(header['nrows']), int(header['ncols'])
+    cell = float(header['cellsize'])
+    byte_order = '>' if header.get('byteorder', 'LSBFIRST').upper() == 'MSBFIRST' else '<'
+    data = np.memmap(path, dtype=f'{byte_order}f4', mode='r', shape=(rows, cols))
+    x_left = float(header.get('xllcorner', header.get('xllcenter', 0)))
+    y_bottom = float(header.get('yllcorner', header.get('yllcenter', 0)))
+    if 'xllcenter' in header:
+        x_left -= cell / 2
+        y_bottom -= cell / 2
+    nodata = float(header['nodata_value']) if 'nodata_value' in header else None
+    return DemRaster(data, x_left, y_bottom + rows * cell, cell, cell, nodata)
+
+# BIL PIXELTYPE and NBITS to numpy kind and item size
+BIL_KINDS = {'SIGNEDINT': 'i', 'UNSIGNEDINT': 'u', 'FLOAT': 'f'}
+
+def open_bil(path):
+    """Memory-map a single-band BIL tile (.bil with an ESRI BIL .hdr next to it).
+
+    The data type comes from NBITS/PIXELTYPE and BYTEORDER, the origin from
+    ULXMAP/ULYMAP (the centre of the top-left cell) and XDIM/YDIM.
+    """
+    header = _read_header(os.path.splitext(path)[0] + '.hdr')
+    if int(header.get('nbands', 1)) != 1:
+        raise ValueError(f'Only single-band BIL DEMs are supported: {path}')
+    rows, cols = int(header['nrows']), int(header['ncols'])
+    bits = int(header.get('nbits', 8))
+    pixel_type = header.get('pixeltype', 'FLOAT' if bits == 32 else 'UNSIGNEDINT').upper()
+    if pixel_type not in BIL_KINDS:
+        raise ValueError(f'Unsupported BIL PIXELTYPE {pixel_type}: {path}')
+    # BYTEORDER is I (Intel, little-endian) or M (Motorola, big-endian)
+    byte_order = '>' if header.get('byteorder', 'I').upper().startswith('M') else '<'
+    data = np.memmap(path, dtype=f'{byte_order}{BIL_KINDS[pixel_type]}{bits // 8}', mode='r',
+                     offset=int(header.get('skipbytes', 0)), shape=(rows, cols))
+    cell_x, cell_y = float(header.get('xdim', 1)), float(header.get('ydim', 1))
+    x_left = float(header.get('ulxmap', 0)) - cell_x / 2
+    y_top = float(header.get('ulymap', rows - 1)) + cell_y / 2
+    nodata = header.get('nodata', header.get('nodata_value'))
+    return DemRaster(data, x_left, y_top, cell_x, cell_y, float(nodata) if nodata is not None else None)
+
+def open_geotiff(path):
+    """Memory-map an uncompressed single-band GeoTIFF. Requires the tifffile package."""
+    try:
+        import tifffile
+    except ImportError:
+        raise ImportError('Reading GeoTIFF DEMs requires tifffile (pip install tifffile)')
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        scale = page.tags[MODEL_PIXEL_SCALE_TAG].value
+        tiepoint = page.tags[MODEL_TIEPOINT_TAG].value
+        nodata = page.tags[42113].value if 42113 in page.tags else None  # GDAL_NODATA
+    # Raises ValueError if the image is compressed or tiled and cannot be mapped
+    data = tifffile.memmap(path, mode='r')
+    i, j, _, x, y, _ = tiepoint[:6]
+    return DemRaster(data, x - i * scale[0], y + j * scale[1], scale[0], scale[1],
+                     float(nodata) if nodata is not None else None)
+
+def open_dem(path):
+    """Open a DEM tile by extension: .flt GridFloat, .bil BIL or .tif/.tiff GeoTIFF."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.flt':
+        return open_gridfloat(path)
+    if extension == '.bil':
+        return open_bil(path)
+    if extension in ('.tif', '.tiff'):
+        return open_geotiff(path)
+    raise ValueError(f'Unsupported DEM format: {path}')
+
+if __name__ == "__main__":
+    # Usage: dem_elevation.py <tile> <lat> <lon> [<lat> <lon> ...]
+    dem = open_dem(sys.argv[1])
+    coords = [float(value) for value in sys.argv[2:]]
+    points = list(zip(coords[0::2], coords[1::2]))
+    for (lat, lng), elevation in zip(points, dem.elevations(*zip(*points))):
+        print(f'{lat}, {lng}: {elevation:.1f} m')
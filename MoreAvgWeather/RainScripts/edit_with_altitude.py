@@ -1,7 +1,12 @@
+import os
 import sqlite3
-import requests
 import logging
-import time
+import requests
+import http_transport
+import elevation_cache
+from instrumentation import inc, timer
+from dem_elevation import open_dem
+from locations import neighborhoods_coordinates
 
 # Setting up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -10,42 +15,80 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 API_KEY = 'Enter Yours Here'
 ELEVATION_API_URL = 'https://maps.googleapis.com/maps/api/elevation/json'
 
-# Coordinates for neighborhoods
-neighborhoods_coordinates = {
-    "Capitol Hill": {"latitude": 47.6062, "longitude": -122.3321},
-    "Ballard": {"latitude": 47.6685, "longitude": -122.3815},
-    "Fremont": {"latitude": 47.6536, "longitude": -122.3509},
-    "University District": {"latitude": 47.6588, "longitude": -122.3127},
-    "Queen Anne": {"latitude": 47.6290, "longitude": -122.3570},
-    "Wallingford": {"latitude": 47.6556, "longitude": -122.3370},
-    "Woodland Park Zoo": {"latitude": 47.6694, "longitude": -122.3515},
-    "KOMO News": {"latitude": 47.6187, "longitude": -122.3588},
-    "KIRO News": {"latitude": 47.6251, "longitude": -122.3341},
-    "KEXP": {"latitude": 47.6317, "longitude": -122.3576},
-    "Alki Beach": {"latitude": 47.5785, "longitude": -122.4156},
-    "Central District": {"latitude": 47.5985, "longitude": -122.3001},
-    "Madrona": {"latitude": 47.6074, "longitude": -122.2892},
-    "Magnolia": {"latitude": 47.6447, "longitude": -122.4004},
-    "Interbay": {"latitude": 47.6545, "longitude": -122.3705}
-}
+# The Elevation API accepts up to 512 pipe-separated locations per request;
+# stay well inside that and the 16k-character URL limit
+ELEVATION_BATCH_SIZE = 256
+
+# Optional offline DEM tile (GridFloat .flt or BIL .bil with a .hdr, or uncompressed GeoTIFF). When it
+# exists it is tried before the Elevation API, which remains the fallback.
+DEM_PATH = 'seattle_dem.flt'
+_dem = None
+
+def get_altitudes(points, api_key):
+    """Get altitudes for a list of (lat, lng) points with batched Elevation API requests.
+
+    Returns {(lat, lng): elevation}; points in a failed batch are left out.
+    """
+    altitudes = {}
+    for i in range(0, len(points), ELEVATION_BATCH_SIZE):
+        batch = points[i:i + ELEVATION_BATCH_SIZE]
+        locations = '|'.join(f"{lat},{lng}" for lat, lng in batch)
+        logging.debug(f"Requesting altitude for {len(batch)} locations")
+
+        try:
+            response = http_transport.get('elevation', ELEVATION_API_URL, params={'locations': locations, 'key': api_key})
+            result = response.json()
+            if result['status'] == 'OK':
+                # Results come back in the same order as the requested locations
+                for point, entry in zip(batch, result['results']):
+                    altitudes[point] = entry['elevation']
+            else:
+                logging.error(f"Error fetching altitude: {result['status']} - {result.get('error_message', 'No error message')}")
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            # Keep the batches already fetched so they still reach the cache
+            inc('weather_fetch_failures_total', provider='elevation')
+            logging.error(f"Error fetching altitude for {len(batch)} locations: {e}")
+    return altitudes
 
 def get_altitude(lat, lng, api_key):
     """Get the altitude for given latitude and longitude using Google Maps Elevation API."""
-    url = f"https://maps.googleapis.com/maps/api/elevation/json?locations={lat},{lng}&key={api_key}"
-    logging.info(f"Requesting altitude for lat: {lat}, lng: {lng} with URL: {url}")
-    
-    response = requests.get(url)
-    result = response.json()
-    
-    if result['status'] == 'OK':
-        return result['results'][0]['elevation']
-    else:
-        logging.error(f"Error fetching altitude: {result['status']} - {result.get('error_message', 'No error message')}")
-        return None
-
-def update_database_with_altitude(db_path, api_key):
-    """Update the SQLite database with altitude data."""
-    conn = sqlite3.connect(db_path)
+    return get_altitudes([(lat, lng)], api_key).get((lat, lng))
+
+def get_dem():
+    """The memory-mapped DEM tile, opened once per process, or None if not configured."""
+    global _dem
+    if _dem is None and DEM_PATH and os.path.exists(DEM_PATH):
+        _dem = open_dem(DEM_PATH)
+    return _dem
+
+def get_dem_altitudes(points):
+    """Altitudes for points covered by the DEM tile, in one vectorized lookup."""
+    dem = get_dem()
+    return dem.lookup(points) if dem is not None else {}
+
+def resolve_altitudes(conn, points, api_key):
+    """Altitudes for points from the on-disk cache, then the DEM, then the Elevation API."""
+    altitudes = elevation_cache.lookup(conn, points)
+    misses = [point for point in points if point not in altitudes]
+    hits = len(points) - len(misses)
+    # Providers in order of preference; each only sees what the previous ones missed
+    providers = [('dem', get_dem_altitudes), ('google', lambda misses: get_altitudes(misses, api_key))]
+    for source, provider in providers:
+        if not misses:
+            break
+        found = provider(misses)
+        elevation_cache.store(conn, found, source)
+        altitudes.update(found)
+        misses = [point for point in misses if point not in found]
+        logging.info(f"Altitude from {source}: {len(found)} points")
+    logging.info(f"Altitude cache: {hits} hits, {len(points) - hits} misses")
+    return altitudes
+
+def update_database_with_altitude(db_path, api_key, conn=None):
+    """Update the SQLite database with altitude data, reusing conn if one is given."""
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     # Check if necessary columns exist, and add them if not
@@ -60,26 +103,31 @@ def update_database_with_altitude(db_path, api_key):
     if 'altitude' not in columns:
         cursor.execute("ALTER TABLE weather_data ADD COLUMN altitude REAL")
 
-    # Fetch and update altitude for each neighborhood
-    for name, coords in neighborhoods_coordinates.items():
-        lat, lng = coords['latitude'], coords['longitude']
-        try:
-            altitude = get_altitude(lat, lng, api_key)
-            if altitude is not None:
-                cursor.execute("""
-                UPDATE weather_data
-                SET latitude = ?, longitude = ?, altitude = ?, neighborhood = ?
-                WHERE location = ?
-                """, (lat, lng, altitude, name, name))
-                conn.commit()
-                logging.info(f"Updated {name} with altitude {altitude}")
-            time.sleep(1)  # Add delay to avoid hitting rate limits
-        except Exception as e:
-            logging.error(f"Failed to update {name}: {e}")
-
-    conn.close()
+    try:
+        points = {name: (coords['latitude'], coords['longitude']) for name, coords in neighborhoods_coordinates.items()}
+        altitudes = resolve_altitudes(conn, list(points.values()), api_key)
+
+        # Only rows that have not been given an altitude yet need updating
+        updates = [(lat, lng, altitudes[(lat, lng)], name, name)
+                   for name, (lat, lng) in points.items() if (lat, lng) in altitudes]
+        with timer('weather_db_seconds', operation='altitude'), conn:
+            cursor.executemany("""
+            UPDATE weather_data
+            SET latitude = ?, longitude = ?, altitude = ?, neighborhood = ?
+            WHERE location = ? AND altitude IS NULL
+            """, updates)
+        inc('weather_rows_updated_total', cursor.rowcount, table='weather_data', column='altitude')
+        logging.info(f"Updated altitude for {len(updates)} neighborhoods")
+    except Exception as e:
+        logging.error(f"Failed to update altitude: {e}")
+
+    if own_conn:
+        conn.close()
+
+def run_stage(conn=None):
+    """Pipeline entry point: attach altitude to every neighborhood's rows."""
+    update_database_with_altitude('weather_data.db', API_KEY, conn)
+    return True
 
 if __name__ == "__main__":
-    db_path = 'weather_data.db'
-    api_key = API_KEY
-    update_database_with_altitude(db_path, api_key)
+    run_stage()
@@ -1,15 +1,31 @@
 import sqlite3
-import math
+import numpy as np
 import logging
 import sys
+import time
+from weather_schema import is_canonical
+from bulk_update import bulk_update
 
 # Setting up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
-# Function to calculate barometric pressure
+# Rows are read and written in chunks so memory stays bounded on large backlogs
+CHUNK_SIZE = 100000
+
+# Rows that still need a pressure value and have everything needed to compute it.
+# Served by the idx_weather_data_pending_pressure partial index.
+PENDING_ROWS = """
+SELECT id, temperature, altitude FROM weather_data
+WHERE barometric_pressure IS NULL
+  AND temperature IS NOT NULL AND humidity IS NOT NULL AND altitude IS NOT NULL
+  AND id > ?
+ORDER BY id LIMIT ?
+"""
+
+# Function to calculate barometric pressure; works on scalars or whole NumPy columns
 def calculate_barometric_pressure(temperature, humidity, altitude):
     # Convert temperature to Kelvin
-    temp_kelvin = float(temperature) + 273.15
+    temp_kelvin = np.asarray(temperature, dtype=np.float64) + 273.15
     # Constants
     p0 = 1013.25  # Sea level standard atmospheric pressure (hPa)
     g = 9.80665  # Gravitational acceleration (m/s^2)
@@ -17,90 +33,67 @@ def calculate_barometric_pressure(temperature, humidity, altitude):
     R = 8.31447  # Universal gas constant (J/(mol*K))
     M = 0.0289644  # Molar mass of dry air (kg/mol)
     # Calculate barometric pressure
-    pressure = p0 * math.exp((-g * M * altitude) / (R * temp_kelvin))
+    pressure = p0 * np.exp((-g * M * np.asarray(altitude, dtype=np.float64)) / (R * temp_kelvin))
     return pressure
 
-# Function to convert temperature string to float
-def convert_temperature(temp_str):
-    if temp_str is None or temp_str == "N/A":
-        return None  # Return None for invalid temperature entries
-    try:
-        # Attempt to convert directly to float
-        return float(temp_str)
-    except ValueError:
-        if '°F' in temp_str:
-            # Remove '°F' and convert to Celsius
-            temp_fahrenheit = float(temp_str.replace('°F', ''))
-            temp_celsius = (temp_fahrenheit - 32) * 5.0/9.0
-            return temp_celsius
-        elif '°C' in temp_str:
-            # Remove '°C' and convert to float
-            return float(temp_str.replace('°C', ''))
-        else:
-            raise ValueError(f"Unknown temperature format: {temp_str}")
+def add_barometric_pressure(conn):
+    """Compute barometric pressure for rows that do not have one yet.
 
-# Function to convert humidity string to float
-def convert_humidity(humidity_str):
-    if isinstance(humidity_str, float):
-        return humidity_str  # Return the value if it's already a float
-    try:
-        # Remove '%' and convert to float
-        return float(humidity_str.replace('%', ''))
-    except ValueError:
-        raise ValueError(f"Unknown humidity format: {humidity_str}")
+    Rows are processed a chunk at a time with the formula running over whole
+    NumPy columns, and the results are applied with one set-based UPDATE in a
+    single transaction. Already-computed rows are never touched again.
+    """
+    cursor = conn.cursor()
 
-# Connect to the SQLite database
-conn = sqlite3.connect('weather_data.db')
-cursor = conn.cursor()
+    # Values must already be numeric; legacy string-typed tables need migrating first
+    if not is_canonical(conn):
+        logging.error('weather_data uses the legacy layout; run migrate_weather_data.py first.')
+        return False
 
-# Check if the altitude column exists
-cursor.execute("PRAGMA table_info(weather_data)")
-columns = [column_info[1] for column_info in cursor.fetchall()]
-if 'altitude' not in columns:
-    logging.error('Altitude column does not exist in the weather_data table.')
-    conn.close()
-    sys.exit(1)
+    # Check if the altitude column exists
+    cursor.execute("PRAGMA table_info(weather_data)")
+    columns = [column_info[1] for column_info in cursor.fetchall()]
+    if 'altitude' not in columns:
+        logging.error('Altitude column does not exist in the weather_data table.')
+        return False
 
-# Check if the barometric_pressure column already exists
-if 'barometric_pressure' not in columns:
-    cursor.execute("ALTER TABLE weather_data ADD COLUMN barometric_pressure REAL")
-    conn.commit()
+    # Check if the barometric_pressure column already exists
+    if 'barometric_pressure' not in columns:
+        cursor.execute("ALTER TABLE weather_data ADD COLUMN barometric_pressure REAL")
+        conn.commit()
 
-# Query the data from the database
-try:
-    cursor.execute("SELECT id, temperature, humidity, altitude FROM weather_data")
-    data = cursor.fetchall()
-except sqlite3.OperationalError as e:
-    logging.error(f'SQL error: {e}')
-    conn.close()
-    sys.exit(1)
+    def pressures():
+        # Chunks are paged by id and computed lazily while bulk_update streams them
+        # into its staging table; weather_data itself is only written at the end
+        last_id = 0
+        while True:
+            rows = conn.execute(PENDING_ROWS, (last_id, CHUNK_SIZE)).fetchall()
+            if not rows:
+                return
+            ids = [row[0] for row in rows]
+            values = np.array([row[1:] for row in rows], dtype=np.float64)
+            yield from zip(ids, calculate_barometric_pressure(values[:, 0], None, values[:, 1]).tolist())
+            last_id = ids[-1]
 
-# Process the data
-for row in data:
-    entry_id = row[0]
-    temperature = convert_temperature(row[1])
-    if temperature is None:
-        logging.warning(f'Skipping entry ID {entry_id}: Invalid temperature')
-        continue  # Skip entries with invalid temperature
-    humidity = convert_humidity(row[2])
-    if humidity is None:
-        logging.warning(f'Skipping entry ID {entry_id}: Invalid humidity')
-        continue  # Skip entries with invalid humidity
-    altitude = row[3]
-    if altitude is None:
-        logging.warning(f'Skipping entry ID {entry_id}: Invalid altitude')
-        continue  # Skip entries with invalid altitude
-    altitude = float(altitude)
-    
+    start = time.perf_counter()
     try:
-        barometric_pressure = calculate_barometric_pressure(temperature, humidity, altitude)
-        cursor.execute("UPDATE weather_data SET barometric_pressure = ? WHERE id = ?", (barometric_pressure, entry_id))
-        logging.info(f'Updated entry ID {entry_id} with barometric pressure {barometric_pressure}')
-    except Exception as e:
-        logging.error(f'Failed to update entry ID {entry_id}: {e}')
+        updated = bulk_update(conn, 'weather_data', 'id', 'barometric_pressure', pressures())
+    except sqlite3.OperationalError as e:
+        logging.error(f'SQL error: {e}')
+        return False
+
+    logging.info(f'Barometric pressure added for {updated} new entries in {time.perf_counter() - start:.2f}s.')
+    return True
 
-# Commit the changes and close the connection
-conn.commit()
-conn.close()
+def run_stage(conn=None):
+    """Pipeline entry point; opens weather_data.db unless a connection is shared."""
+    if conn is not None:
+        return add_barometric_pressure(conn)
+    conn = sqlite3.connect('weather_data.db')
+    try:
+        return add_barometric_pressure(conn)
+    finally:
+        conn.close()
 
-logging.info('Barometric pressure added for each entry.')
+if __name__ == "__main__":
+    sys.exit(0 if run_stage() else 1)
@@ -0,0 +1,48 @@
+import time
+
+# Coordinates are rounded to 5 decimal places (about 1 m) and stored as
+# integers so lookups never depend on floating-point equality
+PRECISION = 5
+
+CREATE_ELEVATION_CACHE = '''CREATE TABLE IF NOT EXISTS elevation_cache (
+                              lat_key INTEGER NOT NULL,
+                              lon_key INTEGER NOT NULL,
+                              elevation REAL NOT NULL,
+                              source TEXT,
+                              fetched_at INTEGER,
+                              PRIMARY KEY (lat_key, lon_key)
+                            ) WITHOUT ROWID'''
+
+def coordinate_key(lat, lng):
+    """Cache key for a coordinate pair."""
+    scale = 10 ** PRECISION
+    return round(lat * scale), round(lng * scale)
+
+def ensure_cache(conn):
+    conn.execute(CREATE_ELEVATION_CACHE)
+
+def lookup(conn, points):
+    """Return {(lat, lng): elevation} for the points already in the cache."""
+    ensure_cache(conn)
+    keys = {coordinate_key(lat, lng): (lat, lng) for lat, lng in points}
+    found = {}
+    # One query per chunk keeps us under SQLite's bound-parameter limit
+    items = list(keys)
+    for i in range(0, len(items), 400):
+        chunk = items[i:i + 400]
+        placeholders = ' OR '.join(['(lat_key = ? AND lon_key = ?)'] * len(chunk))
+        params = [value for key in chunk for value in key]
+        for lat_key, lon_key, elevation in conn.execute(
+                f"SELECT lat_key, lon_key, elevation FROM elevation_cache WHERE {placeholders}", params):
+            found[keys[(lat_key, lon_key)]] = elevation
+    return found
+
+def store(conn, elevations, source):
+    """Persist {(lat, lng): elevation} results from a provider."""
+    ensure_cache(conn)
+    now = int(time.time())
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO elevation_cache (lat_key, lon_key, elevation, source, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            [(*coordinate_key(lat, lng), elevation, source, now)
+             for (lat, lng), elevation in elevations.items() if elevation is not None])
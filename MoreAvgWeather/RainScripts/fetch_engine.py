@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import inc, log_sampled
+
+# Maximum number of requests in flight at once for each provider
+DEFAULT_CONCURRENCY = 8
+PROVIDER_CONCURRENCY = {
+    'nws': 4,
+    'openmeteo': 8,
+    'openweathermap': 8,
+    'weatherapi': 8,
+    'weatherstack': 4,
+    'elevation': 4,
+    'tomorrowio': 4,
+}
+
+def get_concurrency(provider):
+    """Return the concurrency limit configured for a provider."""
+    return PROVIDER_CONCURRENCY.get(provider, DEFAULT_CONCURRENCY)
+
+async def _fetch_one(loop, executor, semaphore, provider, fetch, location, args):
+    async with semaphore:
+        try:
+            result = await loop.run_in_executor(executor, fetch, *args)
+        except Exception as e:
+            inc('weather_fetch_failures_total', provider=provider)
+            log_sampled(f'{provider}:fetch', f"{provider}: fetch failed for {location}: {e}", level=logging.ERROR)
+            result = None
+    return location, result
+
+async def _fetch_provider(loop, executor, provider, fetch, jobs, concurrency=None):
+    semaphore = asyncio.Semaphore(concurrency or get_concurrency(provider))
+    tasks = [_fetch_one(loop, executor, semaphore, provider, fetch, location, args)
+             for location, args in jobs.items()]
+    return dict(await asyncio.gather(*tasks))
+
+async def fetch_providers_async(provider_jobs):
+    """Fetch every location for every provider concurrently.
+
+    provider_jobs maps a provider name to a (fetch, jobs) pair, where jobs maps
+    a location name to the argument tuple passed to fetch. Returns a dict of
+    provider -> {location: result}. A failed fetch yields None for that location.
+    """
+    loop = asyncio.get_running_loop()
+    workers = sum(min(get_concurrency(p), max(len(jobs), 1)) for p, (_, jobs) in provider_jobs.items())
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        results = await asyncio.gather(*[
+            _fetch_provider(loop, executor, provider, fetch, jobs)
+            for provider, (fetch, jobs) in provider_jobs.items()
+        ])
+    return dict(zip(provider_jobs.keys(), results))
+
+def fetch_providers(provider_jobs):
+    """Blocking wrapper around fetch_providers_async."""
+    return asyncio.run(fetch_providers_async(provider_jobs))
@@ -0,0 +1,159 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation import inc, observe
+
+# Published request quotas per provider as (requests, per_seconds, burst), or a
+# list of them for providers with several limits. These follow each provider's
+# free/basic tier; raise them to match your plan. Bursts cover a whole cycle's
+# requests (one per location every 15 minutes) wherever the quota allows it, so
+# a cycle never sleeps for tokens the quota would have granted anyway.
+PROVIDER_QUOTAS = {
+    'nws': (5, 1, 5),                          # No published quota; stay polite
+    'openmeteo': (600, 60, 20),                # 600 calls/minute (non-commercial)
+    'openweathermap': (60, 60, 60),            # 60 calls/minute (free)
+    'weatherapi': (1000000, 30 * 86400, 100),  # 1M calls/month (free), ~347 per cycle
+    'weatherstack': (50000, 30 * 86400, 20),   # 50k calls/month (standard), ~17 per cycle
+    'elevation': (6000, 60, 50),               # 6,000 queries/minute
+    'tomorrowio': [(25, 3600, 25), (3, 1, 3)], # 25 calls/hour and 3/second (free)
+}
+DEFAULT_QUOTA = (10, 1, 10)
+
+# Responses worth retrying, and how long to wait for a response
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+REQUEST_TIMEOUT = 30
+MAX_BACKOFF = 60
+
+# Connection pool sizing; should cover the largest per-provider concurrency
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 16
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at rate tokens/second up to capacity."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server reported throttling."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = 0
+
+class CompositeBucket:
+    """Token buckets that must all grant a token, for providers with several published limits."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+
+    def acquire(self):
+        return sum(bucket.acquire() for bucket in self.buckets)
+
+    def drain(self):
+        for bucket in self.buckets:
+            bucket.drain()
+
+_session = None
+_buckets = {}
+_lock = threading.Lock()
+
+def get_session():
+    """Return the process-wide pooled keep-alive session."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+def get_bucket(provider):
+    """Return the token bucket for a provider, creating it from its quota."""
+    with _lock:
+        if provider not in _buckets:
+            quota = PROVIDER_QUOTAS.get(provider, DEFAULT_QUOTA)
+            buckets = [TokenBucket(count / per_seconds, burst)
+                       for count, per_seconds, burst in (quota if isinstance(quota, list) else [quota])]
+            _buckets[provider] = buckets[0] if len(buckets) == 1 else CompositeBucket(buckets)
+        return _buckets[provider]
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) to seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def backoff_delay(attempt, backoff_factor, retry_after=None):
+    """Delay before the next attempt: Retry-After if given, else full-jitter exponential."""
+    if retry_after is not None:
+        return min(retry_after, MAX_BACKOFF)
+    return random.uniform(0, min(MAX_BACKOFF, backoff_factor * (2 ** attempt)))
+
+def get(provider, url, params=None, headers=None, stream=False, retries=3, backoff_factor=1, timeout=REQUEST_TIMEOUT):
+    """GET through the shared session, rate limited and retried per provider."""
+    session = get_session()
+    bucket = get_bucket(provider)
+    for attempt in range(retries + 1):
+        waited = bucket.acquire()
+        if waited:
+            inc('weather_rate_limit_wait_seconds_total', waited, provider=provider)
+        start = time.perf_counter()
+        try:
+            response = session.get(url, params=params, headers=headers, stream=stream, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            inc('weather_http_requests_total', provider=provider, code='error')
+            if attempt == retries:
+                raise
+            inc('weather_http_retries_total', provider=provider)
+            delay = backoff_delay(attempt, backoff_factor)
+            logging.warning(f"{provider}: {e}. Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)
+            continue
+        # Streamed responses are timed to the headers; the body is read by the caller
+        observe('weather_http_request_seconds', time.perf_counter() - start, provider=provider)
+        inc('weather_http_requests_total', provider=provider, code=str(response.status_code))
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        inc('weather_http_retries_total', provider=provider)
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if response.status_code == 429:
+            bucket.drain()
+        delay = backoff_delay(attempt, backoff_factor, retry_after)
+        logging.warning(f"{provider}: HTTP {response.status_code}. Retrying in {delay:.1f} seconds...")
+        response.close()
+        time.sleep(delay)
@@ -0,0 +1,89 @@
+import sqlite3
+import logging
+import time
+from instrumentation import inc, observe
+from weather_schema import (FORECAST_RETENTION_SECONDS, INSERT_OBSERVATION, PRUNE_FORECASTS, UPSERT_FORECAST,
+                            ensure_schema, normalize_observation)
+
+# Connection tuning for the write-heavy weather database. WAL lets readers run
+# during a write and NORMAL only fsyncs at checkpoints, which is safe in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",  # 64 MiB page cache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+def connect(db_name, **kwargs):
+    """Open a connection to the weather database with the ingest PRAGMAs applied."""
+    conn = sqlite3.connect(db_name, **kwargs)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def write_observations(db_name, provider, observations, timestamp=None, conn=None):
+    """Write a whole cycle of (location, temperature, wind_speed, humidity) rows.
+
+    Raw provider values are parsed into canonical units here, once, and all rows
+    go through one prepared executemany inside a single transaction. Every row
+    shares the cycle timestamp (now, unless given). Pass an open connection to
+    reuse it; otherwise one is opened and closed here. Returns the number of
+    rows written and logs the achieved rows/sec.
+    """
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    rows = [normalize_observation(provider, location, temperature, wind_speed, humidity, timestamp)
+            for location, temperature, wind_speed, humidity in observations]
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_name)
+    try:
+        start = time.perf_counter()
+        with conn:
+            ensure_schema(conn)
+            conn.executemany(INSERT_OBSERVATION, rows)
+        elapsed = time.perf_counter() - start
+    finally:
+        if own_conn:
+            conn.close()
+
+    observe('weather_db_seconds', elapsed, operation='ingest')
+    inc('weather_rows_written_total', len(rows), table='weather_data')
+    inc('weather_observations_total', len(rows), provider=provider)
+    rate = len(rows) / elapsed if elapsed > 0 else float('inf')
+    logging.info(f"Wrote {len(rows)} rows to {db_name} in {elapsed * 1000:.1f} ms ({rate:.0f} rows/sec)")
+    return len(rows)
+
+def write_forecasts(db_name, provider, forecasts, issued_at=None, conn=None):
+    """Write (location, hour, temperature, wind_speed, humidity) forecast rows in one transaction.
+
+    Values are normalized like observations, with the forecast hour as the
+    row's time. Hours already forecast are overwritten with the newer values,
+    and the provider's hours older than FORECAST_RETENTION_SECONDS are
+    deleted in the same transaction. Returns the number of rows written.
+    """
+    issued_at = int(time.time()) if issued_at is None else issued_at
+    rows = []
+    for location, hour, temperature, wind_speed, humidity in forecasts:
+        _, _, valid_at, temperature, wind_speed, humidity = normalize_observation(
+            provider, location, temperature, wind_speed, humidity, hour)
+        rows.append((provider, location, valid_at, issued_at, temperature, wind_speed, humidity))
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_name)
+    try:
+        start = time.perf_counter()
+        with conn:
+            ensure_schema(conn)
+            conn.executemany(UPSERT_FORECAST, rows)
+            pruned = conn.execute(PRUNE_FORECASTS, (provider, issued_at - FORECAST_RETENTION_SECONDS)).rowcount
+        elapsed = time.perf_counter() - start
+    finally:
+        if own_conn:
+            conn.close()
+
+    observe('weather_db_seconds', elapsed, operation='forecasts')
+    inc('weather_rows_written_total', len(rows), table='weather_forecasts')
+    logging.info(f"Wrote {len(rows)} {provider} forecast rows to {db_name} in {elapsed * 1000:.1f} ms; "
+                 f"pruned {pruned} past hours")
+    return len(rows)
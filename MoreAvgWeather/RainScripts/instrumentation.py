@@ -0,0 +1,226 @@
+import bisect
+import cProfile
+import io
+import logging
+import math
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Prometheus text exposition written after every cycle, e.g. for node_exporter's textfile collector
+METRICS_FILE = 'weather_metrics.prom'
+# Upper bounds (seconds) of the histogram buckets; covers a fast query up to a slow model fit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Stage profiles are saved here as pstats files (open with snakeviz or pstats)
+PROFILE_DIR = 'profiles'
+# Functions by cumulative time logged after each profiled stage
+PROFILE_TOP = 15
+
+# Repetitive per-item messages are logged the first time and then every Nth time
+LOG_SAMPLE_EVERY = 100
+
+# What the pipeline records; names follow Prometheus conventions (_total counters, _seconds units)
+HELP = {
+    'weather_http_request_seconds': 'HTTP round-trip time per provider',
+    'weather_http_requests_total': 'HTTP responses per provider and status code (code="error" for connection failures)',
+    'weather_http_retries_total': 'Requests retried after a throttling, server or connection error',
+    'weather_rate_limit_wait_seconds_total': 'Time spent waiting for a provider quota token',
+    'weather_fetch_failures_total': 'Location fetches that raised',
+    'weather_invalid_responses_total': 'Provider responses with missing or unparseable fields',
+    'weather_observations_total': 'Observation rows ingested per provider',
+    'weather_rows_written_total': 'Rows inserted or upserted per table',
+    'weather_rows_updated_total': 'Rows updated in place per table and column',
+    'weather_db_seconds': 'Time spent in database transactions per operation',
+    'weather_model_fit_seconds': 'Rain model fit time per update mode',
+    'weather_model_rows_trained': 'Rows the current rain model has been trained on',
+    'weather_stage_seconds': 'Pipeline stage run time',
+    'weather_stage_failures_total': 'Pipeline stage runs that failed or raised',
+    'weather_cycle_seconds': 'Wall-clock time of a whole pipeline cycle',
+    'weather_cycle_critical_path_seconds': 'Run time of the chain of stages that bounded the cycle',
+    'weather_cycles_coalesced_total': 'Scheduler ticks skipped because a cycle was still running',
+    'camera_pipeline_items_per_second': 'Camera frames per second through each pipeline stage in the last run',
+    'camera_pipeline_errors': 'Cameras that failed in each pipeline stage in the last run',
+    'camera_readings_stored': 'Camera rain readings stored by the last run',
+    'camera_last_run_timestamp_seconds': 'When the last camera run finished',
+}
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * len(self.bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        if index < len(self.bounds):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf."""
+        total, pairs = 0, []
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs + [(math.inf, self.count)]
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Registry:
+    """Thread-safe counters, gauges and histograms keyed by name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the block's run time in seconds, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def render(self):
+        """Everything recorded so far in the Prometheus text exposition format."""
+        with self.lock:
+            families = {}
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+                for (name, labels), value in series.items():
+                    families.setdefault(name, (kind, []))[1].append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            for (name, labels), histogram in self.histograms.items():
+                lines = families.setdefault(name, ('histogram', []))[1]
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", _format_value(bound))])} {count}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        output = []
+        for name in sorted(families):
+            kind, lines = families[name]
+            if name in HELP:
+                output.append(f'# HELP {name} {HELP[name]}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
+
+# The process-wide registry every module records into
+REGISTRY = Registry()
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+
+def write_metrics(path=METRICS_FILE, registry=REGISTRY):
+    """Write the metrics to path atomically, so a scraper never reads a partial file."""
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(registry.render())
+    os.replace(temp_path, path)
+
+def serve_metrics(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve the metrics at http://host:port/metrics from a background thread; returns the server."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f'Serving metrics on http://{host}:{server.server_address[1]}/metrics')
+    return server
+
+# Only one profiler can be active at a time (Python 3.12+ refuses a second one)
+_profile_lock = threading.Lock()
+
+@contextmanager
+def profiled(name, enabled=True, directory=PROFILE_DIR):
+    """Run the block under cProfile, save the stats and log the top functions.
+
+    Only the calling thread is profiled, so work a stage hands to worker
+    threads shows up as time spent waiting. If another block is already being
+    profiled, this one runs unprofiled rather than failing.
+    """
+    if not enabled or not _profile_lock.acquire(blocking=False):
+        if enabled:
+            logging.warning(f'{name}: another stage is being profiled; running without the profiler')
+        yield
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}.prof')
+        profile.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        logging.info(f'{name}: profile saved to {path}\n{text.getvalue()}')
+    finally:
+        _profile_lock.release()
+
+_sample_counts = {}
+_sample_lock = threading.Lock()
+
+def log_sampled(key, message, level=logging.DEBUG, every=LOG_SAMPLE_EVERY):
+    """Log message the first time key is seen and then every Nth time, with the running count."""
+    with _sample_lock:
+        count = _sample_counts[key] = _sample_counts.get(key, 0) + 1
+    if count == 1 or count % every == 0:
+        logging.log(level, message if count == 1 else f'{message} ({count} so far)')
@@ -0,0 +1,35 @@
+import json
+
+# Seattle neighborhoods every provider is scraped for
+neighborhoods_coordinates = {
+    "Capitol Hill": {"latitude": 47.6062, "longitude": -122.3321},
+    "Ballard": {"latitude": 47.6685, "longitude": -122.3815},
+    "Fremont": {"latitude": 47.6536, "longitude": -122.3509},
+    "University District": {"latitude": 47.6588, "longitude": -122.3127},
+    "Queen Anne": {"latitude": 47.6290, "longitude": -122.3570},
+    "Wallingford": {"latitude": 47.6556, "longitude": -122.3370},
+    "Woodland Park Zoo": {"latitude": 47.6694, "longitude": -122.3515},
+    "KOMO News": {"latitude": 47.6187, "longitude": -122.3588},
+    "KIRO News": {"latitude": 47.6251, "longitude": -122.3341},
+    "KEXP": {"latitude": 47.6317, "longitude": -122.3576},
+    "Alki Beach": {"latitude": 47.5785, "longitude": -122.4156},
+    "Central District": {"latitude": 47.5985, "longitude": -122.3001},
+    "Madrona": {"latitude": 47.6074, "longitude": -122.2892},
+    "Magnolia": {"latitude": 47.6447, "longitude": -122.4004},
+    "Interbay": {"latitude": 47.6545, "longitude": -122.3705}
+}
+
+def load_locations(path=None):
+    """Locations as {name: {"latitude": ..., "longitude": ...}}.
+
+    Without a path these are the neighborhoods above; otherwise a JSON file
+    of the same shape, so larger location sets need no code changes.
+    """
+    if path is None:
+        return dict(neighborhoods_coordinates)
+    with open(path) as f:
+        locations = json.load(f)
+    for name, coords in locations.items():
+        if 'latitude' not in coords or 'longitude' not in coords:
+            raise ValueError(f'Location {name} needs a latitude and longitude')
+    return locations
@@ -0,0 +1,83 @@
+import sqlite3
+import logging
+import sys
+from weather_schema import (SCHEMA_VERSION, WEATHER_DATA_COLUMNS, create_indexes, get_columns, is_canonical,
+                            parse_number, parse_temperature, parse_timestamp)
+
+# Setting up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+# Provider recorded for rows written before the provider column existed
+LEGACY_PROVIDER = 'unknown'
+
+# Columns copied through a parser, and columns copied as-is when present
+PARSED_COLUMNS = {
+    'temperature': 'parse_temperature',
+    'wind_speed': 'parse_number',
+    'humidity': 'parse_number',
+    'barometric_pressure': 'parse_number',
+    'latitude': 'parse_number',
+    'longitude': 'parse_number',
+    'altitude': 'parse_number',
+    'precipitation': 'parse_number',
+}
+COPIED_COLUMNS = ['neighborhood']
+
+def migrate_weather_data(db_path):
+    """Convert a legacy mixed-type weather_data table to the canonical layout.
+
+    The whole table is rewritten with one INSERT ... SELECT inside a single
+    transaction, so the database is either fully migrated or left untouched.
+    Legacy wind speeds were stored in whatever unit each scraper reported and
+    no provider was recorded, so they are kept numerically as-is.
+    Returns the number of rows migrated.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.isolation_level = None  # Manage the transaction explicitly
+    conn.create_function('parse_number', 1, parse_number, deterministic=True)
+    conn.create_function('parse_temperature', 1, parse_temperature, deterministic=True)
+    conn.create_function('parse_timestamp', 1, parse_timestamp, deterministic=True)
+
+    try:
+        columns = get_columns(conn)
+        if not columns:
+            logging.info(f'No weather_data table in {db_path}; nothing to migrate.')
+            return 0
+        if is_canonical(conn):
+            logging.info(f'weather_data in {db_path} is already at schema version {SCHEMA_VERSION}.')
+            return 0
+
+        targets = ['id', 'provider', 'location', 'timestamp']
+        sources = ['id', '?', "COALESCE(location, '')",
+                   "COALESCE(parse_timestamp(timestamp), CAST(strftime('%s', 'now') AS INTEGER))"]
+        for column, parser in PARSED_COLUMNS.items():
+            if column in columns:
+                targets.append(column)
+                sources.append(f'{parser}({column})')
+        for column in COPIED_COLUMNS:
+            if column in columns:
+                targets.append(column)
+                sources.append(column)
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(f'CREATE TABLE weather_data_migrated ({WEATHER_DATA_COLUMNS})')
+            cursor = conn.execute(f'''INSERT INTO weather_data_migrated ({', '.join(targets)})
+                                      SELECT {', '.join(sources)} FROM weather_data''', (LEGACY_PROVIDER,))
+            migrated = cursor.rowcount
+            conn.execute('DROP TABLE weather_data')
+            conn.execute('ALTER TABLE weather_data_migrated RENAME TO weather_data')
+            create_indexes(conn)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+        logging.info(f'Migrated {migrated} rows in {db_path} to schema version {SCHEMA_VERSION}.')
+        return migrated
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'weather_data.db'
+    migrate_weather_data(db_path)
@@ -0,0 +1,139 @@
+import glob
+import logging
+import os
+import pickle
+import re
+import time
+import numpy as np
+import sklearn
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+# Feature columns, in the order the model expects them
+FEATURES = ['barometric_pressure', 'temperature', 'wind_speed', 'humidity']
+
+# Passes over the data for a full retrain; each pass feeds every chunk to partial_fit
+FULL_EPOCHS = 5
+
+# Fitted models are saved as rain_model_v<version>.pkl; only the newest few are kept.
+# Incremental updates overwrite the current version and start a new one at most
+# once per VERSION_INTERVAL, so the kept versions reach back about KEEP_VERSIONS days.
+MODEL_DIR = 'models'
+KEEP_VERSIONS = 5
+VERSION_INTERVAL = 86400
+_VERSION_PATTERN = re.compile(r'rain_model_v(\d+)\.pkl$')
+
+def make_labels(pressure):
+    """Example target: 1 if pressure < 1010 hPa, else 0 (replace with real rain observations)."""
+    return (np.asarray(pressure) < 1010).astype(int)
+
+class RainModel:
+    """Scaler and logistic classifier that can be refit or updated with new rows only.
+
+    StandardScaler.partial_fit keeps running per-feature means and variances
+    (ignoring NaNs), so missing values are imputed with the running mean,
+    which is 0 after scaling. SGDClassifier with log loss is a logistic
+    regression that supports partial_fit.
+    """
+
+    def __init__(self):
+        self.scaler = StandardScaler()
+        self.classifier = SGDClassifier(loss='log_loss', max_iter=1000, tol=1e-4, random_state=0)
+        self.version = 0
+        self.last_id = 0
+        self.trained_rows = 0
+        self.created_at = int(time.time())
+        self.versioned_at = self.created_at
+        self.last_update = {}
+
+    def _transform(self, X):
+        X = self.scaler.transform(np.asarray(X, dtype=np.float32))
+        return np.nan_to_num(X, nan=0.0, copy=False)
+
+    def fit(self, chunks, epochs=FULL_EPOCHS):
+        """Full retrain from scratch, streaming the data chunk by chunk.
+
+        chunks is a callable returning a fresh iterator of (ids, X, y) chunks;
+        it is called once to fit the scaler and once per classifier epoch, so
+        memory is bounded by the chunk size rather than the table size.
+        """
+        self.scaler = StandardScaler()
+        self.last_id = self.trained_rows = 0
+        for ids, X, y in chunks():
+            self.scaler.partial_fit(np.asarray(X, dtype=np.float32))
+            self.last_id = max(self.last_id, int(ids[-1]))
+            self.trained_rows += len(y)
+        if not self.trained_rows:
+            raise ValueError('No rows to fit')
+        for _ in range(epochs):
+            for ids, X, y in chunks():
+                self.classifier.partial_fit(self._transform(X), y, classes=np.array([0, 1]))
+
+    def partial_fit(self, X, y, last_id):
+        """Update the running scaler statistics and the classifier with new rows only."""
+        X = np.asarray(X, dtype=np.float32)
+        self.scaler.partial_fit(X)
+        self.classifier.partial_fit(self._transform(X), y, classes=np.array([0, 1]))
+        self.last_id = max(self.last_id, last_id)
+        self.trained_rows += len(y)
+
+    def predict_proba(self, X):
+        """Probability of rain for each row."""
+        return self.classifier.predict_proba(self._transform(X))[:, 1]
+
+def model_path(version, model_dir=None):
+    return os.path.join(model_dir or MODEL_DIR, f'rain_model_v{version}.pkl')
+
+def list_versions(model_dir=None):
+    """Saved model versions, oldest first."""
+    versions = []
+    for path in glob.glob(os.path.join(model_dir or MODEL_DIR, 'rain_model_v*.pkl')):
+        match = _VERSION_PATTERN.search(path)
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+def save_model(model, model_dir=None, new_version=True):
+    """Save the model and return its version.
+
+    With new_version the model is saved as the next version and old versions
+    are pruned; otherwise it overwrites its current version in place.
+    """
+    os.makedirs(model_dir or MODEL_DIR, exist_ok=True)
+    versions = list_versions(model_dir)
+    if new_version or model.version not in versions:
+        model.version = (versions[-1] if versions else 0) + 1
+        model.versioned_at = int(time.time())
+        versions.append(model.version)
+    model.sklearn_version = sklearn.__version__
+    path = model_path(model.version, model_dir)
+    # Write to a temporary file first so a crash never leaves a truncated model behind
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(model, f)
+    os.replace(path + '.tmp', path)
+    for version in versions[:max(len(versions) - KEEP_VERSIONS, 0)]:
+        os.remove(model_path(version, model_dir))
+    return model.version
+
+def due_for_version(model, now=None):
+    """Whether an incremental update should start a new version rather than overwrite this one."""
+    versioned_at = getattr(model, 'versioned_at', model.created_at)
+    return (time.time() if now is None else now) - versioned_at >= VERSION_INTERVAL
+
+def sklearn_compatible(model):
+    """Whether the model was saved by the installed scikit-learn; pickles are not portable across versions."""
+    return getattr(model, 'sklearn_version', None) == sklearn.__version__
+
+def load_model(version=None, model_dir=None):
+    """Load a saved model, the newest one by default. Returns None if there is none."""
+    versions = list_versions(model_dir)
+    if version is None:
+        if not versions:
+            return None
+        version = versions[-1]
+    with open(model_path(version, model_dir), 'rb') as f:
+        model = pickle.load(f)
+    if not sklearn_compatible(model):
+        logging.warning(f"Model v{version} was saved with scikit-learn {getattr(model, 'sklearn_version', 'unknown')}, "
+                        f"but {sklearn.__version__} is installed")
+    return model
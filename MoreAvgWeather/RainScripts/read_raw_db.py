@@ -1,21 +1,28 @@
 import sqlite3
+import sys
 from prettytable import PrettyTable
+from weather_queries import OBSERVATION_COLUMNS, observations
 
-def read_weather_data(db_name):
+def read_weather_data(db_name, location=None, start=None, end=None, provider=None):
     conn = sqlite3.connect(db_name)
     cursor = conn.cursor()
 
-    # Query to select all data from the weather_data table
-    cursor.execute('SELECT * FROM weather_data')
+    if location is not None:
+        # Indexed lookup of one location's time range
+        rows = observations(conn, location, start, end, provider)
+        column_names = list(OBSERVATION_COLUMNS)
+    else:
+        # Query to select all data from the weather_data table
+        cursor.execute('SELECT * FROM weather_data')
 
-    # Fetch all rows from the query result
-    rows = cursor.fetchall()
+        # Fetch all rows from the query result
+        rows = cursor.fetchall()
+        column_names = [description[0] for description in cursor.description]
 
     # Create a PrettyTable object
     table = PrettyTable()
 
-    # Get column names and set them as table field names
-    column_names = [description[0] for description in cursor.description]
+    # Set column names as table field names
     table.field_names = column_names
 
     # Add rows to the table
@@ -29,4 +36,9 @@ def read_weather_data(db_name):
     conn.close()
 
 db_name = 'weather_data.db'
-read_weather_data(db_name)
+
+# Usage: read_raw_db.py [location start end [provider]]
+if len(sys.argv) >= 4:
+    read_weather_data(db_name, *sys.argv[1:5])
+else:
+    read_weather_data(db_name)
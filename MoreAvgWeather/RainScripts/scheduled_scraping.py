@@ -1,66 +1,76 @@
 import schedule
 import time
-import subprocess
 import logging
 import sys
+from ingest_writer import connect
+from stage_scheduler import Stage, CycleRunner, run_dag, export_timings
+from instrumentation import serve_metrics, write_metrics
+from weather_providers import PROVIDERS, collect, store
+import edit_with_altitude
+import edit_with_barometer
+import basic_rain_prediction
+import weather_rollups
+import weather_consensus
 
 # Setting up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
-def run_nws_scraper():
-    result = subprocess.run(['python', 'scrape_nws.py'])
-    logging.info('NWS scraper ran successfully' if result.returncode == 0 else f'NWS scraper failed with code {result.returncode}')
+DB_NAME = 'weather_data.db'
 
-def run_openmeteo_scraper():
-    result = subprocess.run(['python', 'scrape_openmeteo.py'])
-    logging.info('Open-Meteo scraper ran successfully' if result.returncode == 0 else f'Open-Meteo scraper failed with code {result.returncode}')
+# Set to a port (e.g. 9108) to also serve the metrics over HTTP at /metrics;
+# they are always written to instrumentation.METRICS_FILE after each cycle
+METRICS_PORT = None
 
-def run_weatherapi_scraper():
-    result = subprocess.run(['python', 'scrape_weatherapi.py'])
-    logging.info('WeatherAPI scraper ran successfully' if result.returncode == 0 else f'WeatherAPI scraper failed with code {result.returncode}')
+# Scrapers only do network I/O, so every registered provider runs in parallel
+SCRAPERS = list(PROVIDERS)
 
-def run_weatherstack_scraper():
-    result = subprocess.run(['python', 'scrape_weatherstack.py'])
-    logging.info('WeatherStack scraper ran successfully' if result.returncode == 0 else f'WeatherStack scraper failed with code {result.returncode}')
+def scraper_stage(provider):
+    return lambda conn, inputs: collect([provider])[provider]
 
-def run_openweathermap_scraper():
-    result = subprocess.run(['python', 'scrape_openweathermap.py'])
-    logging.info('OpenWeatherMap scraper ran successfully' if result.returncode == 0 else f'OpenWeatherMap scraper failed with code {result.returncode}')
+def db_stage(module):
+    return lambda conn, inputs: module.run_stage(conn)
 
-def clean_scrapers1():
-    result = subprocess.run(['python', 'edit_with_altitude.py'])
-    logging.info('Added altitude data successfully' if result.returncode == 0 else f'Altitude data script failed with code {result.returncode}')
+def ingest_observations(conn, inputs):
+    """Write every scraper's observations and forecasts once all of them have finished."""
+    store({provider: result for provider, result in inputs.items() if result}, DB_NAME, conn=conn)
 
-def clean_scrapers2():
-    result = subprocess.run(['python', 'edit_with_barometer.py'])
-    logging.info('Added barometer calculation successfully' if result.returncode == 0 else f'Barometer calculation script failed with code {result.returncode}')
+# The cycle as a dependency graph: scrapers -> ingest -> altitude -> barometer
+# -> prediction -> rollups, with the cross-provider consensus also fed by ingest.
+# Database stages share one connection on one thread.
+STAGES = [Stage(provider, scraper_stage(provider)) for provider in SCRAPERS] + [
+    Stage('ingest', ingest_observations, tuple(SCRAPERS), uses_db=True),
+    Stage('altitude', db_stage(edit_with_altitude), ('ingest',), uses_db=True),
+    Stage('barometer', db_stage(edit_with_barometer), ('altitude',), uses_db=True),
+    Stage('prediction', db_stage(basic_rain_prediction), ('barometer',), uses_db=True),
+    Stage('rollups', db_stage(weather_rollups), ('prediction',), uses_db=True),
+    Stage('consensus', db_stage(weather_consensus), ('ingest',), uses_db=True),
+]
 
-def apply_prediction1():
-    result = subprocess.run(['python', 'basic_rain_prediction.py'])
-    logging.info('Added rain prediction from Triple Point Observation successfully' if result.returncode == 0 else f'Rain prediction script failed with code {result.returncode}')
-
-def run_all_processes():
-    run_nws_scraper()
-    run_openmeteo_scraper()
-    run_weatherapi_scraper()
-    run_openweathermap_scraper()
-    clean_scrapers1()
-    clean_scrapers2()
-    apply_prediction1()
-
-# Schedule the scripts to run every 15 minutes
-schedule.every(15).minutes.do(run_nws_scraper)
-schedule.every(15).minutes.do(run_openmeteo_scraper)
-schedule.every(15).minutes.do(run_weatherapi_scraper)
-schedule.every(15).minutes.do(run_openweathermap_scraper)
-schedule.every(15).minutes.do(clean_scrapers1)
-schedule.every(15).minutes.do(clean_scrapers2)
-schedule.every(15).minutes.do(apply_prediction1)
+def run_all_processes(conn, profile=()):
+    """Run one full cycle and export its critical-path timing report and metrics."""
+    report = run_dag(STAGES, conn, profile=profile)
+    export_timings(report)
+    write_metrics()
+    return report
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "run":
-        run_all_processes()
-    else:
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+    # Usage: scheduled_scraping.py [run] [--profile all|STAGE ...]
+    args = sys.argv[1:]
+    profile = args[args.index('--profile') + 1:] if '--profile' in args else ()
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+    # Cycles never overlap (CycleRunner guarantees it), so the connection can
+    # safely be used from whichever thread is running the current cycle
+    conn = connect(DB_NAME, check_same_thread=False)
+    try:
+        if args and args[0] == "run":
+            run_all_processes(conn, profile)
+        else:
+            # Tick every 15 minutes; a tick during a slow cycle is coalesced
+            runner = CycleRunner(lambda: run_all_processes(conn, profile))
+            schedule.every(15).minutes.do(runner.tick)
+            while True:
+                schedule.run_pending()
+                time.sleep(1)
+    finally:
+        conn.close()
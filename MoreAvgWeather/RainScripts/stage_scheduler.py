@@ -0,0 +1,152 @@
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from instrumentation import inc, observe, profiled, set_gauge
+
+# A pipeline node. func is called as func(conn, inputs), where inputs maps each
+# dependency's name to its return value. Stages with uses_db=True run one at a
+# time on the scheduler's thread with the shared connection; the rest run in
+# parallel worker threads and get conn=None, so they must not touch the database.
+Stage = namedtuple('Stage', ['name', 'func', 'deps', 'uses_db'], defaults=[(), False])
+
+# Per-cycle timing reports are appended here as one JSON object per line
+TIMINGS_FILE = 'pipeline_timings.jsonl'
+
+def _validate(stages):
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = set(stage.deps) - names
+        if missing:
+            raise ValueError(f'Stage {stage.name} depends on unknown stages: {sorted(missing)}')
+
+def _call(stage, conn, results, profile=False):
+    """Run one stage and return (result, succeeded, start, end). Failures are logged, not raised."""
+    start = time.perf_counter()
+    try:
+        with profiled(stage.name, enabled=profile):
+            result = stage.func(conn, {dep: results.get(dep) for dep in stage.deps})
+        succeeded = result is not False
+    except Exception as e:
+        logging.error(f'{stage.name} raised {type(e).__name__}: {e}')
+        result, succeeded = None, False
+    return result, succeeded, start, time.perf_counter()
+
+def critical_path(stages, timings):
+    """The chain of stages that determined the cycle's wall-clock time.
+
+    Starting from the stage that finished last, repeatedly step to the
+    dependency that finished last, since that is what the stage waited on.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    current = max(timings, key=lambda name: timings[name]['end'])
+    path = [current]
+    while by_name[current].deps:
+        current = max(by_name[current].deps, key=lambda name: timings[name]['end'])
+        path.append(current)
+    return list(reversed(path))
+
+def run_dag(stages, conn, max_workers=8, profile=()):
+    """Run stages as soon as their dependencies finish and return a timing report.
+
+    A failed stage does not stop its dependents; every stage already copes with
+    missing data, exactly as when the stages ran back to back. Stages named in
+    profile (or every stage, for 'all') run under cProfile.
+    """
+    _validate(stages)
+    profile = {stage.name for stage in stages} if 'all' in profile else set(profile)
+    results, timings = {}, {}
+    pending = list(stages)
+    running = {}
+    cycle_start = time.perf_counter()
+
+    def record(stage, outcome):
+        result, succeeded, start, end = outcome
+        results[stage.name] = result
+        timings[stage.name] = {'start': start - cycle_start, 'end': end - cycle_start,
+                               'seconds': end - start, 'succeeded': succeeded}
+        observe('weather_stage_seconds', end - start, stage=stage.name)
+        if not succeeded:
+            inc('weather_stage_failures_total', stage=stage.name)
+        logging.info(f'{stage.name} ran successfully in {end - start:.2f}s' if succeeded
+                     else f'{stage.name} failed after {end - start:.2f}s')
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            ready = [stage for stage in pending if all(dep in timings for dep in stage.deps)]
+            for stage in ready:
+                pending.remove(stage)
+                if not stage.uses_db:
+                    running[executor.submit(_call, stage, None, dict(results), stage.name in profile)] = stage
+            for stage in ready:
+                if stage.uses_db:
+                    record(stage, _call(stage, conn, results, stage.name in profile))
+            if any(stage.uses_db for stage in ready):
+                continue  # Finishing a database stage may have unblocked others
+            if not running:
+                if pending:
+                    raise ValueError(f'Dependency cycle among stages: {[stage.name for stage in pending]}')
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                record(running.pop(future), future.result())
+
+    total = time.perf_counter() - cycle_start
+    path = critical_path(stages, timings)
+    report = {
+        'started_at': int(time.time() - total),
+        'total_seconds': total,
+        'critical_path': path,
+        'critical_path_seconds': sum(timings[name]['seconds'] for name in path),
+        'stages': timings,
+    }
+    set_gauge('weather_cycle_seconds', total)
+    set_gauge('weather_cycle_critical_path_seconds', report['critical_path_seconds'])
+    logging.info(f"Cycle finished in {total:.2f}s; critical path: {' -> '.join(path)}")
+    return report
+
+def export_timings(report, path=TIMINGS_FILE):
+    """Append a cycle report to the JSON-lines timings file."""
+    with open(path, 'a') as f:
+        f.write(json.dumps(report) + '\n')
+
+class CycleRunner:
+    """Runs one pipeline cycle per tick without ever overlapping cycles.
+
+    A tick that arrives while a cycle is still running is coalesced: however
+    many ticks arrive, exactly one more cycle starts when the current one ends.
+    """
+
+    def __init__(self, run_cycle):
+        self.run_cycle = run_cycle
+        self.lock = threading.Lock()
+        self.running = False
+        self.pending = False
+        self.skipped = 0
+
+    def tick(self):
+        """Start a cycle in the background, or coalesce if one is in progress."""
+        with self.lock:
+            if self.running:
+                self.pending = True
+                self.skipped += 1
+                inc('weather_cycles_coalesced_total')
+                logging.warning(f'Previous cycle still running; coalescing tick ({self.skipped} skipped so far)')
+                return False
+            self.running = True
+        threading.Thread(target=self._loop, daemon=True).start()
+        return True
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logging.error(f'Pipeline cycle raised {type(e).__name__}: {e}')
+            with self.lock:
+                if not self.pending:
+                    self.running = False
+                    return
+                self.pending = False
@@ -0,0 +1,280 @@
+import logging
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from ingest_writer import connect
+from instrumentation import inc, observe
+from weather_queries import time_range
+from weather_schema import create_indexes, is_canonical
+from weather_rollups import CREATE_STATE, get_watermark, set_watermark
+
+# Setting up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+# Provider readings are aligned into buckets of this many seconds (one scrape cycle)
+BUCKET_SECONDS = 900
+METRICS = ('temperature', 'wind_speed', 'humidity')
+
+# 'median', 'trimmed' (mean of the non-outliers) or 'weighted' (inverse-MSE
+# weighted mean of the non-outliers, with weights learned from past cycles)
+METHOD = 'trimmed'
+
+# A reading is an outlier when it is this many robust standard deviations
+# (1.4826 x the median absolute deviation) from the median
+OUTLIER_THRESHOLD = 3.5
+MAD_TO_SIGMA = 1.4826
+# Floor on the robust spread, in each metric's canonical unit, so providers
+# that agree almost exactly do not turn rounding differences into outliers
+MIN_SCALE = {'temperature': 1.0, 'wind_speed': 1.0, 'humidity': 5.0}
+# Residuals a provider needs before its learned weight is used
+MIN_HISTORY = 50
+
+# Buckets processed per pass, bounding memory when rebuilding a long history
+WINDOW_SECONDS = 86400
+
+# Name of the high-water mark in rollup_state: the largest weather_data id already combined
+WATERMARK = 'weather_consensus'
+
+CREATE_CONSENSUS = '''CREATE TABLE IF NOT EXISTS consensus_observations (
+                        location TEXT NOT NULL,
+                        metric TEXT NOT NULL,
+                        bucket INTEGER NOT NULL,      -- bucket start, epoch seconds UTC
+                        value REAL NOT NULL,          -- consensus reading
+                        median REAL NOT NULL,
+                        spread REAL NOT NULL,         -- robust standard deviation used for outliers
+                        providers INTEGER NOT NULL,   -- providers that reported
+                        outliers INTEGER NOT NULL,    -- providers rejected as outliers
+                        outlier_providers TEXT,       -- comma-separated, NULL if none
+                        PRIMARY KEY (location, metric, bucket)
+                      ) WITHOUT ROWID'''
+
+# Running per-provider residuals against the median, for the weighted method
+CREATE_PROVIDER_STATS = '''CREATE TABLE IF NOT EXISTS consensus_provider_stats (
+                             provider TEXT NOT NULL,
+                             metric TEXT NOT NULL,
+                             count INTEGER NOT NULL,
+                             total REAL NOT NULL,
+                             total_squares REAL NOT NULL,
+                             PRIMARY KEY (provider, metric)
+                           ) WITHOUT ROWID'''
+
+UPSERT_PROVIDER_STATS = '''INSERT INTO consensus_provider_stats (provider, metric, count, total, total_squares)
+                           VALUES (?, ?, ?, ?, ?)
+                           ON CONFLICT (provider, metric) DO UPDATE SET
+                               count = count + excluded.count,
+                               total = total + excluded.total,
+                               total_squares = total_squares + excluded.total_squares'''
+
+def ensure_consensus_tables(conn):
+    """Create the consensus tables (and the time index they read through) if missing."""
+    conn.execute(CREATE_STATE)
+    conn.execute(CREATE_CONSENSUS)
+    conn.execute(CREATE_PROVIDER_STATS)
+    create_indexes(conn)
+
+def align(frame):
+    """Align provider readings into a (groups, providers, metrics) matrix.
+
+    frame has location, bucket, provider, is_new and METRICS columns. A
+    provider reporting more than once in a bucket contributes its mean.
+    Returns (groups, providers, matrix, new_cells), where groups is a pair
+    of (locations, buckets) arrays naming each group, missing readings are
+    NaN, and new_cells marks (group, provider) cells with rows from this run.
+    """
+    location_index, locations = pd.factorize(frame['location'])
+    bucket_index, buckets = pd.factorize(frame['bucket'])
+    # Factorizing one integer key is far cheaper than factorizing (location, bucket) pairs
+    group_index, group_keys = pd.factorize(location_index.astype(np.int64) * len(buckets) + bucket_index)
+    groups = (np.asarray(locations, dtype=object)[group_keys // len(buckets)],
+              np.asarray(buckets)[group_keys % len(buckets)])
+    provider_index, providers = pd.factorize(frame['provider'])
+    cells = len(group_keys) * len(providers)
+    flat = group_index * len(providers) + provider_index
+
+    matrix = np.full((cells, len(METRICS)), np.nan)
+    for m, metric in enumerate(METRICS):
+        values = frame[metric].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        totals = np.bincount(flat[valid], weights=values[valid], minlength=cells)
+        counts = np.bincount(flat[valid], minlength=cells)
+        np.divide(totals, counts, out=matrix[:, m], where=counts > 0)
+    new_cells = np.bincount(flat, weights=frame['is_new'].to_numpy(dtype=np.float64), minlength=cells) > 0
+    shape = (len(group_keys), len(providers))
+    return groups, list(providers), matrix.reshape(*shape, len(METRICS)), new_cells.reshape(shape)
+
+def nanmedian(matrix):
+    """Median over axis 1 ignoring NaN; NaN where a slice has no values.
+
+    Sorting the short provider axis (NaN sorts last) and picking the middle
+    of each slice's valid prefix is much faster than np.nanmedian here.
+    """
+    ordered = np.sort(matrix, axis=1)
+    count = np.count_nonzero(~np.isnan(matrix), axis=1)
+    low = np.take_along_axis(ordered, np.maximum((count - 1) // 2, 0)[:, None, :], axis=1)[:, 0, :]
+    high = np.take_along_axis(ordered, np.maximum(count // 2, 0)[:, None, :], axis=1)[:, 0, :]
+    return np.where(count > 0, (low + high) / 2, np.nan)
+
+def robust_consensus(matrix, method=METHOD, weights=None, threshold=OUTLIER_THRESHOLD):
+    """Combine a (groups, providers, metrics) matrix in one vectorized pass.
+
+    Returns (value, median, spread, reported, outliers): the first four are
+    (groups, metrics) arrays and outliers a boolean (groups, providers,
+    metrics) mask. weights is a (providers, metrics) array for the weighted
+    method. Groups where no provider reported a metric come out as NaN.
+    """
+    scale_floor = np.array([MIN_SCALE[metric] for metric in METRICS])
+    median = nanmedian(matrix)
+    deviation = np.abs(matrix - median[:, None, :])
+    spread = np.maximum(nanmedian(deviation) * MAD_TO_SIGMA, scale_floor)
+    reported = np.count_nonzero(~np.isnan(matrix), axis=1)
+    outliers = deviation > threshold * spread[:, None, :]
+    inliers = ~np.isnan(matrix) & ~outliers
+
+    if method == 'median':
+        value = median
+    else:
+        if method == 'weighted' and weights is not None:
+            cell_weights = np.where(inliers, weights[None, :, :], 0.0)
+        elif method in ('trimmed', 'weighted'):
+            cell_weights = inliers.astype(np.float64)
+        else:
+            raise ValueError(f'Unknown consensus method: {method}')
+        total_weight = cell_weights.sum(axis=1)
+        weighted = np.where(inliers, matrix, 0.0) * cell_weights
+        value = np.divide(weighted.sum(axis=1), total_weight, out=median.copy(), where=total_weight > 0)
+    return value, median, spread, reported, outliers
+
+def load_weights(conn, providers):
+    """Inverse mean squared residual per (provider, metric) from past cycles.
+
+    Providers with fewer than MIN_HISTORY residuals get the mean weight of
+    the others (or 1 if none have enough history).
+    """
+    floor = np.array([MIN_SCALE[metric] for metric in METRICS]) ** 2
+    weights = np.full((len(providers), len(METRICS)), np.nan)
+    position = {provider: p for p, provider in enumerate(providers)}
+    for provider, metric, count, total_squares in conn.execute(
+            "SELECT provider, metric, count, total_squares FROM consensus_provider_stats"):
+        if provider in position and metric in METRICS and count >= MIN_HISTORY:
+            m = METRICS.index(metric)
+            weights[position[provider], m] = 1.0 / max(total_squares / count, floor[m])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        fallback = np.nan_to_num(np.nanmean(weights, axis=0), nan=1.0)
+    return np.where(np.isnan(weights), fallback[None, :], weights)
+
+def update_provider_stats(conn, providers, matrix, median, outliers, new_cells):
+    """Fold this run's non-outlier residuals into each provider's running stats."""
+    residual = matrix - median[:, None, :]
+    counted = ~np.isnan(residual) & ~outliers & new_cells[:, :, None]
+    residual = np.where(counted, residual, 0.0)
+    counts = counted.sum(axis=0)
+    totals = residual.sum(axis=0)
+    squares = (residual ** 2).sum(axis=0)
+    conn.executemany(UPSERT_PROVIDER_STATS, [
+        (provider, metric, int(counts[p, m]), float(totals[p, m]), float(squares[p, m]))
+        for p, provider in enumerate(providers) for m, metric in enumerate(METRICS) if counts[p, m]])
+
+def consensus_rows(groups, providers, value, median, spread, reported, outliers):
+    """consensus_observations rows for every (group, metric) with at least one reading."""
+    g, m = np.nonzero(reported)
+    # Encode each row's outlier providers as a bitmask, so names are joined once per distinct set
+    masks = (outliers.astype(np.int64) << np.arange(len(providers))[None, :, None]).sum(axis=1)[g, m]
+    distinct, inverse = np.unique(masks, return_inverse=True)
+    labels = np.array([','.join(provider for p, provider in enumerate(providers) if mask >> p & 1) or None
+                       for mask in distinct.tolist()], dtype=object)
+    locations, buckets = groups
+    return list(zip(locations[g].tolist(), np.array(METRICS, dtype=object)[m].tolist(), buckets[g].tolist(),
+                    value[g, m].tolist(), median[g, m].tolist(), spread[g, m].tolist(),
+                    reported[g, m].tolist(), outliers.sum(axis=1)[g, m].tolist(), labels[inverse].tolist()))
+
+def combine_window(conn, start, end, low, method=METHOD):
+    """Recompute the consensus for every bucket in [start, end). Returns the rows written."""
+    frame = pd.read_sql_query(f'''SELECT location, provider, (timestamp / {BUCKET_SECONDS}) * {BUCKET_SECONDS} AS bucket,
+                                         id > ? AS is_new, {', '.join(METRICS)}
+                                  FROM weather_data WHERE timestamp >= ? AND timestamp < ?''',
+                              conn, params=(low, start, end), dtype={metric: 'float64' for metric in METRICS})
+    if frame.empty:
+        return 0
+    groups, providers, matrix, new_cells = align(frame)
+    weights = load_weights(conn, providers) if method == 'weighted' else None
+    value, median, spread, reported, outliers = robust_consensus(matrix, method, weights)
+    rows = consensus_rows(groups, providers, value, median, spread, reported, outliers)
+    conn.executemany('''INSERT OR REPLACE INTO consensus_observations
+                        (location, metric, bucket, value, median, spread, providers, outliers, outlier_providers)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+    update_provider_stats(conn, providers, matrix, median, outliers, new_cells)
+    return len(rows)
+
+def update_consensus(conn, method=METHOD):
+    """Combine every bucket touched by weather_data rows added since the last run.
+
+    Whole buckets are recomputed, so a provider reporting late still joins
+    its bucket's consensus. Runs in one transaction with the watermark
+    update. Returns the number of consensus rows written, or None if the
+    table still uses the legacy layout.
+    """
+    if not is_canonical(conn):
+        logging.error('weather_data uses the legacy layout; run migrate_weather_data.py first.')
+        return None
+    start_time = time.perf_counter()
+    with conn:
+        ensure_consensus_tables(conn)
+        low = get_watermark(conn, WATERMARK)
+        first, last, high = conn.execute(
+            "SELECT MIN(timestamp), MAX(timestamp), MAX(id) FROM weather_data WHERE id > ?", (low,)).fetchone()
+        if high is None:
+            return 0
+        start = (first // BUCKET_SECONDS) * BUCKET_SECONDS
+        end = (last // BUCKET_SECONDS + 1) * BUCKET_SECONDS
+        written = 0
+        for window in range(start, end, WINDOW_SECONDS):
+            written += combine_window(conn, window, min(window + WINDOW_SECONDS, end), low, method)
+        set_watermark(conn, high, WATERMARK)
+    elapsed = time.perf_counter() - start_time
+    observe('weather_db_seconds', elapsed, operation='consensus')
+    inc('weather_rows_written_total', written, table='consensus_observations')
+    logging.info(f"Combined {written} consensus rows in {elapsed * 1000:.1f} ms")
+    return written
+
+def rebuild_consensus(conn, method=METHOD):
+    """Discard the consensus and provider stats and recompute them from every row."""
+    with conn:
+        ensure_consensus_tables(conn)
+        conn.execute("DELETE FROM consensus_observations")
+        conn.execute("DELETE FROM consensus_provider_stats")
+        set_watermark(conn, 0, WATERMARK)
+    return update_consensus(conn, method)
+
+def consensus(conn, location, start=None, end=None, metric=None):
+    """(metric, bucket, value, providers, outlier_providers) rows for a location in [start, end); None bounds are open."""
+    bounds, bound_params = time_range(start, end, column='bucket')
+    query = f'''SELECT metric, bucket, value, providers, outlier_providers FROM consensus_observations
+               WHERE location = ?{bounds}'''
+    params = [location, *bound_params]
+    if metric is not None:
+        query += " AND metric = ?"
+        params.append(metric)
+    return conn.execute(query + " ORDER BY metric, bucket", params).fetchall()
+
+def run_stage(conn):
+    """Pipeline entry point: combine the latest cycle's provider readings."""
+    return update_consensus(conn) is not None
+
+if __name__ == "__main__":
+    # Usage: weather_consensus.py [update|rebuild] [db_path] [median|trimmed|weighted]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'update'
+    db_path = sys.argv[2] if len(sys.argv) > 2 else 'weather_data.db'
+    method = sys.argv[3] if len(sys.argv) > 3 else METHOD
+    conn = connect(db_path)
+    if command == 'update':
+        update_consensus(conn, method)
+    elif command == 'rebuild':
+        rebuild_consensus(conn, method)
+    else:
+        logging.error(f"Unknown command: {command}")
+        conn.close()
+        sys.exit(1)
+    conn.close()
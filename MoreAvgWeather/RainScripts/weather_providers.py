@@ -0,0 +1,299 @@
+import bisect
+import logging
+import re
+import sys
+import time
+from functools import partial
+import http_transport
+import fetch_engine
+from fetch_engine import fetch_providers
+from instrumentation import inc, log_sampled
+from ingest_writer import connect, write_observations, write_forecasts
+from locations import load_locations
+from weather_schema import PROVIDER_WIND_UNITS
+
+# Setting up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+DB_NAME = 'weather_data.db'
+
+# Every registered provider plugin, by name
+PROVIDERS = {}
+
+class Provider:
+    """A weather source plugin.
+
+    A provider declares how to build a request for a batch of locations, how
+    to pull (temperature, wind_speed, humidity) out of the response, and the
+    units those come in. The driver (collect) does the fetching, concurrency,
+    rate limiting and storage, so a plugin holds no I/O code of its own.
+    """
+
+    name = None
+    # Unit of the wind speeds extract() returns; temperatures are Celsius
+    wind_unit = 'm/s'
+    # Locations per request; above 1 for APIs that take coordinate lists
+    batch_size = 1
+    headers = None
+    stream = False
+    # Optional (requests, per_seconds, burst) quota (or a list of them) and in-flight request limit,
+    # overriding the defaults in http_transport and fetch_engine
+    quota = None
+    concurrency = None
+
+    def build_request(self, locations):
+        """(url, params) for one request covering locations, a {name: coords} dict."""
+        raise NotImplementedError
+
+    def extract(self, response, names):
+        """Parse a response for the named locations.
+
+        Returns (readings, forecasts): readings maps a location to its
+        (temperature, wind_speed, humidity), and forecasts is a list of
+        (location, hour, temperature, wind_speed, humidity) rows.
+        """
+        raise NotImplementedError
+
+def _lookup(data, path):
+    for key in path:
+        data = data[key]
+    return data
+
+class JsonProvider(Provider):
+    """A single-location JSON API whose readings sit at fixed key paths."""
+
+    # Key paths to (temperature, wind_speed, humidity) in the response
+    fields = ()
+
+    def extract(self, response, names):
+        data = response.json()
+        try:
+            return {names[0]: tuple(_lookup(data, path) for path in self.fields)}, []
+        except (KeyError, IndexError, TypeError):
+            inc('weather_invalid_responses_total', provider=self.name)
+            log_sampled(f'{self.name}:invalid', f'{self.name}: invalid data for {names[0]} - Response: {str(data)[:200]}',
+                        level=logging.WARNING)
+            return {}, []
+
+def register(provider):
+    """Add a provider plugin to the registry, along with its units and limits."""
+    PROVIDERS[provider.name] = provider
+    PROVIDER_WIND_UNITS[provider.name] = provider.wind_unit
+    if provider.quota is not None:
+        http_transport.PROVIDER_QUOTAS[provider.name] = provider.quota
+    if provider.concurrency is not None:
+        fetch_engine.PROVIDER_CONCURRENCY[provider.name] = provider.concurrency
+    return provider
+
+def iter_json_items(response, multiple=True):
+    """Yield each object of a JSON list response without holding the whole body.
+
+    With ijson installed the body is decoded as it streams in, one object at a
+    time; otherwise it falls back to decoding it in one go. With multiple=False
+    the body is a single object rather than a list.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+    if ijson is None:
+        data = response.json()
+        yield from data if isinstance(data, list) else [data]
+        return
+    # Let urllib3 undo any gzip/deflate before the parser sees the bytes
+    response.raw.decode_content = True
+    yield from ijson.items(response.raw, 'item' if multiple else '', use_float=True)
+
+def current_hour(series, now=None):
+    """The entry of an hourly series covering now (the first one if now precedes it)."""
+    now = time.time() if now is None else now
+    index = bisect.bisect_right([entry[0] for entry in series], now) - 1
+    return series[max(index, 0)]
+
+class OpenWeatherMap(JsonProvider):
+    name = 'openweathermap'
+    # Replace with your actual OpenWeatherMap API key
+    api_key = 'Enter Yours Here'
+    url = 'http://api.openweathermap.org/data/2.5/weather'
+    fields = (('main', 'temp'), ('wind', 'speed'), ('main', 'humidity'))
+
+    def build_request(self, locations):
+        (coords,) = locations.values()
+        return self.url, {'lat': coords['latitude'], 'lon': coords['longitude'],
+                          'appid': self.api_key, 'units': 'metric'}
+
+class WeatherApi(JsonProvider):
+    name = 'weatherapi'
+    wind_unit = 'km/h'
+    # Replace with your actual WeatherAPI key
+    api_key = 'Enter Yours Here'
+    url = 'http://api.weatherapi.com/v1/current.json'
+    fields = (('current', 'temp_c'), ('current', 'wind_kph'), ('current', 'humidity'))
+
+    def build_request(self, locations):
+        (coords,) = locations.values()
+        return self.url, {'key': self.api_key, 'q': f"{coords['latitude']},{coords['longitude']}"}
+
+class Weatherstack(JsonProvider):
+    name = 'weatherstack'
+    wind_unit = 'km/h'
+    # Replace with your actual Weatherstack API key
+    api_key = 'Enter Yours Here'
+    url = 'http://api.weatherstack.com/current'
+    fields = (('current', 'temperature'), ('current', 'wind_speed'), ('current', 'humidity'))
+
+    def build_request(self, locations):
+        (coords,) = locations.values()
+        return self.url, {'access_key': self.api_key, 'query': f"{coords['latitude']},{coords['longitude']}"}
+
+class OpenMeteo(Provider):
+    """Open-Meteo takes comma-separated coordinate lists and returns full hourly series.
+
+    Every hourly entry becomes a forecast row, and the hour covering now is
+    the location's reading.
+    """
+
+    name = 'openmeteo'
+    wind_unit = 'km/h'
+    url = 'https://api.open-meteo.com/v1/forecast'
+    # Keeps the query string well inside common URL length limits
+    batch_size = 100
+    stream = True
+    hourly_fields = ('temperature_2m', 'wind_speed_10m', 'relative_humidity_2m')
+
+    def build_request(self, locations):
+        return self.url, {
+            'latitude': ','.join(str(coords['latitude']) for coords in locations.values()),
+            'longitude': ','.join(str(coords['longitude']) for coords in locations.values()),
+            'hourly': ','.join(self.hourly_fields),
+            # Epoch seconds in UTC, so hours never need parsing from ISO strings
+            'timeformat': 'unixtime',
+            'timezone': 'GMT',
+        }
+
+    def extract(self, response, names):
+        readings = {}
+        forecasts = []
+        now = time.time()
+        for i, item in enumerate(iter_json_items(response, len(names) > 1)):
+            # Results come back in request order; location_id confirms it when present
+            name = names[item.get('location_id', i)]
+            series = self.parse_hourly(item)
+            if not series:
+                inc('weather_invalid_responses_total', provider=self.name)
+                log_sampled('openmeteo:invalid', f'openmeteo: invalid data for {name}: {item.get("reason", "no hourly series")}',
+                            level=logging.WARNING)
+                continue
+            readings[name] = current_hour(series, now)[1:]
+            forecasts.extend((name, *entry) for entry in series)
+        return readings, forecasts
+
+    def parse_hourly(self, item):
+        """A location's hourly arrays as [(hour, temperature, wind_speed, humidity), ...]."""
+        hourly = item.get('hourly') or {}
+        if 'time' not in hourly or any(field not in hourly for field in self.hourly_fields):
+            return []
+        return list(zip(hourly['time'], *(hourly[field] for field in self.hourly_fields)))
+
+class NationalWeatherService(Provider):
+    """Scrapes the current conditions block of the forecast.weather.gov point forecast page."""
+
+    name = 'nws'
+    wind_unit = 'mph'
+    url = 'https://forecast.weather.gov/MapClick.php'
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+
+    def build_request(self, locations):
+        (coords,) = locations.values()
+        return self.url, {'lat': coords['latitude'], 'lon': coords['longitude']}
+
+    def extract(self, response, names):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(response.content, 'html.parser')
+
+        # Temperature is shown in Fahrenheit; store Celsius
+        temperature_tag = soup.find('p', class_='myforecast-current-lrg')
+        temperature_f = re.findall(r'\d+', temperature_tag.text) if temperature_tag else []
+        temperature = (float(temperature_f[0]) - 32) * 5.0 / 9.0 if temperature_f else None
+
+        wind_speed_tag = soup.find('td', class_='text-right', string='Wind Speed')
+        wind_speed = re.findall(r'\d+', wind_speed_tag.find_next('td').text) if wind_speed_tag else []
+
+        humidity_tag = soup.find('td', class_='text-right', string='Humidity')
+        humidity = re.findall(r'\d+', humidity_tag.find_next('td').text) if humidity_tag else []
+
+        return {names[0]: (temperature, float(wind_speed[0]) if wind_speed else None,
+                           float(humidity[0]) if humidity else None)}, []
+
+for _provider in (NationalWeatherService(), OpenMeteo(), WeatherApi(), Weatherstack(), OpenWeatherMap()):
+    register(_provider)
+
+def fetch_batch(provider, locations):
+    """Send one provider request for a batch of locations and extract its readings."""
+    url, params = provider.build_request(locations)
+    response = http_transport.get(provider.name, url, params=params, headers=provider.headers, stream=provider.stream)
+    try:
+        if response.status_code != 200:
+            log_sampled(f'{provider.name}:status', f'{provider.name}: HTTP {response.status_code} for {len(locations)} locations: '
+                        f'{response.text[:200]}', level=logging.ERROR)
+            return {}, []
+        return provider.extract(response, list(locations))
+    finally:
+        response.close()
+
+def batch_jobs(provider, locations):
+    """fetch_engine jobs for a provider: one per batch of up to batch_size locations."""
+    names = list(locations)
+    size = max(1, provider.batch_size)
+    return {names[i]: ({name: locations[name] for name in names[i:i + size]},)
+            for i in range(0, len(names), size)}
+
+def collect(providers=None, locations=None):
+    """Run providers over locations concurrently.
+
+    providers is a list of registered provider names (all of them by default)
+    and locations a {name: coords} dict (the shared registry by default).
+    Returns {provider: (observations, forecasts)}, where observations holds a
+    (location, temperature, wind_speed, humidity) row for every location,
+    with None values where the provider returned nothing.
+    """
+    providers = [PROVIDERS[name] for name in providers or PROVIDERS]
+    locations = load_locations() if locations is None else locations
+    results = fetch_providers({provider.name: (partial(fetch_batch, provider), batch_jobs(provider, locations))
+                               for provider in providers})
+    collected = {}
+    for provider in providers:
+        readings = {}
+        forecasts = []
+        for result in results[provider.name].values():
+            if result:
+                readings.update(result[0])
+                forecasts.extend(result[1])
+        observations = [(location, *readings.get(location, (None, None, None))) for location in locations]
+        logging.info(f'{provider.name}: {len(readings)}/{len(locations)} locations, {len(forecasts)} forecast rows')
+        collected[provider.name] = (observations, forecasts)
+    return collected
+
+def store(collected, db_name=DB_NAME, conn=None):
+    """Write collect()'s observations and forecasts, one transaction per provider and kind."""
+    for provider, (observations, forecasts) in collected.items():
+        if observations:
+            write_observations(db_name, provider, observations, conn=conn)
+        if forecasts:
+            write_forecasts(db_name, provider, forecasts, conn=conn)
+
+if __name__ == "__main__":
+    # Usage: weather_providers.py [--locations locations.json] [provider ...]
+    args = sys.argv[1:]
+    path = None
+    if len(args) > 1 and args[0] == '--locations':
+        path = args[1]
+        args = args[2:]
+    conn = connect(DB_NAME)
+    try:
+        store(collect(args or None, load_locations(path)), conn=conn)
+    finally:
+        conn.close()
+    logging.info(f'Weather data stored in {DB_NAME}')
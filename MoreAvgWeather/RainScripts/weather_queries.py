@@ -0,0 +1,53 @@
+from weather_schema import parse_timestamp
+
+# Columns returned by the observation queries, in order
+OBSERVATION_COLUMNS = ('id', 'provider', 'location', 'timestamp', 'temperature', 'wind_speed',
+                       'humidity', 'barometric_pressure', 'altitude', 'precipitation')
+_SELECT = f"SELECT {', '.join(OBSERVATION_COLUMNS)} FROM weather_data"
+
+def time_range(start, end, column='timestamp'):
+    """SQL conditions (each prefixed with AND) and params for the half-open range [start, end).
+
+    Bounds are epoch seconds or 'YYYY-MM-DD HH:MM:SS' strings; a None bound
+    leaves that side open. A bound that cannot be parsed raises ValueError
+    rather than binding NULL, which would silently match nothing.
+    """
+    sql, params = '', []
+    for value, operator in ((start, '>='), (end, '<')):
+        if value is None:
+            continue
+        seconds = parse_timestamp(value)
+        if seconds is None:
+            raise ValueError(f'Unrecognized timestamp: {value!r}')
+        sql += f" AND {column} {operator} ?"
+        params.append(seconds)
+    return sql, params
+
+def observations(conn, location, start=None, end=None, provider=None):
+    """Observations for one location in [start, end), optionally for one provider.
+
+    Served by the (location, timestamp) index, so cost depends on the rows
+    returned rather than on the size of the table. None bounds are open.
+    """
+    bounds, bound_params = time_range(start, end)
+    query = f"{_SELECT} WHERE location = ?{bounds}"
+    params = [location, *bound_params]
+    if provider is not None:
+        query += " AND provider = ?"
+        params.append(provider)
+    return conn.execute(query + " ORDER BY timestamp", params).fetchall()
+
+def provider_observations(conn, provider, start=None, end=None):
+    """Observations from one provider across all locations in [start, end); None bounds are open."""
+    bounds, params = time_range(start, end)
+    query = f"{_SELECT} WHERE provider = ?{bounds} ORDER BY timestamp"
+    return conn.execute(query, (provider, *params)).fetchall()
+
+def latest_observation(conn, location, provider=None):
+    """The most recent observation for a location, or None."""
+    query = f"{_SELECT} WHERE location = ?"
+    params = [location]
+    if provider is not None:
+        query += " AND provider = ?"
+        params.append(provider)
+    return conn.execute(query + " ORDER BY timestamp DESC LIMIT 1", params).fetchone()
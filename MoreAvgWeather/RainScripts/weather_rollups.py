@@ -0,0 +1,201 @@
+import logging
+import sys
+import time
+from ingest_writer import connect
+from instrumentation import inc, observe
+from weather_queries import time_range
+
+# Setting up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+# Bucket start (epoch seconds, UTC) for each rollup granularity
+GRANULARITIES = {
+    'hourly': '(timestamp / 3600) * 3600',
+    'daily': '(timestamp / 86400) * 86400',
+    'monthly': "CAST(strftime('%s', timestamp, 'unixepoch', 'start of month') AS INTEGER)",
+}
+
+# Measured columns that are rolled up. precipitation is left out because it is
+# a model output that is rewritten whenever the model is refit.
+METRICS = ('temperature', 'wind_speed', 'humidity', 'barometric_pressure')
+# Columns filled in by a later stage than ingest, and the rows still waiting for one
+DERIVED_METRICS = {
+    'barometric_pressure': 'barometric_pressure IS NULL AND temperature IS NOT NULL AND humidity IS NOT NULL',
+}
+# A derived value missing for longer than this (e.g. altitude never resolved) stops
+# holding its watermark back; run "rebuild" if such rows are filled in later
+PENDING_GRACE_SECONDS = 86400
+
+# Name of the high-water mark: the largest weather_data id already rolled up.
+# Derived metrics each have their own, named WATERMARK:metric.
+WATERMARK = 'weather_rollups'
+
+CREATE_STATE = '''CREATE TABLE IF NOT EXISTS rollup_state (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                  )'''
+
+CREATE_ROLLUP = '''CREATE TABLE IF NOT EXISTS weather_rollup_{granularity} (
+                     location TEXT NOT NULL,
+                     metric TEXT NOT NULL,
+                     bucket INTEGER NOT NULL,
+                     count INTEGER NOT NULL,
+                     total REAL NOT NULL,
+                     min REAL NOT NULL,
+                     max REAL NOT NULL,
+                     PRIMARY KEY (location, metric, bucket)
+                   ) WITHOUT ROWID'''
+
+# Sums and counts merge exactly, so new rows can be folded into existing buckets
+UPSERT_ROLLUP = '''INSERT INTO weather_rollup_{granularity} (location, metric, bucket, count, total, min, max)
+                   SELECT location, '{metric}', {bucket} AS bucket,
+                          COUNT({metric}), SUM({metric}), MIN({metric}), MAX({metric})
+                   FROM weather_data
+                   WHERE id > ? AND id <= ? AND {metric} IS NOT NULL
+                   GROUP BY location, bucket
+                   ON CONFLICT (location, metric, bucket) DO UPDATE SET
+                       count = count + excluded.count,
+                       total = total + excluded.total,
+                       min = MIN(min, excluded.min),
+                       max = MAX(max, excluded.max)'''
+
+def ensure_rollup_tables(conn):
+    """Create the rollup and watermark tables if they are missing."""
+    conn.execute(CREATE_STATE)
+    for granularity in GRANULARITIES:
+        conn.execute(CREATE_ROLLUP.format(granularity=granularity))
+
+def get_watermark(conn, name=WATERMARK):
+    row = conn.execute("SELECT value FROM rollup_state WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def set_watermark(conn, value, name=WATERMARK):
+    conn.execute("INSERT INTO rollup_state (name, value) VALUES (?, ?) "
+                 "ON CONFLICT (name) DO UPDATE SET value = excluded.value", (name, value))
+
+def metric_watermark(metric):
+    return f'{WATERMARK}:{metric}' if metric in DERIVED_METRICS else WATERMARK
+
+def derived_high(conn, metric, low, high, now=None):
+    """The highest id a derived metric can be rolled up to: just below its first pending row."""
+    cutoff = (time.time() if now is None else now) - PENDING_GRACE_SECONDS
+    first_pending = conn.execute(f"SELECT MIN(id) FROM weather_data WHERE id > ? AND id <= ? "
+                                 f"AND timestamp >= ? AND {DERIVED_METRICS[metric]}", (low, high, cutoff)).fetchone()[0]
+    return high if first_pending is None else first_pending - 1
+
+def update_rollups(conn):
+    """Fold weather_data rows added since the last run into every rollup table.
+
+    Measured columns are complete once a row is ingested. Derived columns
+    (barometric pressure) only advance their own watermark up to the first
+    row still waiting for a value, so rows filled in by a later cycle are
+    still rolled up. Runs in one transaction together with the watermark
+    updates, so a crash never double-counts rows. Returns the number of new
+    rows rolled up.
+    """
+    start = time.perf_counter()
+    with conn:
+        ensure_rollup_tables(conn)
+        low = get_watermark(conn)
+        for metric in DERIVED_METRICS:
+            # Databases rolled up before derived metrics had their own watermark start from the shared one
+            if conn.execute("SELECT 1 FROM rollup_state WHERE name = ?", (metric_watermark(metric),)).fetchone() is None:
+                set_watermark(conn, low, metric_watermark(metric))
+        high = conn.execute("SELECT COALESCE(MAX(id), 0) FROM weather_data").fetchone()[0]
+        new_rows = conn.execute("SELECT COUNT(*) FROM weather_data WHERE id > ? AND id <= ?", (low, high)).fetchone()[0]
+        for metric in METRICS:
+            metric_low = get_watermark(conn, metric_watermark(metric))
+            metric_high = derived_high(conn, metric, metric_low, high) if metric in DERIVED_METRICS else high
+            if metric_high <= metric_low:
+                continue
+            for granularity, bucket in GRANULARITIES.items():
+                conn.execute(UPSERT_ROLLUP.format(granularity=granularity, metric=metric, bucket=bucket),
+                             (metric_low, metric_high))
+            if metric in DERIVED_METRICS:
+                set_watermark(conn, metric_high, metric_watermark(metric))
+        set_watermark(conn, high)
+    elapsed = time.perf_counter() - start
+    observe('weather_db_seconds', elapsed, operation='rollups')
+    inc('weather_rows_written_total', new_rows, table='weather_rollups')
+    logging.info(f"Rolled up {new_rows} new rows in {elapsed * 1000:.1f} ms")
+    return new_rows
+
+def rebuild_rollups(conn):
+    """Discard every rollup and recompute them from the raw weather_data table."""
+    with conn:
+        ensure_rollup_tables(conn)
+        for granularity in GRANULARITIES:
+            conn.execute(f"DELETE FROM weather_rollup_{granularity}")
+        for metric in METRICS:
+            set_watermark(conn, 0, metric_watermark(metric))
+    return update_rollups(conn)
+
+def check_rollups(conn, tolerance=1e-6):
+    """Compare every rollup bucket with a fresh aggregate over the raw rows.
+
+    Only rows up to each metric's watermark are considered. Returns a list
+    of (granularity, location, metric, bucket) tuples that disagree.
+    """
+    ensure_rollup_tables(conn)
+    mismatches = []
+    for granularity, bucket in GRANULARITIES.items():
+        for metric in METRICS:
+            watermark = get_watermark(conn, metric_watermark(metric))
+            expected = {
+                (row[0], row[1]): row[2:]
+                for row in conn.execute(f'''SELECT location, {bucket} AS bucket,
+                                                   COUNT({metric}), SUM({metric}), MIN({metric}), MAX({metric})
+                                            FROM weather_data
+                                            WHERE id <= ? AND {metric} IS NOT NULL
+                                            GROUP BY location, bucket''', (watermark,))
+            }
+            actual = {
+                (row[0], row[1]): row[2:]
+                for row in conn.execute(f'''SELECT location, bucket, count, total, min, max
+                                            FROM weather_rollup_{granularity} WHERE metric = ?''', (metric,))
+            }
+            for key in expected.keys() | actual.keys():
+                want, got = expected.get(key), actual.get(key)
+                if want is None or got is None or want[0] != got[0] or any(
+                        abs(w - g) > tolerance * max(1.0, abs(w)) for w, g in zip(want[1:], got[1:])):
+                    mismatches.append((granularity, key[0], metric, key[1]))
+    return mismatches
+
+def averages(conn, location, granularity, start=None, end=None, metric=None):
+    """Rolled-up (metric, bucket, mean, min, max, count) rows for a location in [start, end); None bounds are open."""
+    bounds, bound_params = time_range(start, end, column='bucket')
+    query = f'''SELECT metric, bucket, total / count, min, max, count
+                FROM weather_rollup_{granularity}
+                WHERE location = ?{bounds}'''
+    params = [location, *bound_params]
+    if metric is not None:
+        query += " AND metric = ?"
+        params.append(metric)
+    return conn.execute(query + " ORDER BY metric, bucket", params).fetchall()
+
+def run_stage(conn):
+    """Pipeline entry point: fold the latest cycle into the rollups."""
+    update_rollups(conn)
+    return True
+
+if __name__ == "__main__":
+    # Usage: weather_rollups.py [update|rebuild|check] [db_path]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'update'
+    db_path = sys.argv[2] if len(sys.argv) > 2 else 'weather_data.db'
+    conn = connect(db_path)
+    if command == 'update':
+        update_rollups(conn)
+    elif command == 'rebuild':
+        logging.info(f"Rebuilt rollups from {rebuild_rollups(conn)} rows")
+    elif command == 'check':
+        mismatches = check_rollups(conn)
+        for mismatch in mismatches:
+            logging.error(f"Rollup mismatch: {mismatch}")
+        logging.info(f"Rollup check found {len(mismatches)} mismatched buckets")
+        conn.close()
+        sys.exit(1 if mismatches else 0)
+    else:
+        logging.error(f"Unknown command: {command}")
+        conn.close()
+        sys.exit(1)
+    conn.close()
@@ -0,0 +1,163 @@
+import calendar
+import math
+import re
+import time
+from datetime import datetime
+
+# Bumped whenever the canonical layout changes; stored in PRAGMA user_version
+SCHEMA_VERSION = 1
+
+# Canonical weather_data layout. Every measurement is numeric and in a fixed unit,
+# so downstream stages never have to re-parse strings.
+WEATHER_DATA_COLUMNS = '''
+    id INTEGER PRIMARY KEY,
+    provider TEXT NOT NULL,
+    location TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,   -- Unix epoch seconds, UTC
+    temperature REAL,             -- degrees Celsius
+    wind_speed REAL,              -- metres per second
+    humidity REAL,                -- relative humidity, percent
+    barometric_pressure REAL,     -- hectopascals
+    latitude REAL,
+    longitude REAL,
+    neighborhood TEXT,
+    altitude REAL,                -- metres above sea level
+    precipitation REAL            -- predicted probability of rain, percent
+'''
+
+CREATE_WEATHER_DATA = f'CREATE TABLE IF NOT EXISTS weather_data ({WEATHER_DATA_COLUMNS})'
+
+# Every consumer filters by location or provider over a time range
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_weather_data_location_timestamp ON weather_data (location, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_weather_data_provider_timestamp ON weather_data (provider, timestamp)',
+    # The consensus stage reads every provider and location in a time range
+    'CREATE INDEX IF NOT EXISTS idx_weather_data_timestamp ON weather_data (timestamp)',
+    # Partial index: only rows still waiting for the altitude stage
+    'CREATE INDEX IF NOT EXISTS idx_weather_data_missing_altitude ON weather_data (location) WHERE altitude IS NULL',
+    # Partial index: rows the barometer stage can compute but has not yet
+    '''CREATE INDEX IF NOT EXISTS idx_weather_data_pending_pressure ON weather_data (id)
+       WHERE barometric_pressure IS NULL
+         AND temperature IS NOT NULL AND humidity IS NOT NULL AND altitude IS NOT NULL''',
+    # Partial index: rows the rain model can score (pressure is known) but has not yet
+    '''CREATE INDEX IF NOT EXISTS idx_weather_data_scorable ON weather_data (id)
+       WHERE precipitation IS NULL AND barometric_pressure IS NOT NULL''',
+)
+
+# Hourly forecasts, one row per provider, location and hour forecast. A newer
+# download of the same hour replaces the older one, and write_forecasts prunes
+# hours more than FORECAST_RETENTION_SECONDS in the past, so the table stays
+# bounded at (locations x (horizon + retention)) per provider.
+CREATE_WEATHER_FORECASTS = '''CREATE TABLE IF NOT EXISTS weather_forecasts (
+                                provider TEXT NOT NULL,
+                                location TEXT NOT NULL,
+                                valid_at INTEGER NOT NULL,    -- start of the forecast hour, epoch seconds UTC
+                                issued_at INTEGER NOT NULL,   -- when the forecast was downloaded
+                                temperature REAL,             -- degrees Celsius
+                                wind_speed REAL,              -- metres per second
+                                humidity REAL,                -- relative humidity, percent
+                                PRIMARY KEY (provider, location, valid_at)
+                              ) WITHOUT ROWID'''
+
+INSERT_OBSERVATION = '''INSERT INTO weather_data (provider, location, timestamp, temperature, wind_speed, humidity)
+                        VALUES (?, ?, ?, ?, ?, ?)'''
+
+# Past forecast hours are kept this long (e.g. to score forecasts against observations)
+FORECAST_RETENTION_SECONDS = 2 * 86400
+PRUNE_FORECASTS = "DELETE FROM weather_forecasts WHERE provider = ? AND valid_at < ?"
+
+UPSERT_FORECAST = '''INSERT INTO weather_forecasts
+                     (provider, location, valid_at, issued_at, temperature, wind_speed, humidity)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)
+                     ON CONFLICT (provider, location, valid_at) DO UPDATE SET
+                         issued_at = excluded.issued_at, temperature = excluded.temperature,
+                         wind_speed = excluded.wind_speed, humidity = excluded.humidity'''
+
+# Conversion factors to metres per second, and the unit each provider reports in
+WIND_SPEED_FACTORS = {
+    'm/s': 1.0,
+    'km/h': 1 / 3.6,
+    'mph': 0.44704,
+    'kn': 0.514444,
+}
+PROVIDER_WIND_UNITS = {
+    'nws': 'mph',
+    'openmeteo': 'km/h',
+    'openweathermap': 'm/s',
+    'weatherapi': 'km/h',
+    'weatherstack': 'km/h',
+}
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+def parse_number(value):
+    """Return value as a float, pulling the first number out of strings like '81%'."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        value = float(value)
+        return None if math.isnan(value) else value
+    match = _NUMBER.search(str(value))
+    return float(match.group()) if match else None
+
+def parse_temperature(value):
+    """Parse a temperature to Celsius, converting values marked with °F."""
+    temperature = parse_number(value)
+    if temperature is not None and isinstance(value, str) and value.strip().upper().endswith('F'):
+        temperature = (temperature - 32) * 5.0 / 9.0
+    return temperature
+
+def parse_wind_speed(value, unit='m/s'):
+    """Parse a wind speed reported in unit and convert it to metres per second."""
+    speed = parse_number(value)
+    return None if speed is None else speed * WIND_SPEED_FACTORS[unit]
+
+def parse_timestamp(value):
+    """Convert an epoch number or a UTC 'YYYY-MM-DD HH:MM:SS' string to epoch seconds."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if str(value).strip().isdigit():
+        return int(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    return calendar.timegm(parsed.utctimetuple())
+
+def normalize_observation(provider, location, temperature, wind_speed, humidity, timestamp=None):
+    """Turn a raw provider reading into a canonical weather_data row tuple."""
+    wind_unit = PROVIDER_WIND_UNITS.get(provider, 'm/s')
+    return (
+        provider,
+        location,
+        int(time.time()) if timestamp is None else parse_timestamp(timestamp),
+        parse_temperature(temperature),
+        parse_wind_speed(wind_speed, wind_unit),
+        parse_number(humidity),
+    )
+
+def get_columns(conn, table='weather_data'):
+    """Return the column names of a table, or an empty list if it does not exist."""
+    return [info[1] for info in conn.execute(f"PRAGMA table_info({table})")]
+
+def is_canonical(conn):
+    """True if weather_data exists and already uses the canonical layout."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    return version >= SCHEMA_VERSION and 'provider' in get_columns(conn)
+
+def create_indexes(conn):
+    """Create the weather_data indexes if they are missing."""
+    for statement in INDEXES:
+        conn.execute(statement)
+
+def ensure_schema(conn):
+    """Create the canonical weather_data table, refusing to write into a legacy one."""
+    if not get_columns(conn):
+        conn.execute(CREATE_WEATHER_DATA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    elif not is_canonical(conn):
+        raise RuntimeError('weather_data uses the legacy layout; run migrate_weather_data.py first.')
+    conn.execute(CREATE_WEATHER_FORECASTS)
+    create_indexes(conn)